@@ -11,6 +11,23 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str
+    DATABASE_REPLICA_URL: str = ""  # Optional read replica for read-only routes (get_read_db)
+    REPLICA_MAX_LAG_SECONDS: float = 5.0  # Reads fall back to the primary above this lag
+    REPLICA_STICKY_SECONDS: int = 10  # Reads stay on the primary this long after a customer's write
+    REPLICA_LAG_CHECK_SECONDS: int = 5
+    DB_CONNECTION_BUDGET: int = 150  # Connections one database server accepts from all workers (MySQL max_connections)
+    DB_CONNECTION_RESERVE: int = 10  # Kept out of the worker pools (admin, migrations, EXPLAIN)
+    DB_POOL_TIMEOUT_SECONDS: int = 10  # Longest wait for a pooled connection before erroring
+    ADMISSION_CONTROL_ENABLED: bool = True  # 503 + Retry-After when the expected connection wait exceeds the deadline
+    ADMISSION_DEADLINE_MS: int = 2000  # Default per-route deadline (@admission_deadline overrides)
+    TENANT_LIMITS_ENABLED: bool = True  # Per-customer rate/concurrency limits of @tenant_limit routes (429 + Retry-After)
+    TENANT_LIMITS: str = ""  # Policy overrides, "class=concurrency/rate/burst/queue", e.g. "heavy_read=8/10/40/16"
+    TENANT_LIMIT_QUEUE_SECONDS: float = 2.0  # Longest wait for a running slot before 429
+    TENANT_LIMIT_MAX_QUEUED: int = 64  # Requests of all customers waiting for a slot in one worker; more get 429
+    TENANT_LIMIT_LEASE_SECONDS: int = 300  # Redis slots of a crashed worker are freed after this
+    DATABASE_SHARDS: str = ""  # Extra tenant shards, e.g. "shard2=mysql+pymysql://...,shard3=..."
+    SHARD_MAP: str = ""  # Default customer -> shard assignments, e.g. "42=shard2" (tenant_shards rows win)
+    SHARD_MAP_TTL_SECONDS: int = 5  # Reload interval of the tenant_shards directory
 
     # JWT
     JWT_SECRET_KEY: str
@@ -44,9 +61,85 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6379/0"
     CACHE_ENABLED: bool = False
     CACHE_TTL_SECONDS: int = 60
+    DEVICE_REGISTRY_TTL_SECONDS: int = 300  # Full reload of the signin device map (cross-worker staleness bound without Redis)
 
     # Logging
     LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json or text
+    LOG_QUEUE_SIZE: int = 10000  # Records buffered for the writer thread (excess is dropped)
+    LOG_SAMPLING: str = ""  # e.g. "app.routers.android=0.1,app.routers.agents=0.5"
+    LOG_RATE_LIMITS: str = ""  # Records per second, e.g. "app.routers.inventories=50"
+
+    # Metrics
+    METRICS_ENABLED: bool = True
+    METRICS_DIR: str = ""  # Shared directory for per-worker snapshots (multi-worker aggregation)
+    METRICS_FLUSH_SECONDS: int = 15
+    METRICS_TOKEN: str = ""  # Optional bearer token required by /metrics
+
+    # SQL query tracking
+    QUERY_REPEAT_THRESHOLD: int = 10  # Same statement this many times in one request logs an N+1 warning (0 disables)
+    QUERY_BUDGET_ENFORCE: bool = False  # Raise QueryBudgetExceeded when a route exceeds its @query_budget (tests)
+    SERVER_TIMING_ENABLED: bool = True  # Add a Server-Timing header with SQL count and time
+
+    # Slow-query log
+    SLOW_QUERY_LOG_ENABLED: bool = False
+    SLOW_QUERY_THRESHOLD_MS: int = 500
+    SLOW_QUERY_EXPLAIN: bool = True  # Capture EXPLAIN plans on a dedicated connection
+    SLOW_QUERY_LOG_DIR: str = "logs/slow_queries"  # One rotating <pid>.jsonl per worker
+    SLOW_QUERY_LOG_MAX_BYTES: int = 10 * 1024 * 1024
+    SLOW_QUERY_LOG_BACKUPS: int = 5
+
+    # Response compression and caching
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # Bodies smaller than this are sent uncompressed
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 5  # Used when the optional brotli package is installed
+    RESPONSE_CACHE_ENABLED: bool = True  # ETag/304 and cached bodies for catalog and inventory reads
+    RESPONSE_CACHE_MAX_MB: int = 64  # Per worker, bodies plus their compressed variants
+
+    # Bulk inventory writes
+    BULK_INSERT_CHUNK_SIZE: int = 1000  # Rows per executemany INSERT
+    IMPORT_BATCH_SIZE: int = 5000  # Rows validated and committed per import batch
+    IMPORT_MAX_REPORTED_ERRORS: int = 1000  # Row errors returned in the import report
+
+    # Startup warm-up (GET /ready answers 503 until it has finished)
+    WARMUP_ENABLED: bool = True
+    WARMUP_POOL_CONNECTIONS: int = 0  # Connections opened per pool before serving (0 = the pool size)
+    WARMUP_TENANTS: int = 20  # Most active customers (by data versions) whose catalog is prefetched
+    WARMUP_CONCURRENCY: int = 4  # Customers warmed at the same time
+    WARMUP_TIMEOUT_SECONDS: float = 60.0  # Readiness is reported after this even if warm-up is unfinished
+
+    # Background jobs (imports, moves, exports answered with 202 + job id)
+    JOB_WORKERS: int = 2  # Job threads per worker; each holds one pooled connection while running
+    JOB_QUEUE_SIZE: int = 20  # Jobs waiting per worker before submissions answer 503
+    JOB_RESULT_DIR: str = "data/jobs"  # Uploaded inputs and downloadable outputs
+    JOB_PROGRESS_INTERVAL_SECONDS: float = 1.0  # Minimum time between progress writes (and cancel checks)
+    JOB_STALE_SECONDS: int = 600  # Running jobs without a heartbeat this long are marked failed
+    JOB_RETENTION_HOURS: int = 72  # Finished jobs and their files are deleted after this
+    JOB_SHUTDOWN_GRACE_SECONDS: float = 10.0  # Time running jobs get to stop after cancellation on shutdown
+
+    # Write-behind scan buffer (Android relocation and missing scans)
+    SCAN_BUFFER_ENABLED: bool = False  # Opt-in: acknowledge scans once spooled; off writes them in the request
+    SCAN_BUFFER_DIR: str = "data/scans"  # Local spool, one file per worker (replayed on startup)
+    SCAN_BUFFER_FLUSH_SECONDS: float = 1.0  # Longest time a scan waits before it is written
+    SCAN_BUFFER_FLUSH_EVENTS: int = 500  # Flush early once this many scans are buffered
+    SCAN_BUFFER_MAX_PENDING: int = 50000  # Unsaved scans per worker before new ones answer 503
+    SCAN_BUFFER_MAX_AGE_SECONDS: int = 86400  # Spooled scans older than this are dead-lettered, not applied
+    SCAN_BUFFER_MAX_ATTEMPTS: int = 5  # Failed saves of a scan before it is moved to the dead-letter file
+    SCAN_BUFFER_RETRY_SECONDS: float = 2.0  # Delay before the first retry, doubled per failed attempt (max 5 min)
+    SCAN_SPOOL_FSYNC: bool = True  # fsync every append (survives power loss, not just a worker crash)
+    SCAN_BUFFER_SHUTDOWN_SECONDS: float = 10.0  # Time the final flush gets on shutdown
+
+    # Floor-plan images (content-addressed, served by GET /api/floor-plans/{key})
+    FLOOR_PLAN_DIR: str = "data/floor_plans"
+    FLOOR_PLAN_MAX_BYTES: int = 20 * 1024 * 1024  # Larger uploads answer 413
+    FLOOR_PLAN_CACHE_SECONDS: int = 31536000  # max-age of served images (content never changes under a key)
+
+    # Change event streams (GET /api/events)
+    EVENTS_ENABLED: bool = True
+    EVENTS_KEEPALIVE_SECONDS: int = 15  # Comment line sent on idle streams (keeps proxies from closing them)
+    EVENTS_QUEUE_SIZE: int = 100  # Events buffered per stream; a slow client gets a resync event instead
+    EVENTS_MAX_STREAMS_PER_CUSTOMER: int = 20  # Per worker
 
     class Config:
         env_file = ".env"
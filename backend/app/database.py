@@ -1,41 +1,285 @@
 """
 Database configuration and session management
 """
-from sqlalchemy import create_engine, text
+from fastapi import Depends
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session, DeclarativeBase
-from typing import Generator
+from typing import AsyncGenerator, Callable, Dict, Generator, Iterable, List, Optional
 import logging
+import threading
+import time
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+def pool_settings() -> Dict[str, int]:
+    """
+    Per-worker pool sizing from the database connection budget.
+
+    Each database server accepts DB_CONNECTION_BUDGET connections from this
+    deployment; DB_CONNECTION_RESERVE of them are kept for admin sessions,
+    migrations and the slow-query EXPLAIN engine, and the rest is split
+    evenly over the WORKERS processes. Half of a worker's share stays open,
+    the other half is overflow opened under load.
+    """
+    per_worker = max(2, (settings.DB_CONNECTION_BUDGET - settings.DB_CONNECTION_RESERVE) // max(1, settings.WORKERS))
+    pool_size = max(1, per_worker // 2)
+    return {
+        "pool_size": pool_size,
+        "max_overflow": per_worker - pool_size,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+    }
+
+
+def _create_pooled_engine(url: str) -> Engine:
+    return create_engine(
+        url,
+        pool_pre_ping=True,  # Verify connections before using
+        pool_recycle=1800,  # Recycle connections every 30 minutes (more conservative)
+        echo=settings.ENVIRONMENT == "development",  # Log SQL in dev
+        **pool_settings(),
+    )
+
+
 # Create database engine with connection pooling
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before using
-    pool_size=20,  # Increased for multi-worker environment (workers * concurrent_requests)
-    max_overflow=30,  # Maximum overflow connections
-    pool_recycle=1800,  # Recycle connections every 30 minutes (more conservative)
-    pool_timeout=30,  # Wait up to 30 seconds for a connection
-    echo=settings.ENVIRONMENT == "development",  # Log SQL in dev
-)
+engine = _create_pooled_engine(settings.DATABASE_URL)
+
+# Optional read replica with its own pool, used by read-only routes through get_read_db
+replica_engine: Optional[Engine] = None
+if settings.DATABASE_REPLICA_URL:
+    replica_engine = _create_pooled_engine(settings.DATABASE_REPLICA_URL)
+
+
+def _parse_pairs(value: str) -> Dict[str, str]:
+    """Parse "key=value,key=value" settings"""
+    pairs = {}
+    for part in value.split(","):
+        key, sep, val = part.strip().partition("=")
+        if sep and key.strip():
+            pairs[key.strip()] = val.strip()
+    return pairs
+
+
+# Tenant shards (DATABASE_SHARDS), each with its own pool; "primary" is the engine above
+shard_engines: Dict[str, Engine] = {"primary": engine}
+for _name, _url in _parse_pairs(settings.DATABASE_SHARDS).items():
+    shard_engines[_name] = _create_pooled_engine(_url)
+
+# Tables shared by all tenants; they always live on the primary
+GLOBAL_TABLES = frozenset({"agents", "clients", "users", "role", "tenant_shards", "jobs"})
+
+
+class TenantMovingError(RuntimeError):
+    """Raised on a write to a tenant that is frozen while it moves between shards"""
+
+    def __init__(self, customer_id: int):
+        super().__init__(f"Customer {customer_id} is being moved to another database shard; retry shortly")
+        self.customer_id = customer_id
+
+
+class ShardRouter:
+    """
+    Maps customer_id to the shard holding its rows.
+
+    Assignments come from the ``tenant_shards`` table on the primary (reloaded
+    every SHARD_MAP_TTL_SECONDS) and fall back to SHARD_MAP, then "primary".
+    A tenant row flagged read_only is frozen for the final pass of a move.
+    """
+
+    def __init__(self, engines: Dict[str, Engine]):
+        self.engines = engines
+        self.static_map = {int(cid): shard for cid, shard in _parse_pairs(settings.SHARD_MAP).items()}
+        self._directory: Dict[int, tuple] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return len(self.engines) > 1
+
+    def shard_for(self, customer_id: Optional[int]) -> str:
+        """Name of the shard holding a customer's rows ("primary" when unknown)"""
+        if customer_id is None or not self.enabled:
+            return "primary"
+        entry = self._entries().get(customer_id)
+        if entry is not None:
+            return entry[0]
+        return self.static_map.get(customer_id, "primary")
+
+    def is_read_only(self, customer_id: Optional[int]) -> bool:
+        """Whether the customer is frozen by an in-progress move"""
+        if customer_id is None or not self.enabled:
+            return False
+        entry = self._entries().get(customer_id)
+        return bool(entry and entry[1])
+
+    def engine_for(self, customer_id: Optional[int]) -> Engine:
+        shard = self.shard_for(customer_id)
+        try:
+            return self.engines[shard]
+        except KeyError:
+            raise RuntimeError(f"Customer {customer_id} is mapped to unknown shard '{shard}'")
+
+    def refresh(self) -> None:
+        """Reload the tenant_shards directory now"""
+        with engine.connect() as conn:
+            rows = conn.execute(text("SELECT customer_id, shard, read_only FROM tenant_shards")).all()
+        self._directory = {row[0]: (row[1], bool(row[2])) for row in rows}
+        self._loaded_at = time.monotonic()
+
+    def _entries(self) -> Dict[int, tuple]:
+        if time.monotonic() - self._loaded_at > settings.SHARD_MAP_TTL_SECONDS:
+            with self._lock:
+                if time.monotonic() - self._loaded_at > settings.SHARD_MAP_TTL_SECONDS:
+                    try:
+                        self.refresh()
+                    except Exception as e:
+                        # Keep routing with the last known directory
+                        logger.error(f"Shard directory reload failed: {e}")
+                        self._loaded_at = time.monotonic()
+        return self._directory
+
 
-# Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+shard_router = ShardRouter(shard_engines)
+
+
+def _request_context():
+    from app.utils.request_context import get_request_context
+
+    return get_request_context()
+
+
+def _request_customer() -> Optional[int]:
+    ctx = _request_context()
+    return ctx.customer_id if ctx else None
+
+
+class TenantSession(Session):
+    """
+    Session routing each statement to the primary (GLOBAL_TABLES) or to the
+    shard of the request's customer.
+
+    The customer comes from the request context, which authentication fills
+    from ``TokenPayload.customerId`` before the route's first statement.
+    ``pin_shard`` overrides it for lookups that are not scoped to a customer;
+    writes are then checked against the customer owning the pinned rows.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if mapper is not None:
+            # Mapped class or Mapper
+            table = inspect(mapper).local_table
+        else:
+            table = getattr(clause, "table", None)
+        if getattr(table, "name", None) in GLOBAL_TABLES:
+            return engine
+
+        writing = self._flushing or getattr(clause, "is_dml", False)
+        shard = self.info.get("shard")
+        if shard is not None:
+            customer_id = self.info.get("shard_customer")
+            if writing and shard_router.is_read_only(customer_id):
+                raise TenantMovingError(customer_id)
+            return shard_router.engines[shard]
+
+        customer_id = _request_customer()
+        if writing and shard_router.is_read_only(customer_id):
+            raise TenantMovingError(customer_id)
+        return shard_router.engine_for(customer_id)
+
+    def pin_shard(self, shard: Optional[str], customer_id: Optional[int] = None) -> None:
+        """
+        Send tenant statements to ``shard`` (None restores customer routing).
+
+        ``customer_id`` owns the rows written through the pin; writes are
+        refused while that customer is being moved.
+        """
+        if shard is None:
+            self.info.pop("shard", None)
+            self.info.pop("shard_customer", None)
+        else:
+            self.info["shard"] = shard
+            self.info["shard_customer"] = customer_id
+
+
+def first_on_any_shard(db: Session, lookup: Callable[[Session], Optional[object]]) -> Optional[object]:
+    """
+    Run a lookup that is not scoped to a customer on each shard in turn.
+
+    The session stays pinned to the shard of the first hit so changes to the
+    returned object are flushed there, unless the hit's customer (its
+    ``customer_id``) is frozen by a move.
+
+    Args:
+        db: Database session
+        lookup: Callable running the query and returning a row/object or None
+
+    Returns:
+        The first non-None result, or None
+    """
+    if not shard_router.enabled:
+        return lookup(db)
+
+    for shard in shard_router.engines:
+        db.pin_shard(shard)
+        result = lookup(db)
+        if result is not None:
+            db.pin_shard(shard, customer_id=getattr(result, "customer_id", None))
+            return result
+    db.pin_shard(None)
+    return None
+
+
+# Create session factory (tenant routing only when shards are configured)
+SessionLocal = sessionmaker(
+    class_=TenantSession if shard_router.enabled else Session,
+    autocommit=False,
+    autoflush=False,
+    bind=engine,
+)
 
 # Base class for models (SQLAlchemy 2.0 compatible)
 class Base(DeclarativeBase):
     pass
 
 
-def get_db() -> Generator[Session, None, None]:
+async def tenant_slot() -> AsyncGenerator[None, None]:
+    """
+    Per-customer limits of the route, taken before its session opens.
+
+    Async so that a request queued for a slot waits on the event loop instead
+    of holding a threadpool thread the sync session dependencies need.
+    """
+    from app.utils.tenant_limits import tenant_limiter
+
+    # One customer's heavy routes stay within its share (TenantLimitExceeded -> 429)
+    slot = await tenant_limiter.enter()
+    try:
+        yield
+    finally:
+        await tenant_limiter.exit(slot)
+
+
+def get_db(_slot: None = Depends(tenant_slot)) -> Generator[Session, None, None]:
     """
     Dependency for getting database session
 
     Yields:
         Database session
     """
+    if shard_router.enabled:
+        # Fail writes of a tenant frozen by a shard move before the route starts
+        # (authentication, declared first, has recorded the customer by now)
+        ctx = _request_context()
+        if ctx and ctx.method not in ("GET", "HEAD", "OPTIONS") and shard_router.is_read_only(ctx.customer_id):
+            raise TenantMovingError(ctx.customer_id)
+
+    from app.utils.admission import admission
+
+    # Refuse quickly (PoolSaturated -> 503) rather than queue past the route's deadline
+    admitted = admission.admit(shard_router.engine_for(_request_customer()))
     db = SessionLocal()
     try:
         yield db
@@ -45,6 +289,213 @@ def get_db() -> Generator[Session, None, None]:
     finally:
         db.expunge_all()  # Detach all objects from session
         db.close()  # Return connection to pool
+        admission.release(admitted)
+
+
+class ReplicaRouter:
+    """
+    Decides whether a read may go to the replica.
+
+    Reads stay on the primary for REPLICA_STICKY_SECONDS after a customer's
+    committed write (read-your-writes) and while the measured replica lag
+    exceeds REPLICA_MAX_LAG_SECONDS or cannot be measured. Recent writes are
+    shared across workers through Redis when it is configured.
+    """
+
+    def __init__(self, replica: Optional[Engine]):
+        self.replica = replica
+        self._recent_writes: Dict[int, float] = {}
+        self._lag: Optional[float] = None
+        self._lag_checked_at = 0.0
+        self._lag_lock = threading.Lock()
+
+    def note_writes(self, customer_ids: Iterable[int]) -> None:
+        """Pin the customers' reads to the primary for the sticky window"""
+        if self.replica is None:
+            return
+        sticky = settings.REPLICA_STICKY_SECONDS
+        deadline = time.monotonic() + sticky
+        customer_ids = list(customer_ids)
+        for customer_id in customer_ids:
+            self._recent_writes[customer_id] = deadline
+
+        from app.utils.redis_client import get_redis
+
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for customer_id in customer_ids:
+                pipe.set(f"scanandgo:recent-write:{customer_id}", 1, ex=sticky)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Recent write not shared with other workers: {e}")
+
+    def recently_wrote(self, customer_id: int) -> bool:
+        """Whether the customer committed a write within the sticky window"""
+        deadline = self._recent_writes.get(customer_id)
+        if deadline is not None:
+            if deadline > time.monotonic():
+                return True
+            self._recent_writes.pop(customer_id, None)
+
+        from app.utils.redis_client import get_redis
+
+        client = get_redis()
+        if client is None:
+            return False
+        try:
+            return bool(client.exists(f"scanandgo:recent-write:{customer_id}"))
+        except Exception:
+            # Unknown, so stay safe
+            return True
+
+    def lag(self) -> Optional[float]:
+        """Replica lag in seconds (re-measured every REPLICA_LAG_CHECK_SECONDS), None if unknown"""
+        if time.monotonic() - self._lag_checked_at < settings.REPLICA_LAG_CHECK_SECONDS:
+            return self._lag
+        # One request measures; concurrent ones use the previous value
+        if not self._lag_lock.acquire(blocking=False):
+            return self._lag
+        try:
+            self._lag = self._measure_lag()
+        finally:
+            self._lag_checked_at = time.monotonic()
+            self._lag_lock.release()
+        return self._lag
+
+    def use_replica(self, customer_id: Optional[int]) -> bool:
+        """Route a read session to the replica?"""
+        from app.utils.metrics import metrics
+
+        if self.replica is None:
+            return False
+        if customer_id is not None and self.recently_wrote(customer_id):
+            reason = "recent_write"
+        else:
+            lag = self.lag()
+            reason = "replica" if lag is not None and lag <= settings.REPLICA_MAX_LAG_SECONDS else "lag"
+        metrics.inc("db_read_routing_total", target="replica" if reason == "replica" else "primary", reason=reason)
+        return reason == "replica"
+
+    def _measure_lag(self) -> Optional[float]:
+        dialect = self.replica.dialect.name
+        try:
+            with self.replica.connect() as conn:
+                if dialect == "mysql":
+                    try:
+                        row = conn.execute(text("SHOW REPLICA STATUS")).mappings().first()
+                    except Exception:
+                        # Servers before 8.0.22
+                        row = conn.execute(text("SHOW SLAVE STATUS")).mappings().first()
+                    if row is None:
+                        # Not replicating (e.g. a standalone copy)
+                        return 0.0
+                    lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+                    return float(lag) if lag is not None else None
+                if dialect == "postgresql":
+                    return float(conn.execute(text(
+                        "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                    )).scalar())
+                return 0.0
+        except Exception as e:
+            logger.warning(f"Replica lag check failed, reading from primary: {e}")
+            return None
+
+
+replica_router = ReplicaRouter(replica_engine)
+
+
+class ReadSession(TenantSession):
+    """Session reading from the replica or the primary, decided at its first statement"""
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        bind = super().get_bind(mapper, clause, **kw)
+        if bind is not engine:
+            # Tenants on other shards are not replicated
+            return bind
+
+        use_replica = self.info.get("use_replica")
+        if use_replica is None:
+            # Deciding late lets authentication record the customer on the request first
+            use_replica = replica_router.use_replica(_request_customer())
+            self.info["use_replica"] = use_replica
+        return replica_engine if use_replica else engine
+
+
+ReadSessionLocal = sessionmaker(class_=ReadSession, autocommit=False, autoflush=False)
+
+
+def get_read_db(_slot: None = Depends(tenant_slot)) -> Generator[Session, None, None]:
+    """
+    Dependency for read-only routes: a session on the replica when one is
+    configured, healthy and the customer has not written recently
+
+    Yields:
+        Database session (never write through it)
+    """
+    if replica_engine is None:
+        yield from get_db(_slot)
+        return
+
+    from app.utils.admission import admission
+
+    admitted = admission.admit(replica_engine)
+    db = ReadSessionLocal()
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.expunge_all()
+        db.close()
+        admission.release(admitted)
+
+
+def upsert_statement(
+    db: Session,
+    model,
+    conflict_columns: List[str],
+    update_values: Callable,
+):
+    """
+    Build a dialect-specific INSERT ... ON DUPLICATE KEY / ON CONFLICT statement
+
+    Args:
+        db: Database session (used to resolve the dialect bound to the model)
+        model: Mapped model class to insert into
+        conflict_columns: Columns of the unique key that may conflict
+        update_values: Callable receiving the proposed row (``inserted`` /
+            ``excluded``) and returning the column -> expression map to apply
+            on conflict
+
+    Returns:
+        Insert statement ready to execute with a list of parameter dicts
+    """
+    dialect = db.get_bind(model).dialect.name
+
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+        stmt = mysql_insert(model)
+        return stmt.on_duplicate_key_update(**update_values(stmt.inserted))
+
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as conflict_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as conflict_insert
+
+        stmt = conflict_insert(model)
+        return stmt.on_conflict_do_update(
+            index_elements=conflict_columns,
+            set_=update_values(stmt.excluded),
+        )
+
+    raise NotImplementedError(f"Upsert is not supported for dialect '{dialect}'")
 
 
 def init_db():
@@ -54,11 +505,13 @@ def init_db():
         from app.models import (
             user, operator, inventory, item, category,
             building, area, floor, detail_location,
-            missing_item, snapshot, apikey, agent
+            missing_item, snapshot, apikey, agent, barcode_occurrence,
+            data_version, scan_mark, tenant_shard, job
         )
 
-        # Create all tables
-        Base.metadata.create_all(bind=engine)
+        # Create all tables (on every shard)
+        for shard_engine in shard_engines.values():
+            Base.metadata.create_all(bind=shard_engine)
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Error initializing database: {e}")
@@ -3,30 +3,72 @@ FastAPI main application entry point
 Updated: Added agents router for mobile device management
 """
 from fastapi import FastAPI, Depends
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 import logging
-import sys
 
 from app.config import settings
-from app.database import test_db_connection, init_db, get_db
-from app.routers import auth, inventories, items, users, analytics, admin, external_api, snapshots, android, agents
+from app.database import (
+    test_db_connection, init_db, get_db, SessionLocal, replica_engine, replica_router,
+    shard_engines, TenantMovingError, pool_settings
+)
+from app.routers import (
+    auth, inventories, items, users, analytics, admin, external_api, snapshots, android, agents, metrics, jobs, events, dashboard,
+    floor_plans
+)
 from app.routers.locations import (
     router_buildings, router_areas, router_floors, router_detail_locations
 )
 from app.routers.items import router_items, router_categories
 from app.utils.dependencies import get_current_user
+from app.services.bulk_items import item_barcode_index
+from app.services.change_events import change_events
+from app.services.change_tracking import change_tracker
+from app.services.device_registry import device_registry
+from app.services.duplicates import duplicate_registry
+from app.services.jobs import job_runner, JobQueueFull
 from app.services.pulsepoint import pulsepoint_service
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO if settings.LOG_LEVEL == "INFO" else logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout)
-    ]
+from app.services.scan_buffer import scan_buffer, ScanBufferFull
+from app.services.warmup import warmup
+from app.utils.admission import admission, PoolSaturated
+from app.utils.tenant_limits import TenantLimitExceeded
+from app.utils.compression import CompressionMiddleware
+from app.utils.logging_setup import setup_logging
+from app.utils.metrics import (
+    MetricsMiddleware, metrics as metrics_registry,
+    monitor_event_loop_lag, flush_snapshots_periodically, remove_snapshot
 )
+from app.utils.query_tracker import install_query_tracker, QueryTrackingMiddleware
+from app.utils.request_context import RequestContextMiddleware
+from app.utils.responses import FastJSONResponse
+from app.utils.slow_query_log import slow_query_log
+
+# Configure logging (JSON records written by a background listener thread)
+setup_logging()
+
+# Per-request SQL accounting and pool instrumentation
+for shard_name, shard_engine in shard_engines.items():
+    install_query_tracker(shard_engine)
+    metrics_registry.instrument_engine(shard_engine, name=shard_name)
+    admission.instrument(shard_engine, name=shard_name)
+if replica_engine is not None:
+    install_query_tracker(replica_engine)
+    metrics_registry.instrument_engine(replica_engine, name="replica")
+    admission.instrument(replica_engine, name="replica")
+if settings.SLOW_QUERY_LOG_ENABLED:
+    for shard_engine in shard_engines.values():
+        slow_query_log.install(shard_engine)
+    if replica_engine is not None:
+        slow_query_log.install(replica_engine)
+
+# Per-customer data versions bumped by every committed write (response cache validation)
+change_tracker.install(SessionLocal)
+# Read-your-writes: a customer's reads stay on the primary right after it commits
+change_tracker.add_commit_listener(replica_router.note_writes)
+# Live dashboard updates (GET /api/events)
+change_tracker.add_change_listener(change_events.publish)
 
 logger = logging.getLogger(__name__)
 
@@ -36,7 +78,8 @@ app = FastAPI(
     description="Inventory Management System Backend",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse,
 )
 
 # Configure CORS
@@ -49,6 +92,22 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# gzip/brotli for complete responses above COMPRESSION_MIN_SIZE
+app.add_middleware(CompressionMiddleware)
+
+# Route latency / SQL usage metrics (runs inside the request context)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# SQL count / N+1 detection / Server-Timing (needs the request context)
+app.add_middleware(QueryTrackingMiddleware)
+
+# Request id / route / customer context for log records
+app.add_middleware(RequestContextMiddleware)
+
+# Background tasks owned by this worker (cancelled on shutdown)
+background_tasks = []
+
 
 # Startup event
 @app.on_event("startup")
@@ -57,6 +116,7 @@ async def startup_event():
     logger.info("Starting ScanAndGo Backend API...")
     logger.info(f"Environment: {settings.ENVIRONMENT}")
     logger.info(f"CORS origins: {settings.cors_origins_list}")
+    logger.info(f"Database pool per worker: {pool_settings()}")
 
     # Test database connection
     if test_db_connection():
@@ -65,12 +125,49 @@ async def startup_event():
         logger.error("Database connection failed")
         raise Exception("Database connection failed")
 
+    # Unique item barcodes on databases created before uq_customer_item_barcode
+    item_barcode_index.ensure()
+
+    # Duplicate-barcode registries of customers that have none yet (GET /api/duplicates only reads)
+    duplicate_registry.seed_all()
+
+    # Cross-worker signin cache invalidation and change events (Redis only)
+    device_registry.start()
+    change_events.start()
+
+    # Background job threads (imports, moves, exports answered with 202)
+    job_runner.start()
+
+    # Write-behind handheld scans (replays spools left by crashed workers)
+    if settings.SCAN_BUFFER_ENABLED:
+        scan_buffer.start()
+
+    # Pools, statements and caches of the busiest customers (GET /ready is 503 until done)
+    if settings.WARMUP_ENABLED:
+        background_tasks.append(asyncio.create_task(warmup.run(app)))
+    else:
+        warmup.mark_ready()
+
+    if settings.METRICS_ENABLED:
+        background_tasks.append(asyncio.create_task(monitor_event_loop_lag()))
+        if settings.METRICS_DIR:
+            background_tasks.append(asyncio.create_task(flush_snapshots_periodically()))
+
 
 # Shutdown event
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
     logger.info("Shutting down ScanAndGo Backend API...")
+    for task in background_tasks:
+        task.cancel()
+    remove_snapshot()
+    slow_query_log.shutdown()
+    device_registry.stop()
+    change_events.stop()
+    job_runner.stop()
+    # Write buffered scans before the worker exits
+    scan_buffer.stop()
     # Close PulsePoint HTTP client
     await pulsepoint_service.close()
     logger.info("PulsePoint service closed")
@@ -87,6 +184,14 @@ async def health_check():
     }
 
 
+# Readiness probe (unhealthy until startup warm-up has finished)
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe endpoint"""
+    status = warmup.status()
+    return FastJSONResponse(status_code=200 if warmup.ready else 503, content=status)
+
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -188,13 +293,68 @@ app.include_router(router_buildings)
 app.include_router(router_areas)
 app.include_router(router_floors)
 app.include_router(router_detail_locations)
+app.include_router(floor_plans.router)
 app.include_router(snapshots.router)
 app.include_router(analytics.router)
+app.include_router(dashboard.router)
 app.include_router(external_api.router)
 app.include_router(android.router)
+app.include_router(metrics.router)
+app.include_router(jobs.router)
+app.include_router(events.router)
 
 
 # Exception handlers
+@app.exception_handler(TenantMovingError)
+async def tenant_moving_handler(request, exc):
+    """Writes of a tenant frozen by a shard move are retried by the client"""
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "error": str(exc)},
+        headers={"Retry-After": str(settings.SHARD_MAP_TTL_SECONDS)},
+    )
+
+
+@app.exception_handler(PoolSaturated)
+async def pool_saturated_handler(request, exc):
+    """Shed load instead of queueing for a connection past the route's deadline"""
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "error": "Server busy, retry shortly"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(TenantLimitExceeded)
+async def tenant_limit_exceeded_handler(request, exc):
+    """The customer is over its share of a heavy endpoint class"""
+    return JSONResponse(
+        status_code=429,
+        content={"success": False, "error": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(ScanBufferFull)
+async def scan_buffer_full_handler(request, exc):
+    """Scans are not being saved (database unavailable); the handheld keeps them and retries"""
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "error": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(JobQueueFull)
+async def job_queue_full_handler(request, exc):
+    """This worker's job queue is full; the client submits again later"""
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "error": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     """Global exception handler"""
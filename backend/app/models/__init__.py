@@ -15,6 +15,11 @@ from app.models.snapshot import Snapshot
 from app.models.apikey import APIKey
 from app.models.client import Client
 from app.models.agent import Agent
+from app.models.barcode_occurrence import BarcodeOccurrence, BarcodeRegistryState
+from app.models.data_version import DataVersion
+from app.models.scan_mark import ScanMark
+from app.models.tenant_shard import TenantShard
+from app.models.job import Job
 
 __all__ = [
     "User",
@@ -32,4 +37,10 @@ __all__ = [
     "APIKey",
     "Client",
     "Agent",
+    "BarcodeOccurrence",
+    "BarcodeRegistryState",
+    "DataVersion",
+    "ScanMark",
+    "TenantShard",
+    "Job",
 ]
@@ -0,0 +1,28 @@
+"""
+BarcodeOccurrence model - maintained duplicate-barcode registry
+"""
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Index
+from datetime import datetime, timezone
+from app.database import Base
+
+
+class BarcodeOccurrence(Base):
+    """Number of inventories carrying a barcode, kept in step with inventory writes"""
+    __tablename__ = "barcode_occurrences"
+    __table_args__ = (
+        # Keyset pagination over the duplicates of one customer
+        Index("ix_barcode_occurrences_duplicates", "customer_id", "is_duplicate", "barcode"),
+    )
+
+    customer_id = Column(Integer, primary_key=True)
+    barcode = Column(String(120), primary_key=True)
+    occurrences = Column(Integer, nullable=False, default=0)
+    is_duplicate = Column(Boolean, nullable=False, default=False)
+
+
+class BarcodeRegistryState(Base):
+    """Marks customers whose barcode registry has been built from their inventories"""
+    __tablename__ = "barcode_registry_state"
+
+    customer_id = Column(Integer, primary_key=True, autoincrement=False)
+    rebuilt_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
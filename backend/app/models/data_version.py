@@ -0,0 +1,14 @@
+"""
+DataVersion model - per-customer change counters
+"""
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+
+class DataVersion(Base):
+    """Incremented in the same transaction as every write to one of a customer's tables"""
+    __tablename__ = "data_versions"
+
+    customer_id = Column(Integer, primary_key=True, autoincrement=False)
+    table_name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
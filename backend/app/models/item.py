@@ -1,7 +1,7 @@
 """
 Item model
 """
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -9,6 +9,10 @@ from app.database import Base
 class Item(Base):
     """Item model for inventory items"""
     __tablename__ = "items"
+    __table_args__ = (
+        # Enforces barcode uniqueness per customer and is the conflict target of bulk upserts
+        UniqueConstraint('customer_id', 'barcode', name='uq_customer_item_barcode'),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     customer_id = Column(Integer, nullable=False, index=True)
@@ -0,0 +1,28 @@
+"""
+Job model - background jobs (lives on the primary database)
+"""
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from datetime import datetime, timezone
+from app.database import Base
+
+
+class Job(Base):
+    """Long-running operation executed by the in-process job runner"""
+    __tablename__ = "jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex
+    customer_id = Column(Integer, nullable=False, index=True)
+    kind = Column(String(32), nullable=False)  # import, move, export
+    status = Column(String(16), nullable=False, default="queued", index=True)  # queued, running, succeeded, failed, cancelled
+    progress = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=True)  # None while unknown
+    message = Column(String(255), nullable=True)
+    result = Column(Text, nullable=True)  # JSON summary of a finished job
+    result_file = Column(String(255), nullable=True)  # Downloadable output under JOB_RESULT_DIR
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, nullable=False, default=False)
+    worker = Column(String(64), nullable=True)  # host:pid running the job
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)  # Heartbeat while running
+    finished_at = Column(DateTime, nullable=True)
@@ -1,7 +1,7 @@
 """
 MissingItem model
 """
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -9,6 +9,12 @@ from app.database import Base
 class MissingItem(Base):
     """Missing item tracking model"""
     __tablename__ = "missing_items"
+    __table_args__ = (
+        # Per-location counts and barcode prefix search within one customer
+        # (id keyset pages use the customer_id index, which ends with the primary key)
+        Index("ix_missing_items_customer_location", "customer_id", "detail_location_id"),
+        Index("ix_missing_items_customer_barcode", "customer_id", "barcode"),
+    )
 
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     customer_id = Column(Integer, nullable=True, index=True)
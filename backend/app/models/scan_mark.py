@@ -0,0 +1,14 @@
+"""
+ScanMark model - time of the latest handheld scan applied per barcode
+"""
+from sqlalchemy import Column, Double, Integer, String
+from app.database import Base
+
+
+class ScanMark(Base):
+    """Keeps late or replayed write-behind scans from overwriting newer ones"""
+    __tablename__ = "scan_marks"
+
+    customer_id = Column(Integer, primary_key=True, autoincrement=False)
+    barcode = Column(String(120), primary_key=True)
+    last_scan_at = Column(Double, nullable=False)  # Epoch seconds the scan was accepted
@@ -0,0 +1,16 @@
+"""
+TenantShard model - shard directory (lives on the primary database)
+"""
+from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from datetime import datetime, timezone
+from app.database import Base
+
+
+class TenantShard(Base):
+    """Database shard holding a customer's rows; overrides SHARD_MAP"""
+    __tablename__ = "tenant_shards"
+
+    customer_id = Column(Integer, primary_key=True, autoincrement=False)
+    shard = Column(String(64), nullable=False)
+    read_only = Column(Boolean, nullable=False, default=False)  # Frozen during the final pass of a move
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
+from typing import Optional
 import secrets
 
+from app.config import settings
 from app.database import get_db
 from app.models.apikey import APIKey
-from app.utils.dependencies import get_current_user
+from app.utils.dependencies import get_current_user, get_current_admin
+from app.utils.slow_query_log import slow_query_log
 
 router = APIRouter(prefix="/api/admin", tags=["Admin"])
 
@@ -82,3 +86,22 @@ async def delete_apikey(
     db.commit()
     
     return {"success": True, "message": "API key deleted successfully"}
+
+
+@router.get("/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(100, ge=1, le=1000),
+    route: Optional[str] = Query(None, description="Route template, e.g. /api/inventories"),
+    current_user = Depends(get_current_admin)
+):
+    """Recent slow SQL statements with their EXPLAIN plans (own customer and background queries)"""
+    queries = await run_in_threadpool(
+        slow_query_log.recent, limit, current_user.customerId, route
+    )
+
+    return {
+        "success": True,
+        "enabled": settings.SLOW_QUERY_LOG_ENABLED,
+        "thresholdMs": settings.SLOW_QUERY_THRESHOLD_MS,
+        "queries": queries
+    }
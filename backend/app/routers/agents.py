@@ -10,6 +10,7 @@ import logging
 from app.database import get_db
 from app.models.agent import Agent
 from app.schemas.common import SuccessResponse
+from app.services.device_registry import device_registry
 from app.utils.dependencies import get_current_user, get_current_admin
 
 logger = logging.getLogger(__name__)
@@ -54,15 +55,8 @@ async def register_mobile_device(
                 detail=f"Device ID '{device_id}' is already registered for this customer"
             )
         
-        # Create new agent
-        new_agent = Agent(
-            device_id=device_id,
-            customer_id=customer_id
-        )
-        
-        db.add(new_agent)
-        db.commit()
-        db.refresh(new_agent)
+        # Create new agent (also drops the device from the signin cache)
+        new_agent = device_registry.register(db, device_id, customer_id)
         
         logger.info(f"Mobile device registered: {device_id} for customer {customer_id}")
         
@@ -100,21 +94,14 @@ async def list_mobile_devices(
     """
     try:
         customer_id = current_user.customerId
-        logger.info(f"[LIST] current_user object: customerId={customer_id}, userId={current_user.userId}, role={current_user.role}")
-        logger.info(f"[LIST] Fetching devices for customer_id: {customer_id} (type: {type(customer_id)})")
-        
-        # First, let's check all agents in the table
-        all_agents = db.query(Agent).all()
-        logger.info(f"[LIST] Total agents in DB: {len(all_agents)}")
-        for a in all_agents:
-            logger.info(f"[LIST] Agent in DB - ID: {a.agents_id}, Device: {a.device_id}, Customer: {a.customer_id} (type: {type(a.customer_id)})")
-        
-        devices = db.query(Agent).filter(
+
+        # Served by ix_agents_customer_id (newest first)
+        devices = db.query(
+            Agent.agents_id, Agent.device_id, Agent.customer_id
+        ).filter(
             Agent.customer_id == customer_id
         ).order_by(Agent.agents_id.desc()).all()
-        
-        logger.info(f"[LIST] Found {len(devices)} devices after filtering by customer_id: {customer_id}")
-        
+
         device_list = [
             {
                 "agents_id": d.agents_id,
@@ -171,6 +158,7 @@ async def delete_mobile_device(
         
         db.delete(agent)
         db.commit()
+        device_registry.invalidate(agent.device_id)
         
         logger.info(f"Mobile device deleted: {agent.device_id} (ID: {agents_id})")
         
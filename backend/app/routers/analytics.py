@@ -1,20 +1,37 @@
 """
 Analytics and reporting routes
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import func, select
+from typing import Literal, Optional
 
-from app.database import get_db
+from app.database import get_db, get_read_db
+from app.models.detail_location import DetailLocation
 from app.models.inventory import Inventory
+from app.models.item import Item
 from app.models.missing_item import MissingItem
+from app.services.duplicates import duplicate_registry
 from app.utils.dependencies import get_current_user
+from app.utils.query_tracker import query_budget
+from app.utils.response_cache import response_cache
+from app.utils.responses import FastJSONResponse
+from app.utils.tenant_limits import tenant_limit
 
 router = APIRouter(prefix="/api", tags=["Analytics"])
 
+# Tables a missing items page is built from
+MISSING_ITEMS_TABLES = (
+    MissingItem.__tablename__, DetailLocation.__tablename__, Inventory.__tablename__, Item.__tablename__,
+)
+MISSING_ITEM_FIELDS = (
+    "id", "barcode", "detail_location_id", "detail_location_name", "inventory_id", "item_name",
+)
+MISSING_LOCATION_FIELDS = ("detail_location_id", "detail_location_name", "count")
+
 
 @router.get("/search")
+@tenant_limit("heavy_read")
 async def search(
     q: str = Query(None),
     limit: int = Query(50, le=100),
@@ -42,32 +59,37 @@ async def search(
 
 
 @router.get("/duplicates")
+@tenant_limit("heavy_read")
+@query_budget(10)
 async def get_duplicates(
-    limit: int = Query(100, le=500, description="Max duplicate barcodes to return"),
+    limit: int = Query(100, ge=1, le=500, description="Max duplicate barcodes to return"),
+    cursor: Optional[str] = Query(None, description="Barcode after which the page starts (nextCursor)"),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    read_db: Session = Depends(get_read_db)
 ):
-    """Get duplicate inventory records by barcode"""
-
-    # Find barcodes that appear more than once (with limit to prevent memory issues)
-    duplicate_barcodes = db.query(Inventory.barcode).filter(
-        Inventory.customer_id == current_user.customerId,
-        Inventory.barcode != None,
-        Inventory.barcode != ""
-    ).group_by(Inventory.barcode).having(
-        func.count(Inventory.barcode) > 1
-    ).limit(limit).all()
+    """Get duplicate inventory records by barcode, paged over the barcode registry"""
 
-    barcode_list = [b[0] for b in duplicate_barcodes]
+    # Registries are built at startup and by the first inventory write of a customer
+    barcode_list = duplicate_registry.page(read_db, current_user.customerId, limit, cursor)
+    has_more = len(barcode_list) > limit
+    barcode_list = barcode_list[:limit]
 
     if not barcode_list:
-        return {"success": True, "duplicates": [], "limited": False}
+        return {"success": True, "duplicates": [], "limited": False, "nextCursor": None}
 
-    # Get all inventories with duplicate barcodes (limited set)
-    duplicates = db.query(Inventory).filter(
+    # Get all inventories carrying the barcodes of this page
+    duplicates = read_db.query(Inventory).options(
+        joinedload(Inventory.item),
+        joinedload(Inventory.category),
+        joinedload(Inventory.building),
+        joinedload(Inventory.area),
+        joinedload(Inventory.floor),
+        joinedload(Inventory.detail_location),
+        joinedload(Inventory.operator),
+    ).filter(
         Inventory.customer_id == current_user.customerId,
         Inventory.barcode.in_(barcode_list)
-    ).order_by(Inventory.barcode, Inventory.id).limit(limit * 10).all()
+    ).order_by(Inventory.barcode, Inventory.id).all()
 
     # Serialize duplicates with relationships (same format as inventories endpoint)
     serialized_duplicates = [
@@ -121,22 +143,116 @@ async def get_duplicates(
     return {
         "success": True,
         "duplicates": serialized_duplicates,
-        "limited": len(duplicate_barcodes) >= limit
+        "limited": has_more,
+        "nextCursor": barcode_list[-1] if has_more else None
     }
 
 
+@router.post("/duplicates/rebuild")
+@tenant_limit("bulk_write")
+async def rebuild_duplicates(
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Rebuild the duplicate-barcode registry from the inventories table"""
+    count = duplicate_registry.rebuild(db, current_user.customerId)
+
+    return {"success": True, "message": "Duplicate registry rebuilt", "count": count}
+
+
 @router.get("/missing-items")
+@tenant_limit("heavy_read")
+@query_budget(2)
 async def get_missing_items(
-    limit: int = Query(500, le=1000, description="Max items to return"),
+    request: Request,
+    limit: int = Query(500, ge=1, le=1000, description="Max items (or locations) to return"),
+    cursor: Optional[int] = Query(None, description="Id after which the page starts (nextCursor)"),
+    search: Optional[str] = Query(None, description="Barcode prefix"),
+    detailLocationId: Optional[int] = Query(None),
+    groupBy: Optional[Literal["location"]] = Query(None, description="'location' returns counts per detail location"),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
-    """Get missing items"""
-    missing = db.query(MissingItem).filter(
-        MissingItem.customer_id == current_user.customerId
-    ).limit(limit).all()
+    """
+    Get missing items, paged by id, with detail location and inventory names
+
+    With ``groupBy=location`` the page lists detail locations with their
+    missing item counts instead, paged by detail location id.
+    """
+    customer_id = current_user.customerId
+
+    cached = response_cache.lookup(request, db, customer_id, MISSING_ITEMS_TABLES)
+    if cached is not None:
+        return cached
+
+    criteria = [MissingItem.customer_id == customer_id]
+    if search:
+        criteria.append(MissingItem.barcode.startswith(search.strip(), autoescape=True))
+    if detailLocationId is not None:
+        criteria.append(MissingItem.detail_location_id == detailLocationId)
 
-    return {"success": True, "missing_items": missing, "limited": len(missing) >= limit}
+    if groupBy == "location":
+        if cursor is not None:
+            criteria.append(MissingItem.detail_location_id > cursor)
+        rows = db.execute(
+            select(
+                MissingItem.detail_location_id,
+                DetailLocation.name,
+                func.count(MissingItem.id),
+            )
+            .outerjoin(DetailLocation, DetailLocation.id == MissingItem.detail_location_id)
+            .where(*criteria)
+            .group_by(MissingItem.detail_location_id, DetailLocation.name)
+            .order_by(MissingItem.detail_location_id)
+            .limit(limit + 1)
+        ).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return response_cache.store(request, FastJSONResponse({
+            "success": True,
+            "locations": [dict(zip(MISSING_LOCATION_FIELDS, row)) for row in rows],
+            "limited": has_more,
+            "nextCursor": rows[-1][0] if has_more else None
+        }))
+
+    if cursor is not None:
+        criteria.append(MissingItem.id > cursor)
+
+    # First inventory carrying the barcode (barcodes may be duplicated)
+    inventory_id = (
+        select(Inventory.id)
+        .where(Inventory.customer_id == customer_id, Inventory.barcode == MissingItem.barcode)
+        .order_by(Inventory.id)
+        .limit(1)
+        .correlate(MissingItem)
+        .scalar_subquery()
+    )
+    rows = db.execute(
+        select(
+            MissingItem.id,
+            MissingItem.barcode,
+            MissingItem.detail_location_id,
+            DetailLocation.name,
+            Inventory.id,
+            Item.name,
+        )
+        .select_from(MissingItem)
+        .outerjoin(DetailLocation, DetailLocation.id == MissingItem.detail_location_id)
+        .outerjoin(Inventory, Inventory.id == inventory_id)
+        .outerjoin(Item, Item.id == Inventory.item_id)
+        .where(*criteria)
+        .order_by(MissingItem.id)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return response_cache.store(request, FastJSONResponse({
+        "success": True,
+        "missing_items": [dict(zip(MISSING_ITEM_FIELDS, row)) for row in rows],
+        "limited": has_more,
+        "nextCursor": rows[-1][0] if has_more else None
+    }))
 
 
 @router.post("/missing-items")
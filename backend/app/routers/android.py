@@ -2,10 +2,14 @@
 Android app API routes - exact paths and shapes expected by the ScanAndGo Android app.
 All routes require Authorization: Bearer <token> (from POST /api/user/signin) except user/signin.
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import Optional, List
 
+from app.config import settings
 from app.database import get_db
 from app.models.building import Building
 from app.models.area import Area
@@ -37,7 +41,12 @@ from app.schemas.android import (
     AndroidPostQRCode,
     AndroidQrReturn,
 )
+from app.services.bulk_items import barcode_conflict
+from app.services.scan_buffer import scan_buffer, apply_scan_events
 from app.utils.dependencies import get_current_user
+from app.utils.query_tracker import query_budget
+from app.utils.response_cache import response_cache
+from app.utils.responses import rows_response
 
 router = APIRouter(prefix="/api", tags=["Android App"])
 
@@ -45,55 +54,72 @@ router = APIRouter(prefix="/api", tags=["Android App"])
 # --- Locations (read-only) ---
 
 @router.get("/building/read", response_model=List[AndroidBuilding])
+@query_budget(2)
 async def android_building_read(
+    request: Request,
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Android: list all buildings."""
+    cached = response_cache.lookup(request, db, current_user.customerId, (Building.__tablename__,))
+    if cached is not None:
+        return cached
+
     rows = (
-        db.query(Building)
+        db.query(Building.id, Building.name)
         .filter(Building.customer_id == current_user.customerId)
         .order_by(Building.name)
         .all()
     )
-    return [AndroidBuilding(id=b.id, name=b.name) for b in rows]
+    return response_cache.store(request, rows_response(rows, ("id", "name")))
 
 
 @router.get("/area/read", response_model=List[AndroidArea])
+@query_budget(2)
 async def android_area_read(
+    request: Request,
     id: Optional[int] = Query(None, description="buildingId"),
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Android: list areas (optionally for building id)."""
-    query = db.query(Area).filter(Area.customer_id == current_user.customerId)
+    cached = response_cache.lookup(request, db, current_user.customerId, (Area.__tablename__,))
+    if cached is not None:
+        return cached
+
+    query = db.query(
+        Area.id, Area.name, func.coalesce(Area.building_id, 0)
+    ).filter(Area.customer_id == current_user.customerId)
     if id is not None:
         query = query.filter(Area.building_id == id)
     rows = query.order_by(Area.name).all()
-    return [
-        AndroidArea(id=a.id, name=a.name, building_id=a.building_id or 0)
-        for a in rows
-    ]
+    return response_cache.store(request, rows_response(rows, ("id", "name", "building_id")))
 
 
 @router.get("/floor/read", response_model=List[AndroidFloor])
+@query_budget(2)
 async def android_floor_read(
+    request: Request,
     id: Optional[int] = Query(None, description="areaId"),
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Android: list floors (optionally for area id)."""
-    query = db.query(Floor).filter(Floor.customer_id == current_user.customerId)
+    cached = response_cache.lookup(request, db, current_user.customerId, (Floor.__tablename__,))
+    if cached is not None:
+        return cached
+
+    query = db.query(
+        Floor.id, Floor.name, func.coalesce(Floor.area_id, 0)
+    ).filter(Floor.customer_id == current_user.customerId)
     if id is not None:
         query = query.filter(Floor.area_id == id)
     rows = query.order_by(Floor.name).all()
-    return [
-        AndroidFloor(id=f.id, name=f.name, area_id=f.area_id or 0)
-        for f in rows
-    ]
+    return response_cache.store(request, rows_response(rows, ("id", "name", "area_id")))
 
 
 @router.get("/detaillocation/read", response_model=AndroidDetailLocation)
+@query_budget(1)
 async def android_detaillocation_read(
     id: int = Query(..., description="detailLocationId"),
     current_user=Depends(get_current_user),
@@ -118,39 +144,50 @@ async def android_detaillocation_read(
 
 
 @router.get("/detaillocation/readall", response_model=List[AndroidDetailLocation])
+@query_budget(2)
 async def android_detaillocation_readall(
+    request: Request,
     id: Optional[int] = Query(None, description="floorId"),
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Android: list detail locations (optionally for floor id)."""
-    query = db.query(DetailLocation).filter(
+    cached = response_cache.lookup(request, db, current_user.customerId, (DetailLocation.__tablename__,))
+    if cached is not None:
+        return cached
+
+    query = db.query(
+        DetailLocation.id, DetailLocation.name, DetailLocation.img_data
+    ).filter(
         DetailLocation.customer_id == current_user.customerId
     )
     if id is not None:
         query = query.filter(DetailLocation.floor_id == id)
     rows = query.order_by(DetailLocation.name).all()
-    return [
-        AndroidDetailLocation(id=d.id, name=d.name, img_data=d.img_data)
-        for d in rows
-    ]
+    return response_cache.store(request, rows_response(rows, ("id", "name", "img_data")))
 
 
 # --- Categories ---
 
 @router.get("/category/read", response_model=List[AndroidCategory])
+@query_budget(2)
 async def android_category_read(
+    request: Request,
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Android: list all categories."""
+    cached = response_cache.lookup(request, db, current_user.customerId, (Category.__tablename__,))
+    if cached is not None:
+        return cached
+
     rows = (
-        db.query(Category)
+        db.query(Category.id, Category.name)
         .filter(Category.customer_id == current_user.customerId)
         .order_by(Category.name)
         .all()
     )
-    return [AndroidCategory(id=c.id, name=c.name) for c in rows]
+    return response_cache.store(request, rows_response(rows, ("id", "name")))
 
 
 @router.post("/category/create", response_model=AndroidStatusVM)
@@ -202,25 +239,25 @@ async def android_category_update(
 # --- Items ---
 
 @router.get("/item/read", response_model=List[AndroidItem])
+@query_budget(2)
 async def android_item_read(
+    request: Request,
     id: Optional[int] = Query(None, description="categoryId"),
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     """Android: list items (optionally for category id)."""
-    query = db.query(Item).filter(Item.customer_id == current_user.customerId)
+    cached = response_cache.lookup(request, db, current_user.customerId, (Item.__tablename__,))
+    if cached is not None:
+        return cached
+
+    query = db.query(
+        Item.id, Item.name, func.coalesce(Item.category_id, 0), Item.barcode
+    ).filter(Item.customer_id == current_user.customerId)
     if id is not None:
         query = query.filter(Item.category_id == id)
     rows = query.order_by(Item.name).all()
-    return [
-        AndroidItem(
-            id=i.id,
-            name=i.name,
-            category_id=i.category_id or 0,
-            barcode=i.barcode,
-        )
-        for i in rows
-    ]
+    return response_cache.store(request, rows_response(rows, ("id", "name", "category_id", "barcode")))
 
 
 @router.post("/item/create", response_model=AndroidStatusVM)
@@ -230,24 +267,21 @@ async def android_item_create(
     db: Session = Depends(get_db),
 ):
     """Android: create item. Returns status (1 = success)."""
-    existing = (
-        db.query(Item)
-        .filter(
-            Item.customer_id == current_user.customerId,
-            Item.barcode == request.barcode,
-        )
-        .first()
-    )
-    if existing and request.barcode:
-        raise HTTPException(status_code=409, detail="Barcode already exists")
     item = Item(
         customer_id=current_user.customerId,
         name=request.name,
         category_id=request.categoryId,
         barcode=request.barcode or None,
     )
+    # Barcode uniqueness is enforced by uq_customer_item_barcode
+    if barcode_conflict(db, current_user.customerId, item.barcode):
+        raise HTTPException(status_code=409, detail="Barcode already exists")
     db.add(item)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Barcode already exists")
     return AndroidStatusVM(status=1)
 
 
@@ -274,8 +308,15 @@ async def android_item_update(
     if request.categoryId is not None:
         item.category_id = request.categoryId
     if request.barcode is not None:
-        item.barcode = request.barcode
-    db.commit()
+        item.barcode = request.barcode or None
+        if barcode_conflict(db, current_user.customerId, item.barcode, item.id):
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Barcode already exists")
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Barcode already exists")
     return AndroidMessageVM(message="OK")
 
 
@@ -424,25 +465,29 @@ async def android_inventory_location_barcode(
     current_user=Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
-    """Android: move inventories (by barcode list) to a location. block_id maps to detail_location_id."""
-    updated = 0
-    for barcode in request.barcode_list or []:
-        inv = (
-            db.query(Inventory)
-            .filter(
-                Inventory.customer_id == current_user.customerId,
-                Inventory.barcode == barcode,
-            )
-            .first()
+    """
+    Android: move inventories (by barcode list) to a location. block_id maps to detail_location_id.
+
+    With the scan buffer the move is acknowledged once spooled and written
+    within SCAN_BUFFER_FLUSH_SECONDS.
+    """
+    barcodes = [barcode for barcode in request.barcode_list or [] if barcode]
+    target = {
+        "building_id": request.building_id or None,
+        "area_id": request.area_id or None,
+        "floor_id": request.floor_id or None,
+        "detail_location_id": request.block_id or None,
+    }
+    if settings.SCAN_BUFFER_ENABLED and barcodes and \
+            await run_in_threadpool(scan_buffer.submit, current_user.customerId, "relocate", barcodes, target):
+        return AndroidFixLocationStatusVM(
+            status=1,
+            message=f"Accepted {len(barcodes)} scan(s)",
         )
-        if inv:
-            inv.building_id = request.building_id if request.building_id else None
-            inv.area_id = request.area_id if request.area_id else None
-            inv.floor_id = request.floor_id if request.floor_id else None
-            inv.detail_location_id = (
-                request.block_id if request.block_id else None
-            )
-            updated += 1
+
+    updated = apply_scan_events(db, current_user.customerId, [
+        {"kind": "relocate", "barcodes": barcodes, "target": target}
+    ]) if barcodes else 0
     db.commit()
     return AndroidFixLocationStatusVM(
         status=1,
@@ -460,20 +505,16 @@ async def android_missingitem_create(
 ):
     """Android: mark items as missing at a location (by barcode list)."""
     # locationId = detail_location_id or similar; barcode_list = barcodes to mark missing
-    for barcode in request.barcode_list or []:
-        inv = (
-            db.query(Inventory)
-            .filter(
-                Inventory.customer_id == current_user.customerId,
-                Inventory.barcode == barcode,
-            )
-            .first()
-        )
-        if inv:
-            inv.status = 4  # Missing
-            inv.detail_location_id = (
-                request.locationId if request.locationId else inv.detail_location_id
-            )
+    barcodes = [barcode for barcode in request.barcode_list or [] if barcode]
+    if not barcodes:
+        return AndroidMessageVM(message="OK")
+
+    target = {"detail_location_id": request.locationId or None}
+    if settings.SCAN_BUFFER_ENABLED and \
+            await run_in_threadpool(scan_buffer.submit, current_user.customerId, "missing", barcodes, target):
+        return AndroidMessageVM(message="OK")
+
+    apply_scan_events(db, current_user.customerId, [{"kind": "missing", "barcodes": barcodes, "target": target}])
     db.commit()
     return AndroidMessageVM(message="OK")
 
@@ -5,9 +5,8 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 import logging
 
-from app.database import get_db
+from app.database import get_db, first_on_any_shard
 from app.models.operator import Operator
-from app.models.agent import Agent
 from app.schemas.auth import (
     SignInRequest, TokenResponse, VerifyTokenRequest, VerifyTokenResponse,
     RegisterUserRequest, PasswordResetRequest, PasswordResetRequestOnly,
@@ -17,6 +16,8 @@ from app.schemas.auth import (
 from app.schemas.common import SuccessResponse
 from app.utils.auth import verify_password, get_password_hash, create_access_token, verify_token
 from app.utils.dependencies import get_current_user
+from app.utils.request_context import set_request_customer
+from app.services.device_registry import device_registry
 from app.services.pulsepoint import pulsepoint_service
 
 logger = logging.getLogger(__name__)
@@ -28,16 +29,13 @@ router = APIRouter(prefix="/api", tags=["Authentication"])
 async def device_signin(request: DeviceSignInRequest, db: Session = Depends(get_db)):
     """
     Device-id-only signin for Android app.
-    Looks up Agent by device_id; if not found, creates one with customer_id=1.
+    Looks up the device in the registry cache; if not found, creates an Agent with customer_id=1.
     Returns access_token, message, status (1=success) for LoginVM compatibility.
     """
-    agent = db.query(Agent).filter(Agent.device_id == request.device_id).first()
+    agent = device_registry.lookup(db, request.device_id)
     if not agent:
         # Auto-register device with default customer so app works without pre-registration
-        agent = Agent(device_id=request.device_id, customer_id=1)
-        db.add(agent)
-        db.commit()
-        db.refresh(agent)
+        agent = device_registry.register(db, request.device_id, customer_id=1)
         logger.info(f"New device registered: device_id={request.device_id[:16]}... -> customer_id=1")
     token = create_access_token({
         "customerId": agent.customer_id,
@@ -108,9 +106,9 @@ async def signin(request: SignInRequest, db: Session = Depends(get_db)):
     # Handle Agent login (Local database)
     if request.role == "agent":
         # Find operator by username
-        operator = db.query(Operator).filter(
+        operator = first_on_any_shard(db, lambda session: session.query(Operator).filter(
             Operator.username == request.email
-        ).first()
+        ).first())
 
         if not operator:
             logger.warning(f"Agent login failed - account not found: {request.email}")
@@ -193,9 +191,9 @@ async def register_user(
     """Register new agent/operator (self-registration with valid admin email)"""
 
     # Check if username already exists
-    existing = db.query(Operator).filter(
+    existing = first_on_any_shard(db, lambda session: session.query(Operator).filter(
         Operator.username == request.username
-    ).first()
+    ).first())
 
     if existing:
         raise HTTPException(
@@ -206,6 +204,9 @@ async def register_user(
     # Hash password
     hashed_password = get_password_hash(request.password)
 
+    # The new operator goes to the shard of its customer
+    set_request_customer(request.customer_id)
+
     # Create new operator
     new_operator = Operator(
         customer_id=request.customer_id,
@@ -233,9 +234,9 @@ async def password_reset_request(
 ):
     """User requests a password reset - flags account for admin to handle"""
 
-    operator = db.query(Operator).filter(
+    operator = first_on_any_shard(db, lambda session: session.query(Operator).filter(
         Operator.username == request.username
-    ).first()
+    ).first())
 
     if not operator:
         raise HTTPException(
@@ -261,9 +262,9 @@ async def password_reset(
 ):
     """Reset operator password (admin sets new password)"""
 
-    operator = db.query(Operator).filter(
+    operator = first_on_any_shard(db, lambda session: session.query(Operator).filter(
         Operator.username == request.username
-    ).first()
+    ).first())
 
     if not operator:
         raise HTTPException(
@@ -292,9 +293,9 @@ async def check_username(
 ):
     """Check if username is available"""
 
-    exists = db.query(Operator).filter(
+    exists = first_on_any_shard(db, lambda session: session.query(Operator).filter(
         Operator.username == request.username
-    ).first() is not None
+    ).first()) is not None
 
     return {
         "available": not exists,
@@ -0,0 +1,91 @@
+"""
+Dashboard routes (all tiles in one request)
+"""
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
+from sqlalchemy import case, func, select
+
+from app.database import get_read_db
+from app.models.building import Building
+from app.models.category import Category
+from app.models.detail_location import DetailLocation
+from app.models.inventory import Inventory
+from app.models.item import Item
+from app.models.missing_item import MissingItem
+from app.models.operator import Operator
+from app.models.snapshot import Snapshot
+from app.utils.dependencies import get_current_user
+from app.utils.query_tracker import query_budget
+from app.utils.response_cache import response_cache
+from app.utils.responses import FastJSONResponse
+
+router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
+
+# Counted tables -> response key (the tables the summary depends on)
+COUNTED_MODELS = {
+    "items": Item,
+    "categories": Category,
+    "locations": DetailLocation,
+    "buildings": Building,
+    "users": Operator,
+    "missingItems": MissingItem,
+    "snapshots": Snapshot,
+}
+
+SUMMARY_TABLES = (Inventory.__tablename__,) + tuple(model.__tablename__ for model in COUNTED_MODELS.values())
+
+
+@router.get("/summary")
+@query_budget(2)
+async def get_dashboard_summary(
+    request: Request,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Counts for every dashboard tile and the inventory status breakdown
+
+    One statement: the inventory aggregates plus one scalar COUNT subquery per
+    counted table. The body is cached per customer and revalidated against
+    the customer's data versions (ETag / 304).
+    """
+    customer_id = current_user.customerId
+
+    cached = response_cache.lookup(request, db, customer_id, SUMMARY_TABLES)
+    if cached is not None:
+        return cached
+
+    inventory = select(
+        func.count(Inventory.id).label("inventories"),
+        func.sum(case((Inventory.status == 0, 1), else_=0)).label("inactive"),
+        func.sum(case((Inventory.status == 1, 1), else_=0)).label("active"),
+        func.sum(case((Inventory.status == 2, 1), else_=0)).label("maintenance"),
+        func.sum(case((Inventory.status == 3, 1), else_=0)).label("retired"),
+        func.sum(case((Inventory.status == 4, 1), else_=0)).label("missing"),
+        func.sum(case((Inventory.is_throw == True, 1), else_=0)).label("breakage"),
+    ).where(Inventory.customer_id == customer_id).subquery()
+
+    counts = [
+        select(func.count()).select_from(model).where(model.customer_id == customer_id)
+        .scalar_subquery().label(key)
+        for key, model in COUNTED_MODELS.items()
+    ]
+
+    row = db.execute(select(inventory, *counts)).one()
+
+    return response_cache.store(request, FastJSONResponse({
+        "success": True,
+        "counts": {
+            "inventories": row.inventories or 0,
+            "breakage": row.breakage or 0,
+            **{key: row._mapping[key] or 0 for key in COUNTED_MODELS},
+        },
+        "statusCounts": {
+            0: row.inactive or 0,
+            1: row.active or 0,
+            2: row.maintenance or 0,
+            3: row.retired or 0,
+            4: row.missing or 0
+        },
+        "total": row.inventories or 0
+    }))
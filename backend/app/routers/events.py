@@ -0,0 +1,69 @@
+"""
+Server-sent event stream of the customer's data changes
+"""
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import logging
+
+from app.config import settings
+from app.services.change_events import change_events
+from app.utils.dependencies import get_stream_user
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/events", tags=["Events"])
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+@router.get("")
+async def stream_events(
+    current_user = Depends(get_stream_user)
+):
+    """
+    Stream change events of the customer (text/event-stream)
+
+    ``change`` events carry the tables written by a commit, inserted minus
+    deleted row counts per table (``deltas``) and bulk moves (``events``).
+    A ``resync`` event (also sent on connect) means events may have been
+    missed and counters should be refetched once. Browsers pass the JWT as
+    ``?token=`` since EventSource cannot set headers.
+    """
+    if not settings.EVENTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Event streams are disabled")
+
+    stream = change_events.open_stream(current_user.customerId)
+    if stream is None:
+        raise HTTPException(status_code=429, detail="Too many open event streams")
+
+    async def event_source():
+        try:
+            yield f"retry: 5000\n\n{_sse('resync', {'reason': 'connected'})}"
+            while True:
+                try:
+                    change = await asyncio.wait_for(
+                        stream.queue.get(), timeout=settings.EVENTS_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+
+                if change is None:
+                    # Server shutting down; the client reconnects to another worker
+                    return
+                if stream.overflowed:
+                    stream.overflowed = False
+                    yield _sse("resync", {"reason": "overflow"})
+                yield _sse("change", change)
+        finally:
+            change_events.close_stream(stream)
+
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,39 +1,66 @@
 """
 External API routes for third-party access using API keys
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from typing import Optional
 
-from app.database import get_db
+from app.database import SessionLocal, get_read_db
 from app.models.inventory import Inventory
 from app.models.apikey import APIKey
+from app.services.change_tracking import INVENTORY_VIEW_TABLES
+from app.services.inventory_export import export_row
+from app.utils.admission import admission_deadline
+from app.utils.request_context import set_request_customer
+from app.utils.response_cache import response_cache
+from app.utils.responses import FastJSONResponse
+from app.utils.tenant_limits import tenant_limit
 
 router = APIRouter(prefix="/api/scanandgo", tags=["External API"])
 
 
-@router.get("/inventory")
-async def get_inventory_external(
+def api_customer(
     customer_id: int = Query(..., description="Customer ID"),
     apikey: str = Query(..., description="API Key for authentication"),
-    db: Session = Depends(get_db)
-):
+) -> int:
     """
-    External API endpoint to get inventory data using API key authentication.
-    Returns inventory data with resolved names for all relationships.
-    """
-
-    # Validate API key
-    stored_key = db.query(APIKey).filter(
-        APIKey.customer_id == customer_id,
-        APIKey.api_key == apikey
-    ).first()
+    Authenticate the API key, then record its customer before the route's
+    session opens (read-your-writes, tenant limits).
 
-    if not stored_key:
+    The key is checked with one indexed lookup on a short session of its own,
+    so requests with a wrong key never reach the customer's tenant limits.
+    """
+    # Routes the lookup to the customer's shard
+    set_request_customer(customer_id)
+    with SessionLocal() as db:
+        valid = db.query(APIKey.id).filter(
+            APIKey.api_key == apikey,
+            APIKey.customer_id == customer_id
+        ).first() is not None
+    if not valid:
         raise HTTPException(
             status_code=401,
             detail="Invalid API key or customer ID"
         )
+    return customer_id
+
+
+@router.get("/inventory")
+@tenant_limit("export")
+@admission_deadline(10.0)
+async def get_inventory_external(
+    request: Request,
+    customer_id: int = Depends(api_customer),
+    db: Session = Depends(get_read_db)
+):
+    """
+    External API endpoint to get inventory data using API key authentication.
+    Returns inventory data with resolved names for all relationships.
+    Unchanged data is answered with 304 (If-None-Match) or the cached body.
+    """
+    cached = response_cache.lookup(request, db, customer_id, INVENTORY_VIEW_TABLES)
+    if cached is not None:
+        return cached
 
     # Fetch all inventory for this customer
     inventories = db.query(Inventory).filter(
@@ -41,40 +68,7 @@ async def get_inventory_external(
     ).all()
 
     # Serialize with resolved names (flat structure for CSV compatibility)
-    result = [
-        {
-            "id": inv.id,
-            "customer_id": inv.customer_id,
-            "category_name": inv.category.name if inv.category else None,
-            "item_name": inv.item.name if inv.item else None,
-            "item_barcode": inv.item.barcode if inv.item and inv.item.barcode else None,
-            "building_name": inv.building.name if inv.building else None,
-            "area_name": inv.area.name if inv.area else None,
-            "floor_name": inv.floor.name if inv.floor else None,
-            "detail_location_name": inv.detail_location.name if inv.detail_location else None,
-            "barcode": inv.barcode,
-            "status": inv.status,
-            "status_name": {
-                0: "Inactive",
-                1: "Active",
-                2: "Maintenance",
-                3: "Retired",
-                4: "Missing"
-            }.get(inv.status, "Unknown") if inv.status is not None else None,
-            "purchase_date": inv.purchase_date,
-            "last_date": inv.last_date,
-            "ref_client": inv.ref_client,
-            "reg_date": inv.reg_date,
-            "inv_date": inv.inv_date,
-            "comment": inv.comment,
-            "rfid": inv.rfid,
-            "room_assignment": inv.room_assignment,
-            "category_df_immonet": inv.category_df_immonet,
-            "purchase_amount": inv.purchase_amount,
-            "is_throw": inv.is_throw,
-            "operator_name": inv.operator.username if inv.operator else None
-        }
-        for inv in inventories
-    ]
+    result = [export_row(inv) for inv in inventories]
 
-    return result
+    # Plain JSON values only, so skip jsonable_encoder
+    return response_cache.store(request, FastJSONResponse(result))
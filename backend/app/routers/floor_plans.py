@@ -0,0 +1,67 @@
+"""
+Floor-plan image routes (immutable, content-addressed files)
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse
+from sqlalchemy import exists, select
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.config import settings
+from app.database import get_read_db
+from app.models.detail_location import DetailLocation
+from app.services.floor_plans import floor_plan_store, parse_key, VARIANT_WIDTHS
+from app.utils.dependencies import get_current_user
+from app.utils.query_tracker import query_budget
+
+router = APIRouter(prefix="/api/floor-plans", tags=["Floor Plans"])
+
+SIZE_PATTERN = "^(" + "|".join(VARIANT_WIDTHS) + ")$"
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+@router.get("/{key}")
+@query_budget(1)
+async def get_floor_plan(
+    request: Request,
+    key: str,
+    size: Optional[str] = Query(None, pattern=SIZE_PATTERN, description="Variant width; the original when omitted"),
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Floor-plan image by its img_data key
+
+    The content under a key never changes, so responses are cacheable for
+    FLOOR_PLAN_CACHE_SECONDS and marked immutable; the ETag is the content
+    hash (plus the size). Range requests are answered with 206.
+    """
+    if parse_key(key) is None:
+        raise HTTPException(status_code=404, detail="Floor plan not found")
+
+    in_use = db.scalar(select(exists().where(
+        DetailLocation.customer_id == current_user.customerId,
+        DetailLocation.img_data == key
+    )))
+    if not in_use:
+        raise HTTPException(status_code=404, detail="Floor plan not found")
+
+    found = await run_in_threadpool(floor_plan_store.path_for, key, size)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Floor plan not found")
+    path, media_type, etag = found
+
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": f"private, max-age={settings.FLOOR_PLAN_CACHE_SECONDS}, immutable",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(path, media_type=media_type, headers=headers)
@@ -1,14 +1,16 @@
 """
 Inventory management routes
 """
-from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from sqlalchemy import func, desc, case
 from typing import Optional, List, Dict, Any
 from datetime import date
 import logging
 
-from app.database import get_db
+from app.config import settings
+from app.database import get_db, get_read_db
 from app.models.inventory import Inventory
 from app.models.item import Item
 from app.models.category import Category
@@ -19,10 +21,22 @@ from app.models.detail_location import DetailLocation
 from app.models.operator import Operator
 from app.schemas.inventory import (
     InventoryResponse, InventoryCreate, InventoryUpdate,
-    InventoryStatusSummary, InventoryMoveRequest
+    InventoryStatusSummary, InventoryMoveRequest, InventoryBulkMoveRequest
 )
 from app.schemas.common import SuccessResponse
+from app.services.bulk_inventory import (
+    insert_inventories, move_inventories as move_inventory_set
+)
+from app.services.change_tracking import INVENTORY_VIEW_TABLES
+from app.services.duplicates import duplicate_registry
+from app.services.inventory_export import write_export
+from app.services.inventory_import import InventoryImporter, iter_csv_rows, iter_xlsx_rows
+from app.services.jobs import JobQueueFull, job_runner, job_to_dict
 from app.utils.dependencies import get_current_user
+from app.utils.query_tracker import query_budget
+from app.utils.response_cache import response_cache
+from app.utils.responses import FastJSONResponse
+from app.utils.tenant_limits import tenant_limit
 
 logger = logging.getLogger(__name__)
 
@@ -30,7 +44,9 @@ router = APIRouter(prefix="/api/inventories", tags=["Inventories"])
 
 
 @router.get("", response_model=dict)
+@tenant_limit("heavy_read")
 async def get_inventories(
+    request: Request,
     building_id: Optional[int] = Query(None),
     area_id: Optional[int] = Query(None),
     floor_id: Optional[int] = Query(None),
@@ -39,10 +55,14 @@ async def get_inventories(
     page: int = Query(1, ge=1),
     pageSize: int = Query(50, ge=1, le=100),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get inventories with filtering and pagination"""
 
+    cached = response_cache.lookup(request, db, current_user.customerId, INVENTORY_VIEW_TABLES)
+    if cached is not None:
+        return cached
+
     # Build query
     query = db.query(Inventory).filter(
         Inventory.customer_id == current_user.customerId
@@ -67,7 +87,8 @@ async def get_inventories(
     skip = (page - 1) * pageSize
     inventories = query.order_by(desc(Inventory.id)).offset(skip).limit(pageSize).all()
 
-    return {
+    # Plain JSON values only, so skip jsonable_encoder
+    return response_cache.store(request, FastJSONResponse({
         "success": True,
         "inventories": [
             {
@@ -127,7 +148,7 @@ async def get_inventories(
             "total": total,
             "totalPages": (total + pageSize - 1) // pageSize
         }
-    }
+    }))
 
 
 @router.post("", response_model=SuccessResponse)
@@ -136,118 +157,247 @@ async def create_inventories(
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Create inventory records"""
+    """
+    Create inventory records
+
+    Optional request fields:
+        chunkSize: Rows per executemany INSERT (defaults to BULK_INSERT_CHUNK_SIZE)
+        returnIds: Include the new inventory ids in the response
+    """
 
     items = request.get("items", [])
     location_data = request.get("locationData", {})
+    return_ids = bool(request.get("returnIds", False))
 
     if not items:
         raise HTTPException(status_code=400, detail="Items are required")
 
-    current_date = str(date.today())
+    try:
+        chunk_size = int(request.get("chunkSize") or settings.BULK_INSERT_CHUNK_SIZE)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="chunkSize must be an integer")
+    if not 1 <= chunk_size <= 10000:
+        raise HTTPException(status_code=400, detail="chunkSize must be between 1 and 10000")
 
-    # Get item barcodes
-    item_ids = [item["id"] for item in items]
-    items_with_barcodes = db.query(Item).filter(
-        Item.id.in_(item_ids),
-        Item.customer_id == current_user.customerId
-    ).all()
+    current_date = str(date.today())
 
-    barcode_map = {item.id: item.barcode for item in items_with_barcodes}
-
-    # Create inventory records
-    inventory_records = []
-    for item in items:
-        inventory = Inventory(
-            customer_id=current_user.customerId,
-            item_id=item["id"],
-            category_id=item.get("category_id"),
-            building_id=location_data.get("buildingId"),
-            area_id=location_data.get("areaId"),
-            floor_id=location_data.get("floorId"),
-            detail_location_id=location_data.get("detailLocationId"),
-            barcode=barcode_map.get(item["id"]),
-            reg_date=current_date,
-            inv_date=current_date,
-            status=1
+    # Get item barcodes (only items belonging to this customer)
+    item_ids = list({item["id"] for item in items})
+    barcode_map = {}
+    for start in range(0, len(item_ids), chunk_size):
+        barcode_map.update(
+            db.query(Item.id, Item.barcode).filter(
+                Item.id.in_(item_ids[start:start + chunk_size]),
+                Item.customer_id == current_user.customerId
+            ).all()
         )
-        inventory_records.append(inventory)
 
-    db.add_all(inventory_records)
+    skipped_item_ids = [item_id for item_id in item_ids if item_id not in barcode_map]
+
+    rows = [
+        {
+            "item_id": item["id"],
+            "category_id": item.get("category_id"),
+            "building_id": location_data.get("buildingId"),
+            "area_id": location_data.get("areaId"),
+            "floor_id": location_data.get("floorId"),
+            "detail_location_id": location_data.get("detailLocationId"),
+            "barcode": barcode_map[item["id"]],
+            "reg_date": current_date,
+            "inv_date": current_date,
+            "status": 1,
+        }
+        for item in items
+        if item["id"] in barcode_map
+    ]
+
+    created, new_ids = insert_inventories(
+        db, current_user.customerId, rows, chunk_size=chunk_size, return_ids=return_ids
+    )
     db.commit()
 
-    logger.info(f"Created {len(inventory_records)} inventory records")
+    logger.info(f"Created {created} inventory records ({len(skipped_item_ids)} foreign item ids skipped)")
+
+    data = {"createdCount": created, "skippedItemIds": skipped_item_ids}
+    if return_ids:
+        data["ids"] = new_ids
 
     return SuccessResponse(
         success=True,
-        message=f"Successfully created {len(inventory_records)} inventory records"
+        message=f"Successfully created {created} inventory records",
+        data=data
+    )
+
+
+def _job_accepted(job) -> FastJSONResponse:
+    """202 pointing at the job's status URL"""
+    return FastJSONResponse(
+        status_code=202,
+        content={"success": True, "job": job_to_dict(job)},
+        headers={"Location": f"/api/jobs/{job.id}"},
+    )
+
+
+@router.post("/export", status_code=202)
+async def export_inventories(
+    current_user = Depends(get_current_user)
+):
+    """
+    Export all inventories with resolved names as a background job
+
+    Answers 202 with the job id; the JSON file is downloaded from
+    ``/api/jobs/{id}/result`` once the job has succeeded.
+    """
+    customer_id = current_user.customerId
+
+    def run_export(ctx):
+        with ctx.session(read_only=True) as job_db, open(ctx.output_path(".json"), "wb") as out:
+            rows = write_export(job_db, customer_id, out, on_progress=ctx.progress)
+        return {"rows": rows}
+
+    job = job_runner.submit("export", customer_id, run_export)
+    return _job_accepted(job)
+
+
+@router.post("/import")
+@tenant_limit("bulk_write")
+async def import_inventories(
+    file: UploadFile = File(..., description="CSV or XLSX file with one inventory per row"),
+    createMissing: bool = Query(False, description="Create unknown categories, items and locations"),
+    batchSize: Optional[int] = Query(None, ge=100, le=50000),
+    background: bool = Query(False, description="Run as a background job and answer 202 with its id"),
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Bulk import inventories from a CSV or XLSX upload"""
+
+    filename = (file.filename or "").lower()
+    if filename.endswith(".xlsx"):
+        reader, suffix = iter_xlsx_rows, ".xlsx"
+    elif filename.endswith(".csv") or file.content_type in ("text/csv", "application/csv"):
+        reader, suffix = iter_csv_rows, ".csv"
+    else:
+        raise HTTPException(status_code=400, detail="Only .csv and .xlsx files are supported")
+
+    if background:
+        # The upload is closed with the request; the job reads a staged copy
+        staged = await run_in_threadpool(job_runner.stage_upload, file.file, suffix)
+        customer_id = current_user.customerId
+
+        def run_import(ctx):
+            def report_progress(report):
+                ctx.progress(
+                    report.rows_read,
+                    message=f"{report.inserted} inserted, {report.failed} failed",
+                )
+
+            with ctx.session() as job_db, open(staged, "rb") as source:
+                importer = InventoryImporter(
+                    job_db,
+                    customer_id,
+                    create_missing=createMissing,
+                    batch_size=batchSize,
+                    on_progress=report_progress,
+                )
+                return importer.run(reader(source)).to_dict()
+
+        job = job_runner.submit("import", customer_id, run_import, input_path=staged)
+        return _job_accepted(job)
+
+    importer = InventoryImporter(
+        db,
+        current_user.customerId,
+        create_missing=createMissing,
+        batch_size=batchSize,
+    )
+    report = await run_in_threadpool(importer.run, reader(file.file))
+
+    logger.info(
+        f"Inventory import for customer {current_user.customerId}: "
+        f"{report.inserted} inserted, {report.failed} failed"
     )
 
+    return {
+        "success": report.inserted > 0 or report.failed == 0,
+        "message": f"Imported {report.inserted} of {report.rows_read} rows",
+        **report.to_dict()
+    }
+
 
 # IMPORTANT: /move must be defined BEFORE /{inventory_id} to avoid route matching issues
 @router.patch("/move")
+@tenant_limit("bulk_write")
 async def move_inventories(
-    request: Request,
+    request: InventoryBulkMoveRequest,
+    background: bool = Query(False, description="Run as a background job and answer 202 with its id"),
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    """Move multiple inventories to new location"""
-
-    try:
-        # Parse JSON body manually
-        body = await request.json()
+    """
+    Move inventories to a new location
 
-        logger.info(f"Move request received: {body}")
-        logger.info(f"User customer_id: {current_user.customerId}")
+    The inventories are selected either by ``inventoryIds`` or by ``filter``
+    (any of buildingId, areaId, floorId, detailLocationId, categoryId, itemId,
+    status). Optional ``chunkSize`` sets the rows per UPDATE and ``audit``
+    records one compact audit line per chunk. With ``?background=true`` the
+    move runs as a job and the response is 202 with the job id.
+    """
 
-        inventory_ids = body.get("inventoryIds", [])
-        location_data = body.get("locationData", {})
-
-        logger.info(f"Inventory IDs: {inventory_ids}")
-        logger.info(f"Location data: {location_data}")
+    try:
+        inventory_ids = request.inventoryIds
+        filters = request.filter.dict(exclude_unset=True) if request.filter is not None else None
+        location_data = request.locationData or {}
 
-        if not inventory_ids:
-            logger.warning("No inventory IDs provided in request")
-            raise HTTPException(status_code=400, detail="No inventory IDs provided")
+        if filters is not None and not filters:
+            raise HTTPException(status_code=400, detail="filter must be a non-empty object")
 
-        if not isinstance(inventory_ids, list):
-            logger.error(f"inventoryIds is not a list: {type(inventory_ids)}")
-            raise HTTPException(status_code=400, detail="inventoryIds must be a list")
+        if not inventory_ids and not filters:
+            raise HTTPException(status_code=400, detail="No inventory IDs or filter provided")
 
-        inventories = db.query(Inventory).filter(
-            Inventory.id.in_(inventory_ids),
-            Inventory.customer_id == current_user.customerId
-        ).all()
+        chunk_size = request.chunkSize or settings.BULK_INSERT_CHUNK_SIZE
 
-        logger.info(f"Found {len(inventories)} inventories to move (requested {len(inventory_ids)})")
+        move_options = dict(
+            inventory_ids=inventory_ids or None,
+            filters=filters,
+            chunk_size=max(1, min(chunk_size, 10000)),
+            audit=request.audit,
+        )
 
-        if not inventories:
-            logger.warning(f"No inventories found for IDs {inventory_ids} and customer {current_user.customerId}")
-            raise HTTPException(status_code=404, detail="No inventories found with the provided IDs")
+        if background:
+            customer_id = current_user.customerId
+            total = len(set(inventory_ids)) if inventory_ids else None
 
-        # Update location for all
-        for inv in inventories:
-            old_location = f"Building:{inv.building_id}, Area:{inv.area_id}, Floor:{inv.floor_id}, Detail:{inv.detail_location_id}"
+            def run_move(ctx):
+                with ctx.session() as job_db:
+                    return move_inventory_set(
+                        job_db,
+                        customer_id,
+                        location_data,
+                        on_progress=lambda matched: ctx.progress(matched, total),
+                        **move_options,
+                    )
 
-            inv.building_id = location_data.get("buildingId")
-            inv.area_id = location_data.get("areaId")
-            inv.floor_id = location_data.get("floorId")
-            inv.detail_location_id = location_data.get("detailLocationId")
+            return _job_accepted(job_runner.submit("move", customer_id, run_move))
 
-            new_location = f"Building:{inv.building_id}, Area:{inv.area_id}, Floor:{inv.floor_id}, Detail:{inv.detail_location_id}"
-            logger.info(f"Inventory {inv.id}: {old_location} -> {new_location}")
+        result = move_inventory_set(db, current_user.customerId, location_data, **move_options)
 
-        db.commit()
+        if not result["matchedCount"]:
+            raise HTTPException(status_code=404, detail="No inventories found matching the request")
 
-        logger.info(f"Successfully moved {len(inventories)} inventory items")
+        logger.info(
+            f"Moved {result['matchedCount']} inventories for customer {current_user.customerId} "
+            f"in {result['chunks']} chunk(s)"
+        )
 
         return {
             "success": True,
-            "message": f"Successfully moved {len(inventories)} inventory items",
-            "updatedCount": len(inventories)
+            "message": f"Successfully moved {result['matchedCount']} inventory items",
+            **result
         }
     except HTTPException as http_ex:
-        logger.error(f"HTTP Exception in move_inventories: {http_ex.detail}")
+        logger.warning(f"Move request rejected: {http_ex.detail}")
+        raise
+    except JobQueueFull:
         raise
     except Exception as e:
         logger.error(f"Unexpected error moving inventories: {str(e)}", exc_info=True)
@@ -272,10 +422,18 @@ async def update_inventory(
     if not inventory:
         raise HTTPException(status_code=404, detail="Inventory not found")
 
+    previous_barcode = inventory.barcode
+
     # Update fields
     for field, value in request.dict(exclude_unset=True).items():
         setattr(inventory, field, value)
 
+    if inventory.barcode != previous_barcode:
+        duplicate_registry.apply_changes(
+            db, current_user.customerId,
+            added=[inventory.barcode], removed=[previous_barcode]
+        )
+
     db.commit()
 
     return SuccessResponse(success=True, message="Inventory updated successfully")
@@ -298,15 +456,17 @@ async def delete_inventory(
         raise HTTPException(status_code=404, detail="Inventory not found")
 
     db.delete(inventory)
+    duplicate_registry.apply_changes(db, current_user.customerId, removed=[inventory.barcode])
     db.commit()
 
     return SuccessResponse(success=True, message="Inventory deleted successfully")
 
 
 @router.get("/status-summary")
+@query_budget(1)
 async def get_status_summary(
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get inventory status summary"""
 
@@ -336,9 +496,10 @@ async def get_status_summary(
 
 
 @router.get("/count")
+@query_budget(1)
 async def get_inventory_count(
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get total inventory count"""
 
@@ -353,7 +514,7 @@ async def get_inventory_count(
 async def get_recent_activity(
     limit: int = Query(10, le=50),
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get recent inventory activity"""
 
@@ -380,9 +541,10 @@ async def get_recent_activity(
 
 
 @router.get("/location-analytics")
+@tenant_limit("heavy_read")
 async def get_location_analytics(
     current_user = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_read_db)
 ):
     """Get location-based analytics"""
     from sqlalchemy import func
@@ -2,15 +2,20 @@
 Item and Category routes
 """
 from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import Optional
 
 from app.database import get_db
 from app.models.item import Item
 from app.models.category import Category
-from app.schemas.item import ItemCreate, ItemUpdate, ItemResponse, CategoryCreate, CategoryUpdate, CategoryResponse
+from app.schemas.item import (
+    ItemCreate, ItemUpdate, ItemResponse, ItemBulkUpsertRequest, CategoryCreate, CategoryUpdate, CategoryResponse
+)
+from app.services.bulk_items import barcode_conflict, item_barcode_index, upsert_items
 from app.schemas.common import SuccessResponse
 from app.utils.dependencies import get_current_user
+from app.utils.tenant_limits import tenant_limit
 
 router_items = APIRouter(prefix="/api/items", tags=["Items"])
 router_categories = APIRouter(prefix="/api/categories", tags=["Categories"])
@@ -58,24 +63,23 @@ async def create_item(
 ):
     """Create new item"""
     try:
-        # Check barcode uniqueness
-        existing = db.query(Item).filter(
-            Item.customer_id == current_user.customerId,
-            Item.barcode == request.barcode
-        ).first()
-
-        if existing:
-            raise HTTPException(status_code=409, detail="Barcode already exists")
-
         # Create new item using Pydantic model
         item_data = request.model_dump()
+        item_data["barcode"] = item_data.get("barcode") or None
         new_item = Item(
             customer_id=current_user.customerId,
             **item_data
         )
 
+        # Barcode uniqueness is enforced by uq_customer_item_barcode
+        if barcode_conflict(db, current_user.customerId, new_item.barcode):
+            raise HTTPException(status_code=409, detail="Barcode already exists")
         db.add(new_item)
-        db.commit()
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Barcode already exists")
         db.refresh(new_item)
 
         return {
@@ -100,6 +104,49 @@ async def create_item(
         raise HTTPException(status_code=500, detail=f"Error creating item: {str(e)}")
 
 
+@router_items.post("/bulk", response_model=dict)
+@tenant_limit("bulk_write")
+async def bulk_upsert_items(
+    request: ItemBulkUpsertRequest,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Create or update items by barcode in one transaction
+
+    Existing barcodes are updated (``onConflict=update``) or left untouched
+    and reported in ``conflicts`` (``onConflict=skip``). Rows without a
+    name or barcode, or repeating a barcode of the same request, are listed
+    in ``rejected`` with their index. Refused with 503 while the customer's
+    database lacks the unique barcode index.
+    """
+    if not item_barcode_index.confirmed(current_user.customerId):
+        raise HTTPException(
+            status_code=503,
+            detail="Bulk item upsert is unavailable until item barcodes are unique in this database"
+        )
+    try:
+        result = upsert_items(
+            db,
+            current_user.customerId,
+            [item.model_dump() for item in request.items],
+            on_conflict=request.onConflict,
+        )
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error upserting items: {str(e)}")
+
+    return {
+        "success": not result["rejected"],
+        "message": (
+            f"{len(result['created'])} created, {len(result['updated'])} updated, "
+            f"{len(result['conflicts'])} conflicts, {len(result['rejected'])} rejected"
+        ),
+        **result
+    }
+
+
 @router_items.put("", response_model=dict)
 async def update_item(
     request: ItemUpdate,
@@ -119,23 +166,22 @@ async def update_item(
         if not item:
             raise HTTPException(status_code=404, detail="Item not found")
 
-        # Check barcode uniqueness (excluding current item)
-        if request.barcode:
-            existing = db.query(Item).filter(
-                Item.customer_id == current_user.customerId,
-                Item.barcode == request.barcode,
-                Item.id != request.id
-            ).first()
-
-            if existing:
-                raise HTTPException(status_code=409, detail="Barcode already exists")
-
         # Update only provided fields
         update_data = request.model_dump(exclude_unset=True, exclude={'id'})
+        if "barcode" in update_data:
+            update_data["barcode"] = update_data["barcode"] or None
         for field, value in update_data.items():
             setattr(item, field, value)
 
-        db.commit()
+        # Barcode uniqueness is enforced by uq_customer_item_barcode
+        if "barcode" in update_data and barcode_conflict(db, current_user.customerId, item.barcode, item.id):
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Barcode already exists")
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            raise HTTPException(status_code=409, detail="Barcode already exists")
         db.refresh(item)
 
         return {
@@ -0,0 +1,92 @@
+"""
+Background job routes (status, result and cancellation)
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse
+import logging
+
+from app.services.jobs import job_runner, job_to_dict, load_result
+from app.utils.dependencies import get_current_user
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/jobs", tags=["Jobs"])
+
+
+@router.get("")
+async def get_jobs(
+    limit: int = Query(50, ge=1, le=200),
+    current_user = Depends(get_current_user)
+):
+    """List the customer's most recent jobs"""
+    jobs = job_runner.recent(current_user.customerId, limit=limit)
+    return {
+        "success": True,
+        "jobs": [job_to_dict(job) for job in jobs]
+    }
+
+
+@router.get("/{job_id}")
+async def get_job(
+    job_id: str,
+    current_user = Depends(get_current_user)
+):
+    """Status and progress of a job"""
+    job = job_runner.get(current_user.customerId, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    return {
+        "success": True,
+        "job": job_to_dict(job)
+    }
+
+
+@router.get("/{job_id}/result")
+async def get_job_result(
+    job_id: str,
+    current_user = Depends(get_current_user)
+):
+    """Result of a finished job (JSON summary, or the output file for exports)"""
+    job = job_runner.get(current_user.customerId, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job.status in ("queued", "running"):
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+    if job.status != "succeeded":
+        raise HTTPException(status_code=410, detail=f"Job {job.status}: {job.error or 'no result'}")
+
+    if job.result_file:
+        path = job_runner.result_path(job)
+        if path is None:
+            raise HTTPException(status_code=410, detail="Job output has expired")
+        return FileResponse(
+            path,
+            media_type="application/json",
+            filename=f"{job.kind}-{job.id}.json",
+        )
+
+    return {
+        "success": True,
+        "job": job_to_dict(job),
+        "result": load_result(job)
+    }
+
+
+@router.post("/{job_id}/cancel", status_code=202)
+async def cancel_job(
+    job_id: str,
+    current_user = Depends(get_current_user)
+):
+    """Cancel a queued job, or ask a running job to stop after its current batch"""
+    job = job_runner.cancel(current_user.customerId, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    logger.info(f"Cancellation requested for job {job_id} of customer {current_user.customerId}")
+
+    return {
+        "success": True,
+        "job": job_to_dict(job)
+    }
@@ -1,9 +1,11 @@
 """
 Location management routes (Buildings, Areas, Floors, DetailLocations)
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import Optional
+import logging
 
 from app.database import get_db
 from app.models.building import Building
@@ -17,8 +19,11 @@ from app.schemas.location import (
     FloorCreate, FloorUpdate,
     DetailLocationCreate, DetailLocationUpdate
 )
+from app.services.floor_plans import floor_plan_store, FloorPlanError
 from app.utils.dependencies import get_current_user
 
+logger = logging.getLogger(__name__)
+
 # Create routers for each location type
 router_buildings = APIRouter(prefix="/api/buildings", tags=["Buildings"])
 router_areas = APIRouter(prefix="/api/areas", tags=["Areas"])
@@ -471,6 +476,45 @@ async def delete_detail_location(
     return SuccessResponse(success=True, message="Detail location deleted successfully")
 
 
+@router_detail_locations.post("/{location_id}/floor-plan")
+async def upload_floor_plan(
+    location_id: int,
+    file: UploadFile = File(..., description="PNG, JPEG or WebP floor plan"),
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Upload the floor plan of a detail location
+
+    The image is stored under its content hash, which becomes the location's
+    img_data; fetch it from /api/floor-plans/{img_data}?size=thumb|small|medium|large.
+    """
+    location = db.query(DetailLocation).filter(
+        DetailLocation.id == location_id,
+        DetailLocation.customer_id == current_user.customerId
+    ).first()
+
+    if not location:
+        raise HTTPException(status_code=404, detail="Detail location not found")
+
+    try:
+        key = await run_in_threadpool(floor_plan_store.save, file.file)
+    except FloorPlanError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    location.img_data = key
+    db.commit()
+
+    logger.info(f"Floor plan {key} set on detail location {location_id} of customer {current_user.customerId}")
+
+    return {
+        "success": True,
+        "message": "Floor plan uploaded successfully",
+        "img_data": key,
+        "url": f"/api/floor-plans/{key}"
+    }
+
+
 @router_detail_locations.get("/count")
 async def get_locations_count(
     current_user = Depends(get_current_user),
@@ -0,0 +1,30 @@
+"""
+Prometheus metrics endpoint
+"""
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+
+from app.config import settings
+from app.utils.auth import extract_token_from_header
+from app.utils.metrics import metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus text exposition, aggregated across workers"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+    if settings.METRICS_TOKEN:
+        token = extract_token_from_header(authorization) or ""
+        if not secrets.compare_digest(token, settings.METRICS_TOKEN):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+
+    body = await run_in_threadpool(metrics.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
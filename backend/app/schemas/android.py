@@ -27,7 +27,7 @@ class AndroidFloor(BaseModel):
 class AndroidDetailLocation(BaseModel):
     id: int
     name: str
-    img_data: Optional[str] = None
+    img_data: Optional[str] = None  # Floor-plan key; image at /api/floor-plans/{img_data}?size=...
 
 
 # --- Category / Item ---
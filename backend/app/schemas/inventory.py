@@ -50,6 +50,29 @@ class InventoryMoveRequest(BaseModel):
     newLocation: dict  # {buildingId, areaId, floorId, detailLocationId}
 
 
+class InventoryMoveFilter(BaseModel):
+    """Inventories selected by a bulk move (all given fields must match)"""
+    buildingId: Optional[int] = None
+    areaId: Optional[int] = None
+    floorId: Optional[int] = None
+    detailLocationId: Optional[int] = None
+    categoryId: Optional[int] = None
+    itemId: Optional[int] = None
+    status: Optional[int] = None
+
+    class Config:
+        extra = "forbid"
+
+
+class InventoryBulkMoveRequest(BaseModel):
+    """Move inventories selected by id or by filter"""
+    inventoryIds: Optional[List[int]] = None
+    filter: Optional[InventoryMoveFilter] = None
+    locationData: Optional[dict] = None  # {buildingId, areaId, floorId, detailLocationId}
+    chunkSize: Optional[int] = None
+    audit: bool = False
+
+
 class InventoryResponse(InventoryBase):
     """Inventory response schema"""
     id: int
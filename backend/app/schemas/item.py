@@ -1,8 +1,8 @@
 """
 Item and Category schemas
 """
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
 
 # Category schemas
@@ -44,6 +44,12 @@ class ItemCreate(ItemBase):
     pass
 
 
+class ItemBulkUpsertRequest(BaseModel):
+    """Bulk item upsert keyed by barcode"""
+    items: List[ItemBase] = Field(..., max_length=10000)
+    onConflict: Literal["update", "skip"] = "update"  # Existing barcodes: overwrite name/category, or leave as-is
+
+
 class ItemUpdate(BaseModel):
     """Update item schema"""
     id: Optional[int] = None
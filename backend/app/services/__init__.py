@@ -2,5 +2,6 @@
 Business logic services
 """
 from app.services.pulsepoint import PulsePointService
+from app.services.duplicates import DuplicateRegistry
 
-__all__ = ["PulsePointService"]
+__all__ = ["PulsePointService", "DuplicateRegistry"]
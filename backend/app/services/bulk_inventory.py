@@ -0,0 +1,231 @@
+"""
+Bulk inventory write helpers
+
+Core-level executemany INSERTs for inventory rows, bypassing per-object ORM
+unit-of-work bookkeeping.
+"""
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select, text, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.inventory import Inventory
+from app.services.change_tracking import change_tracker
+from app.services.duplicates import duplicate_registry
+
+logger = logging.getLogger(__name__)
+audit_logger = logging.getLogger("app.audit.inventory_move")
+
+# Move filter keys (request camelCase) -> inventory columns
+MOVE_FILTER_COLUMNS = {
+    "buildingId": "building_id",
+    "areaId": "area_id",
+    "floorId": "floor_id",
+    "detailLocationId": "detail_location_id",
+    "categoryId": "category_id",
+    "itemId": "item_id",
+    "status": "status",
+}
+
+# Columns a bulk row may set; every row is normalized to this key set so the
+# driver can batch the whole chunk into one multi-row INSERT
+INVENTORY_COLUMNS = [
+    column.name for column in Inventory.__table__.columns
+    if column.name not in ("id", "customer_id")
+]
+
+
+def _recover_ids(db: Session, table, chunk: List[Dict[str, Any]]) -> List[int]:
+    """
+    Insert one chunk and return the generated ids in parameter order.
+
+    Uses ``INSERT ... RETURNING`` where the dialect supports it with
+    executemany (SQLite, PostgreSQL), or on a multi-row INSERT (MariaDB).
+    Auto-increment values of one statement increase in row order, so the
+    returned ids sorted ascending are in parameter order.
+
+    MySQL has no RETURNING. A multi-row INSERT gets consecutive ids (stepped
+    by ``auto_increment_increment``) from ``LAST_INSERT_ID()`` only with
+    ``innodb_autoinc_lock_mode`` 0 or 1; under interleaved mode (2) other
+    statements may take ids in between, so rows are inserted one by one
+    and each id is read from its own statement.
+    """
+    dialect = db.get_bind(Inventory).dialect
+
+    if dialect.insert_executemany_returning_sort_by_parameter_order:
+        result = db.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True),
+            chunk,
+        )
+        return list(result.scalars())
+
+    if dialect.insert_returning:
+        result = db.execute(insert(table).values(chunk).returning(table.c.id))
+        return sorted(result.scalars())
+
+    step, lock_mode = 1, 1
+    if dialect.name == "mysql":
+        step, lock_mode = db.execute(
+            text("SELECT @@auto_increment_increment, @@innodb_autoinc_lock_mode")
+        ).one()
+
+    if lock_mode >= 2:
+        return [db.execute(insert(table).values(row)).lastrowid for row in chunk]
+
+    result = db.execute(insert(table).values(chunk))
+    first_id = result.lastrowid
+    return [first_id + i * (step or 1) for i in range(len(chunk))]
+
+
+def insert_inventories(
+    db: Session,
+    customer_id: int,
+    rows: List[Dict[str, Any]],
+    chunk_size: Optional[int] = None,
+    return_ids: bool = False,
+) -> Tuple[int, List[int]]:
+    """
+    Insert inventory rows for a customer in executemany chunks.
+
+    The duplicate-barcode registry is updated in the same transaction; the
+    caller commits.
+
+    Args:
+        db: Database session
+        customer_id: Customer owning the new inventories
+        rows: Column -> value dicts (missing columns are inserted as NULL)
+        chunk_size: Rows per INSERT (defaults to BULK_INSERT_CHUNK_SIZE)
+        return_ids: Recover the generated ids (RETURNING or last-insert-id)
+
+    Returns:
+        Tuple of (inserted row count, new ids in row order or [] if not requested)
+    """
+    chunk_size = chunk_size or settings.BULK_INSERT_CHUNK_SIZE
+    table = Inventory.__table__
+    ids: List[int] = []
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = [
+            {"customer_id": customer_id, **{column: row.get(column) for column in INVENTORY_COLUMNS}}
+            for row in rows[start:start + chunk_size]
+        ]
+        if return_ids:
+            ids.extend(_recover_ids(db, table, chunk))
+        else:
+            db.execute(insert(table), chunk)
+
+    duplicate_registry.apply_changes(db, customer_id, added=[row.get("barcode") for row in rows])
+    if rows:
+        change_tracker.note_change(db, customer_id, Inventory.__tablename__, delta=len(rows))
+
+    return len(rows), ids
+
+
+def move_inventories(
+    db: Session,
+    customer_id: int,
+    location: Dict[str, Optional[int]],
+    inventory_ids: Optional[List[int]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    chunk_size: Optional[int] = None,
+    audit: bool = False,
+    on_progress: Optional[Callable[[int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    Move a set of inventories to a new location with chunked UPDATEs.
+
+    The set is either an explicit id list or a filter over MOVE_FILTER_COLUMNS.
+    Ids are walked in ascending keyset chunks; each chunk is one UPDATE and one
+    commit so row locks are held briefly.
+
+    Args:
+        db: Database session
+        customer_id: Customer owning the inventories
+        location: Target {buildingId, areaId, floorId, detailLocationId}
+        inventory_ids: Explicit inventory ids to move
+        filters: Filter selecting the inventories to move
+        chunk_size: Rows per UPDATE (defaults to BULK_INSERT_CHUNK_SIZE)
+        audit: Emit one compact audit record per chunk
+        on_progress: Called with the number of rows matched so far after each committed chunk
+
+    Returns:
+        Dict with matchedCount, updatedCount, chunks and (with audit) auditRecords
+    """
+    chunk_size = chunk_size or settings.BULK_INSERT_CHUNK_SIZE
+    table = Inventory.__table__
+    values = {
+        "building_id": location.get("buildingId"),
+        "area_id": location.get("areaId"),
+        "floor_id": location.get("floorId"),
+        "detail_location_id": location.get("detailLocationId"),
+    }
+    moved_to = {key: location.get(key) for key in ("buildingId", "areaId", "floorId", "detailLocationId")}
+
+    criteria = [table.c.customer_id == customer_id]
+    for key, value in (filters or {}).items():
+        criteria.append(table.c[MOVE_FILTER_COLUMNS[key]] == value)
+
+    explicit_ids = sorted(set(inventory_ids)) if inventory_ids is not None else None
+    matched = updated = chunks = 0
+    audit_records: List[Dict[str, Any]] = []
+    last_id = 0
+
+    while True:
+        if explicit_ids is not None:
+            candidates = explicit_ids[chunks * chunk_size:(chunks + 1) * chunk_size]
+            if not candidates:
+                break
+            chunk_ids = list(db.execute(
+                select(table.c.id).where(table.c.id.in_(candidates), *criteria)
+            ).scalars())
+        else:
+            chunk_ids = list(db.execute(
+                select(table.c.id)
+                .where(table.c.id > last_id, *criteria)
+                .order_by(table.c.id)
+                .limit(chunk_size)
+            ).scalars())
+            if not chunk_ids:
+                break
+            last_id = chunk_ids[-1]
+
+        chunks += 1
+        if not chunk_ids:
+            continue
+
+        result = db.execute(
+            update(table)
+            .where(table.c.id.in_(chunk_ids), table.c.customer_id == customer_id)
+            .values(**values)
+        )
+        change_tracker.note_change(db, customer_id, Inventory.__tablename__)
+        change_tracker.note_event(db, customer_id, {
+            "type": "inventories_moved",
+            "count": result.rowcount,
+            "location": moved_to,
+        })
+        db.commit()
+
+        matched += len(chunk_ids)
+        updated += result.rowcount
+
+        if audit:
+            record = {
+                "firstId": min(chunk_ids),
+                "lastId": max(chunk_ids),
+                "count": len(chunk_ids),
+            }
+            audit_records.append(record)
+            audit_logger.info(
+                f"Moved {record['count']} inventories (ids {record['firstId']}-{record['lastId']}) "
+                f"for customer {customer_id} -> {values}"
+            )
+        if on_progress:
+            on_progress(matched)
+
+    response = {"matchedCount": matched, "updatedCount": updated, "chunks": chunks}
+    if audit:
+        response["auditRecords"] = audit_records
+    return response
@@ -0,0 +1,214 @@
+"""
+Bulk item upsert
+
+Items are keyed by the unique ``(customer_id, barcode)`` index. Each chunk is
+one multi-row INSERT ... ON DUPLICATE KEY UPDATE (ON CONFLICT DO UPDATE on
+SQLite/PostgreSQL), so uniqueness is enforced by the database rather than by
+a SELECT per item, plus one SELECT before and one after to tell created rows
+from updated ones.
+
+Databases created before the index existed get it at startup
+(``item_barcode_index.ensure``) unless they already hold duplicate barcodes.
+Until it is confirmed on a customer's shard, bulk upserts are refused there
+and single item writes check the barcode with a SELECT first
+(``barcode_conflict``).
+"""
+import logging
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import func, inspect, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import shard_engines, shard_router, upsert_statement
+from app.models.item import Item
+from app.services.change_tracking import change_tracker
+
+logger = logging.getLogger(__name__)
+
+MAX_TEXT_LENGTH = 120
+
+UNIQUE_INDEX = "uq_customer_item_barcode"
+
+
+class ItemBarcodeIndex:
+    """Tracks the shards on which uq_customer_item_barcode exists"""
+
+    def __init__(self):
+        self._confirmed: Set[str] = set()
+
+    def ensure(self) -> None:
+        """Check every shard for the index and create it where the data allows"""
+        for shard, engine in shard_engines.items():
+            try:
+                if self._ensure(shard, engine):
+                    self._confirmed.add(shard)
+            except Exception as e:
+                logger.error(f"Could not check {UNIQUE_INDEX} on shard {shard}: {e}")
+
+    def confirmed(self, customer_id: int) -> bool:
+        """Whether the database enforces unique item barcodes for this customer"""
+        return shard_router.shard_for(customer_id) in self._confirmed
+
+    @staticmethod
+    def _exists(engine: Engine) -> bool:
+        inspector = inspect(engine)
+        if not inspector.has_table(Item.__tablename__):
+            return False
+        unique = [*inspector.get_unique_constraints(Item.__tablename__),
+                  *(index for index in inspector.get_indexes(Item.__tablename__) if index.get("unique"))]
+        return any(
+            entry.get("name") == UNIQUE_INDEX or set(entry["column_names"]) == {"customer_id", "barcode"}
+            for entry in unique
+        )
+
+    def _ensure(self, shard: str, engine: Engine) -> bool:
+        if self._exists(engine):
+            return True
+
+        table = Item.__table__
+        with engine.begin() as conn:
+            # Blank barcodes are stored as NULL, which the index allows any number of
+            conn.execute(update(table).where(table.c.barcode == "").values(barcode=None))
+            duplicates = conn.execute(
+                select(table.c.customer_id, table.c.barcode, func.count().label("items"))
+                .where(table.c.barcode.is_not(None))
+                .group_by(table.c.customer_id, table.c.barcode)
+                .having(func.count() > 1)
+                .limit(20)
+            ).all()
+            if duplicates:
+                logger.error(
+                    f"{UNIQUE_INDEX} not created on shard {shard}: item barcodes are not unique "
+                    f"(customer, barcode, items: {[tuple(row) for row in duplicates]}"
+                    f"{', ...' if len(duplicates) == 20 else ''}). Bulk item upserts are refused and "
+                    f"item writes check barcodes with a SELECT until the duplicates are resolved"
+                )
+                return False
+            try:
+                conn.execute(text(f"CREATE UNIQUE INDEX {UNIQUE_INDEX} ON {table.name} (customer_id, barcode)"))
+            except Exception:
+                # Another worker created it first
+                if not self._exists(engine):
+                    raise
+                return True
+        logger.info(f"Created {UNIQUE_INDEX} on shard {shard}")
+        return True
+
+
+def barcode_conflict(db: Session, customer_id: int, barcode: Optional[str], item_id: Optional[int] = None) -> bool:
+    """
+    Whether another item of the customer already has ``barcode``.
+
+    Only queries where the unique index is not confirmed; elsewhere the
+    write itself fails with IntegrityError.
+    """
+    if not barcode or item_barcode_index.confirmed(customer_id):
+        return False
+    query = select(Item.id).where(Item.customer_id == customer_id, Item.barcode == barcode)
+    if item_id is not None:
+        query = query.where(Item.id != item_id)
+    return db.execute(query.limit(1)).first() is not None
+
+
+def _ids_by_barcode(db: Session, customer_id: int, barcodes: List[str]) -> Dict[str, int]:
+    return dict(db.execute(
+        select(Item.barcode, Item.id).where(Item.customer_id == customer_id, Item.barcode.in_(barcodes))
+    ).all())
+
+
+def upsert_items(
+    db: Session,
+    customer_id: int,
+    rows: List[Dict[str, Any]],
+    on_conflict: str = "update",
+    chunk_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Create or update a customer's items by barcode in one transaction.
+
+    The caller commits.
+
+    Args:
+        db: Database session
+        customer_id: Customer owning the items
+        rows: Dicts with name, barcode and optional category_id
+        on_conflict: "update" overwrites the name (and category, when given)
+            of existing barcodes; "skip" leaves them and reports their ids
+            as conflicts
+        chunk_size: Rows per statement (defaults to BULK_INSERT_CHUNK_SIZE)
+
+    Returns:
+        Dict with created, updated and conflicts (item ids) and rejected
+        ({index, barcode, error} for rows that were not written)
+    """
+    chunk_size = chunk_size or settings.BULK_INSERT_CHUNK_SIZE
+    created: List[int] = []
+    updated: List[int] = []
+    conflicts: List[int] = []
+    rejected: List[Dict[str, Any]] = []
+
+    seen: Dict[str, int] = {}
+    valid: List[Dict[str, Any]] = []
+    for index, row in enumerate(rows):
+        barcode = (row.get("barcode") or "").strip()
+        name = (row.get("name") or "").strip()
+        if not barcode or not name:
+            rejected.append({"index": index, "barcode": barcode or None, "error": "name and barcode are required"})
+            continue
+        if len(barcode) > MAX_TEXT_LENGTH or len(name) > MAX_TEXT_LENGTH:
+            rejected.append({"index": index, "barcode": barcode, "error": f"longer than {MAX_TEXT_LENGTH} characters"})
+            continue
+        if barcode in seen:
+            rejected.append({"index": index, "barcode": barcode, "error": f"same barcode as row {seen[barcode]}"})
+            continue
+        seen[barcode] = index
+        valid.append({
+            "customer_id": customer_id,
+            "barcode": barcode,
+            "name": name,
+            "category_id": row.get("category_id"),
+        })
+
+    stmt = upsert_statement(
+        db,
+        Item,
+        ["customer_id", "barcode"],
+        lambda proposed: {
+            "name": proposed.name,
+            # A row without a category keeps the existing one
+            "category_id": func.coalesce(proposed.category_id, Item.category_id),
+        },
+    )
+
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        existing = _ids_by_barcode(db, customer_id, [row["barcode"] for row in chunk])
+
+        if on_conflict == "skip":
+            conflicts.extend(existing[row["barcode"]] for row in chunk if row["barcode"] in existing)
+            chunk = [row for row in chunk if row["barcode"] not in existing]
+            if not chunk:
+                continue
+
+        db.execute(stmt, chunk)
+        ids = _ids_by_barcode(db, customer_id, [row["barcode"] for row in chunk])
+        new_rows = 0
+        for row in chunk:
+            if row["barcode"] in existing:
+                updated.append(ids[row["barcode"]])
+            else:
+                created.append(ids[row["barcode"]])
+                new_rows += 1
+        change_tracker.note_change(db, customer_id, Item.__tablename__, delta=new_rows)
+
+    logger.info(
+        f"Item upsert for customer {customer_id}: {len(created)} created, {len(updated)} updated, "
+        f"{len(conflicts)} conflicts, {len(rejected)} rejected"
+    )
+    return {"created": created, "updated": updated, "conflicts": conflicts, "rejected": rejected}
+
+
+# Global index state (filled at startup)
+item_barcode_index = ItemBarcodeIndex()
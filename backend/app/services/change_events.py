@@ -0,0 +1,167 @@
+"""
+Per-customer change events for live dashboards
+
+Every commit that writes customer data produces one compact event per
+customer (tables written, inserted/deleted row counts, bulk moves), taken
+from the change tracker:
+
+    {"tables": ["inventories"], "deltas": {"inventories": 250}, "events": []}
+
+Events are published on a Redis channel so every worker can forward them to
+the event streams it serves (``GET /api/events``). Without Redis, or when
+publishing fails, they are delivered to the streams of this worker only.
+Streams are asyncio queues; events from request, job and pub/sub threads are
+handed to their event loop with ``call_soon_threadsafe``.
+"""
+import asyncio
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional, Set
+
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+EVENTS_CHANNEL = "scanandgo:changes"
+
+
+class EventStream:
+    """Bounded queue of one client's events (consumed on its event loop)"""
+
+    def __init__(self, customer_id: int, loop: asyncio.AbstractEventLoop):
+        self.customer_id = customer_id
+        self.queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        self.overflowed = False  # Events were dropped; the client must refetch
+        self._loop = loop
+
+    def push(self, event: Optional[Dict[str, Any]]) -> None:
+        """Queue an event from any thread (None closes the stream)"""
+        try:
+            self._loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            # Event loop already closed
+            pass
+
+    def _put(self, event: Optional[Dict[str, Any]]) -> None:
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            metrics.inc("change_events_dropped_total")
+
+
+class ChangeEventBus:
+    """Fan-out of committed changes to event streams (Singleton pattern)"""
+
+    _instance: Optional['ChangeEventBus'] = None
+
+    def __new__(cls) -> 'ChangeEventBus':
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._streams: Dict[int, Set[EventStream]] = {}
+        self._lock = threading.Lock()
+        self._subscriber: Optional[threading.Thread] = None
+        self._pubsub = None
+        self._initialized = True
+
+    def publish(self, changes: Dict[int, Dict[str, Any]]) -> None:
+        """Change listener: broadcast the changes of a committed transaction"""
+        if not settings.EVENTS_ENABLED:
+            return
+
+        client = get_redis()
+        for customer_id, change in changes.items():
+            if client is not None:
+                try:
+                    client.publish(EVENTS_CHANNEL, json.dumps({"customerId": customer_id, **change}))
+                    metrics.inc("change_events_published_total", transport="redis")
+                    if self._subscriber is not None:
+                        # Delivered back to this worker by the subscription
+                        continue
+                except Exception as e:
+                    logger.warning(f"Change event not published to Redis, delivering locally: {e}")
+            metrics.inc("change_events_published_total", transport="local")
+            self._deliver(customer_id, change)
+
+    def open_stream(self, customer_id: int) -> Optional[EventStream]:
+        """
+        Register a stream for the customer on the running event loop.
+
+        Returns:
+            The stream, or None when the customer already has
+            EVENTS_MAX_STREAMS_PER_CUSTOMER streams on this worker
+        """
+        stream = EventStream(customer_id, asyncio.get_running_loop())
+        with self._lock:
+            streams = self._streams.setdefault(customer_id, set())
+            if len(streams) >= settings.EVENTS_MAX_STREAMS_PER_CUSTOMER:
+                return None
+            streams.add(stream)
+            total = sum(len(s) for s in self._streams.values())
+        metrics.set_gauge("change_event_streams", total)
+        return stream
+
+    def close_stream(self, stream: EventStream) -> None:
+        with self._lock:
+            streams = self._streams.get(stream.customer_id)
+            if streams is not None:
+                streams.discard(stream)
+                if not streams:
+                    del self._streams[stream.customer_id]
+            total = sum(len(s) for s in self._streams.values())
+        metrics.set_gauge("change_event_streams", total)
+
+    def start(self) -> None:
+        """Receive other workers' events (no-op without Redis)"""
+        client = get_redis()
+        if client is None or self._subscriber is not None:
+            return
+        try:
+            self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**{EVENTS_CHANNEL: self._on_message})
+        except Exception as e:
+            logger.warning(f"Change events limited to this worker, Redis unavailable: {e}")
+            self._pubsub = None
+            return
+        self._subscriber = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def stop(self) -> None:
+        """Stop the subscription and end every open stream"""
+        if self._subscriber is not None:
+            self._subscriber.stop()
+            self._subscriber = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+        with self._lock:
+            streams = [stream for streams in self._streams.values() for stream in streams]
+        for stream in streams:
+            stream.push(None)
+
+    def _on_message(self, message) -> None:
+        try:
+            change = json.loads(message["data"])
+            customer_id = int(change.pop("customerId"))
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning(f"Malformed change event ignored: {e}")
+            return
+        self._deliver(customer_id, change)
+
+    def _deliver(self, customer_id: int, change: Dict[str, Any]) -> None:
+        with self._lock:
+            streams = list(self._streams.get(customer_id, ()))
+        for stream in streams:
+            stream.push(change)
+
+
+# Global change event bus instance
+change_events = ChangeEventBus()
@@ -0,0 +1,224 @@
+"""
+Per-customer data versions
+
+Every committed write to a customer's rows increments a counter for
+``(customer_id, table)`` in the same transaction. The pairs written are
+collected while the transaction runs and the counters are upserted once,
+right before COMMIT and in sorted order, so the data_versions row locks are
+held only for the commit and concurrent writers take them in the same order.
+Readers compare the counters
+of the tables a response depends on to know whether a cached copy is still
+current, without re-running the query. ORM writes are picked up from the
+session's flush; Core bulk statements call ``note_change`` themselves.
+Commit listeners learn which customers a committed transaction wrote to;
+change listeners also get the tables, row count deltas and any events noted
+with ``note_event`` (see ``app.services.change_events``).
+"""
+import logging
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.database import upsert_statement
+from app.models.data_version import DataVersion
+
+logger = logging.getLogger(__name__)
+
+# Tables an inventory listing with resolved names is built from
+INVENTORY_VIEW_TABLES = (
+    "inventories", "items", "categories", "buildings",
+    "areas", "floors", "detail_locations", "operators",
+)
+
+# Session.info key of the (customer_id, table) pairs already bumped in the open transaction
+_BUMPED_KEY = "data_versions_bumped"
+# Session.info key of the pairs written in the open transaction, bumped before commit
+_PENDING_KEY = "data_versions_pending"
+# Session.info key of the inserted minus deleted rows per (customer_id, table) in the open transaction
+_DELTAS_KEY = "data_versions_deltas"
+# Session.info key of the (customer_id, event) pairs to publish after commit
+_EVENTS_KEY = "data_versions_events"
+
+
+class ChangeTracker:
+    """Maintains the data_versions counters (Singleton pattern)"""
+
+    _instance: Optional['ChangeTracker'] = None
+
+    def __new__(cls) -> 'ChangeTracker':
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._installed = False
+        self._commit_listeners: List[Callable[[Set[int]], None]] = []
+        self._change_listeners: List[Callable[[Dict[int, Dict[str, Any]]], None]] = []
+        self._initialized = True
+
+    def install(self, session_factory: sessionmaker) -> None:
+        """Track ORM writes of every session created by the factory"""
+        if self._installed:
+            return
+        event.listen(session_factory, "after_flush", self._after_flush)
+        event.listen(session_factory, "before_commit", self._before_commit)
+        event.listen(session_factory, "after_commit", self._after_commit)
+        event.listen(session_factory, "after_rollback", self._reset)
+        self._installed = True
+
+    def add_commit_listener(self, listener: Callable[[Set[int]], None]) -> None:
+        """Call ``listener(customer_ids)`` after each commit that wrote customer data"""
+        self._commit_listeners.append(listener)
+
+    def add_change_listener(self, listener: Callable[[Dict[int, Dict[str, Any]]], None]) -> None:
+        """
+        Call ``listener(changes)`` after each commit that wrote customer data.
+
+        ``changes`` maps each customer to ``{"tables": [...], "deltas":
+        {table: rows}, "events": [...]}``; deltas count inserted minus deleted
+        rows where known (UPDATEs only appear in ``tables``).
+        """
+        self._change_listeners.append(listener)
+
+    def note_change(self, db: Session, customer_id: int, *tables: str, delta: int = 0) -> None:
+        """
+        Record a write made outside the ORM unit of work (Core INSERT/UPDATE).
+
+        The version is bumped inside the caller's transaction when it commits,
+        so it commits (or rolls back) together with the data.
+
+        Args:
+            db: Database session of the write
+            customer_id: Customer owning the rows
+            tables: Names of the tables written
+            delta: Rows inserted (negative: deleted) in each table
+        """
+        db.info.setdefault(_PENDING_KEY, set()).update((customer_id, table) for table in tables)
+        if delta:
+            deltas = db.info.setdefault(_DELTAS_KEY, Counter())
+            for table in tables:
+                deltas[(customer_id, table)] += delta
+
+    def note_event(self, db: Session, customer_id: int, event: Dict[str, Any]) -> None:
+        """Attach an event (e.g. a bulk move) to the change published when the transaction commits"""
+        db.info.setdefault(_EVENTS_KEY, []).append((customer_id, event))
+
+    def versions(self, db: Session, customer_id: int, tables: Iterable[str]) -> Dict[str, int]:
+        """
+        Current version of each table for a customer (0 when never written).
+
+        Args:
+            db: Database session
+            customer_id: Customer to look up
+            tables: Table names the caller depends on
+
+        Returns:
+            Dict of table name -> version
+        """
+        tables = list(tables)
+        rows = db.execute(
+            select(DataVersion.table_name, DataVersion.version).where(
+                DataVersion.customer_id == customer_id,
+                DataVersion.table_name.in_(tables),
+            )
+        ).all()
+        current = dict.fromkeys(tables, 0)
+        current.update({name: version for name, version in rows})
+        return current
+
+    def _after_flush(self, session: Session, flush_context) -> None:
+        pending: Set[Tuple[int, str]] = set()
+        deltas: Counter = Counter()
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            customer_id = getattr(obj, "customer_id", None)
+            table = getattr(obj, "__tablename__", None)
+            if customer_id is None or table is None or table == DataVersion.__tablename__:
+                continue
+            if obj in session.new:
+                deltas[(customer_id, table)] += 1
+            elif obj in session.deleted:
+                deltas[(customer_id, table)] -= 1
+            elif not session.is_modified(obj, include_collections=False):
+                continue
+            pending.add((customer_id, table))
+        if pending:
+            session.info.setdefault(_PENDING_KEY, set()).update(pending)
+        if deltas:
+            session.info.setdefault(_DELTAS_KEY, Counter()).update(deltas)
+
+    def _before_commit(self, session: Session) -> None:
+        if session.in_nested_transaction():
+            # Savepoint release; the outer commit bumps
+            return
+        # The commit's own flush runs after this hook, so its writes are collected here first
+        session.flush()
+        pending = session.info.pop(_PENDING_KEY, None)
+        if pending:
+            self._bump(session, pending)
+
+    def _bump(self, db: Session, changes: Set[Tuple[int, str]]) -> None:
+        # One increment per table and transaction is enough to change the version readers see
+        bumped = db.info.setdefault(_BUMPED_KEY, set())
+        changes = changes - bumped
+        if not changes:
+            return
+
+        stmt = upsert_statement(
+            db,
+            DataVersion,
+            ["customer_id", "table_name"],
+            lambda proposed: {"version": DataVersion.version + 1},
+        )
+        db.execute(stmt, [
+            {"customer_id": customer_id, "table_name": table, "version": 1}
+            for customer_id, table in sorted(changes)
+        ])
+        bumped.update(changes)
+
+    def _after_commit(self, session: Session) -> None:
+        bumped = session.info.get(_BUMPED_KEY)
+        deltas = session.info.get(_DELTAS_KEY) or {}
+        events = session.info.get(_EVENTS_KEY) or []
+        self._reset(session)
+        if not bumped:
+            return
+        customer_ids = {customer_id for customer_id, _ in bumped}
+        for listener in self._commit_listeners:
+            try:
+                listener(customer_ids)
+            except Exception as e:
+                logger.error(f"Commit listener {listener!r} failed: {e}")
+
+        if not self._change_listeners:
+            return
+        changes: Dict[int, Dict[str, Any]] = {
+            customer_id: {"tables": [], "deltas": {}, "events": []} for customer_id in customer_ids
+        }
+        for customer_id, table in sorted(bumped):
+            changes[customer_id]["tables"].append(table)
+        for (customer_id, table), delta in deltas.items():
+            if delta and customer_id in changes:
+                changes[customer_id]["deltas"][table] = delta
+        for customer_id, event in events:
+            if customer_id in changes:
+                changes[customer_id]["events"].append(event)
+        for listener in self._change_listeners:
+            try:
+                listener(changes)
+            except Exception as e:
+                logger.error(f"Change listener {listener!r} failed: {e}")
+
+    def _reset(self, session: Session) -> None:
+        session.info.pop(_BUMPED_KEY, None)
+        session.info.pop(_PENDING_KEY, None)
+        session.info.pop(_DELTAS_KEY, None)
+        session.info.pop(_EVENTS_KEY, None)
+
+
+# Global change tracker instance
+change_tracker = ChangeTracker()
@@ -0,0 +1,183 @@
+"""
+Device registry service
+
+Keeps a per-worker ``device_id -> (agents_id, customer_id)`` map so device
+signins are answered from memory. The whole map is loaded with one query and
+reloaded every DEVICE_REGISTRY_TTL_SECONDS; devices registered since the last
+load are fetched individually. Register and delete drop the device from the
+map of this worker and, when Redis is configured, of every other worker
+through a pub/sub channel (the TTL bounds staleness otherwise).
+"""
+import logging
+import threading
+import time
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.agent import Agent
+from app.utils.metrics import metrics
+from app.utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "scanandgo:device-registry"
+
+
+class DeviceEntry(NamedTuple):
+    """Registered device as seen by signin"""
+    agents_id: int
+    device_id: str
+    customer_id: int
+
+
+class DeviceRegistry:
+    """In-process device registry cache (Singleton pattern)"""
+
+    _instance: Optional['DeviceRegistry'] = None
+
+    def __new__(cls) -> 'DeviceRegistry':
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._devices: Dict[str, DeviceEntry] = {}
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._subscriber: Optional[threading.Thread] = None
+        self._pubsub = None
+        self._initialized = True
+
+    def lookup(self, db: Session, device_id: str) -> Optional[DeviceEntry]:
+        """
+        Find the agent a device signs in as.
+
+        Args:
+            db: Database session (used only when the map is stale or the device is new)
+            device_id: Device identifier sent by the app
+
+        Returns:
+            The device entry, or None if the device is not registered
+        """
+        if self._is_stale():
+            with self._load_lock:
+                if self._is_stale():
+                    self._load_all(db)
+
+        entry = self._devices.get(device_id)
+        if entry is not None:
+            metrics.inc("device_registry_lookups_total", result="hit")
+            return entry
+
+        metrics.inc("device_registry_lookups_total", result="miss")
+        # Lowest agents_id wins when a device is registered for several customers
+        row = db.execute(
+            select(Agent.agents_id, Agent.device_id, Agent.customer_id)
+            .where(Agent.device_id == device_id)
+            .order_by(Agent.agents_id)
+            .limit(1)
+        ).first()
+        if row is None:
+            return None
+
+        entry = DeviceEntry(*row)
+        with self._lock:
+            self._devices.setdefault(device_id, entry)
+        return entry
+
+    def register(self, db: Session, device_id: str, customer_id: int) -> DeviceEntry:
+        """
+        Create an agent for a device and commit it.
+
+        Args:
+            db: Database session
+            device_id: Device identifier
+            customer_id: Customer the device belongs to
+
+        Returns:
+            Entry of the new agent
+        """
+        agent = Agent(device_id=device_id, customer_id=customer_id)
+        db.add(agent)
+        db.commit()
+        db.refresh(agent)
+
+        # Another customer may already own the device id; let the next lookup decide
+        self.invalidate(device_id)
+        return DeviceEntry(agent.agents_id, agent.device_id, agent.customer_id)
+
+    def invalidate(self, device_id: str) -> None:
+        """Drop a device from this worker's map and broadcast it to the others"""
+        self._forget(device_id)
+
+        client = get_redis()
+        if client is None:
+            return
+        try:
+            client.publish(INVALIDATION_CHANNEL, device_id)
+        except Exception as e:
+            logger.warning(f"Device registry invalidation not published: {e}")
+
+    def start(self) -> None:
+        """Listen for invalidations from other workers (no-op without Redis)"""
+        client = get_redis()
+        if client is None or self._subscriber is not None:
+            return
+        try:
+            self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**{INVALIDATION_CHANNEL: self._on_message})
+        except Exception as e:
+            logger.warning(f"Device registry invalidations unavailable, relying on TTL: {e}")
+            self._pubsub = None
+            return
+        self._subscriber = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def stop(self) -> None:
+        """Stop the invalidation listener"""
+        if self._subscriber is not None:
+            self._subscriber.stop()
+            self._subscriber = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+    def _on_message(self, message) -> None:
+        data = message.get("data")
+        if isinstance(data, bytes):
+            data = data.decode("utf-8", "replace")
+        if data:
+            self._forget(data)
+
+    def _forget(self, device_id: str) -> None:
+        with self._lock:
+            self._devices.pop(device_id, None)
+
+    def _is_stale(self) -> bool:
+        return time.monotonic() - self._loaded_at > settings.DEVICE_REGISTRY_TTL_SECONDS
+
+    def _load_all(self, db: Session) -> None:
+        started = time.monotonic()
+        devices: Dict[str, DeviceEntry] = {}
+        rows = db.execute(
+            select(Agent.agents_id, Agent.device_id, Agent.customer_id).order_by(Agent.agents_id.desc())
+        )
+        for row in rows:
+            # Descending ids, so the lowest agents_id of a device is written last
+            devices[row.device_id] = DeviceEntry(*row)
+
+        with self._lock:
+            self._devices = devices
+            self._loaded_at = started
+        metrics.set_gauge("device_registry_devices", len(devices))
+        logger.info(f"Device registry loaded {len(devices)} devices in {time.monotonic() - started:.3f}s")
+
+
+# Global device registry instance
+device_registry = DeviceRegistry()
@@ -0,0 +1,223 @@
+"""
+Duplicate-barcode registry service
+
+Keeps a per-customer ``barcode -> occurrence count`` table in step with
+inventory writes so the duplicates page can page through it directly instead
+of aggregating the whole inventories table on every visit.
+"""
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.database import shard_engines, upsert_statement
+from app.models.barcode_occurrence import BarcodeOccurrence, BarcodeRegistryState
+from app.models.inventory import Inventory
+
+logger = logging.getLogger(__name__)
+
+
+class DuplicateRegistry:
+    """Maintains the barcode occurrence registry (Singleton pattern)"""
+
+    _instance: Optional['DuplicateRegistry'] = None
+
+    def __new__(cls) -> 'DuplicateRegistry':
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._seeded: Set[int] = set()
+        self._lock = threading.Lock()
+        self._initialized = True
+
+    def is_seeded(self, db: Session, customer_id: int) -> bool:
+        """Check whether the customer's registry has been built (cached once true)"""
+        if customer_id in self._seeded:
+            return True
+
+        seeded = db.get(BarcodeRegistryState, customer_id) is not None
+        if seeded:
+            with self._lock:
+                self._seeded.add(customer_id)
+        return seeded
+
+    def apply_changes(
+        self,
+        db: Session,
+        customer_id: int,
+        added: Iterable[Optional[str]] = (),
+        removed: Iterable[Optional[str]] = (),
+    ) -> None:
+        """
+        Record barcodes gained and lost by a customer's inventories.
+
+        Runs inside the caller's transaction so the registry commits (or rolls
+        back) together with the inventory write. Customers whose registry has
+        not been built yet get it built here instead, from their inventories
+        as they stand after this write.
+
+        Args:
+            db: Database session of the inventory write
+            customer_id: Customer owning the inventories
+            added: Barcodes of inserted inventories (or new barcode values)
+            removed: Barcodes of deleted inventories (or previous barcode values)
+        """
+        deltas = Counter(b for b in added if b)
+        deltas.subtract(b for b in removed if b)
+        deltas = {barcode: delta for barcode, delta in deltas.items() if delta}
+
+        if not deltas:
+            return
+        if not self.is_seeded(db, customer_id):
+            db.flush()
+            self._build(db, customer_id)
+            return
+
+        stmt = upsert_statement(
+            db,
+            BarcodeOccurrence,
+            ["customer_id", "barcode"],
+            lambda new: {"occurrences": BarcodeOccurrence.occurrences + new.occurrences},
+        )
+        db.execute(stmt, [
+            {
+                "customer_id": customer_id,
+                "barcode": barcode,
+                "occurrences": delta,
+                "is_duplicate": delta > 1,
+            }
+            for barcode, delta in deltas.items()
+        ])
+
+        touched = list(deltas)
+        db.execute(
+            update(BarcodeOccurrence)
+            .where(
+                BarcodeOccurrence.customer_id == customer_id,
+                BarcodeOccurrence.barcode.in_(touched),
+            )
+            .values(is_duplicate=BarcodeOccurrence.occurrences > 1)
+            .execution_options(synchronize_session=False)
+        )
+        db.execute(
+            delete(BarcodeOccurrence)
+            .where(
+                BarcodeOccurrence.customer_id == customer_id,
+                BarcodeOccurrence.barcode.in_(touched),
+                BarcodeOccurrence.occurrences <= 0,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    def rebuild(self, db: Session, customer_id: int) -> int:
+        """
+        Rebuild a customer's registry from their inventories and commit.
+
+        Returns:
+            Number of duplicate barcodes found
+        """
+        self._build(db, customer_id)
+        db.commit()
+
+        with self._lock:
+            self._seeded.add(customer_id)
+
+        duplicates = db.query(func.count()).select_from(BarcodeOccurrence).filter(
+            BarcodeOccurrence.customer_id == customer_id,
+            BarcodeOccurrence.is_duplicate == True
+        ).scalar() or 0
+        logger.info(f"Rebuilt barcode registry for customer {customer_id}: {duplicates} duplicate barcodes")
+        return duplicates
+
+    def seed_all(self) -> None:
+        """Build the registry of every customer on every shard that has none yet (startup)"""
+        for shard, engine in shard_engines.items():
+            try:
+                with Session(bind=engine) as db:
+                    customer_ids = db.scalars(
+                        select(Inventory.customer_id).distinct().where(
+                            ~select(BarcodeRegistryState.customer_id)
+                            .where(BarcodeRegistryState.customer_id == Inventory.customer_id)
+                            .exists()
+                        )
+                    ).all()
+                    for customer_id in customer_ids:
+                        self.rebuild(db, customer_id)
+            except Exception as e:
+                logger.error(f"Could not seed the barcode registry on shard {shard}: {e}")
+
+    def _build(self, db: Session, customer_id: int) -> None:
+        """
+        Recount a customer's registry inside the caller's transaction.
+
+        Concurrent builds of one customer are serialized on the state row:
+        it is upserted first, so a second build waits for the first to
+        commit (instead of both inserting it and one failing).
+        """
+        db.execute(
+            upsert_statement(
+                db,
+                BarcodeRegistryState,
+                ["customer_id"],
+                lambda new: {"rebuilt_at": new.rebuilt_at},
+            ),
+            [{"customer_id": customer_id, "rebuilt_at": datetime.now(timezone.utc)}],
+        )
+
+        db.execute(
+            delete(BarcodeOccurrence)
+            .where(BarcodeOccurrence.customer_id == customer_id)
+            .execution_options(synchronize_session=False)
+        )
+
+        occurrences = func.count(Inventory.id)
+        db.execute(
+            insert(BarcodeOccurrence).from_select(
+                ["customer_id", "barcode", "occurrences", "is_duplicate"],
+                select(
+                    literal(customer_id),
+                    Inventory.barcode,
+                    occurrences,
+                    occurrences > 1,
+                ).where(
+                    Inventory.customer_id == customer_id,
+                    Inventory.barcode != None,
+                    Inventory.barcode != "",
+                ).group_by(Inventory.barcode),
+            )
+        )
+
+    def page(
+        self,
+        db: Session,
+        customer_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+    ) -> List[str]:
+        """
+        Keyset page of duplicate barcodes ordered by barcode.
+
+        Returns up to ``limit + 1`` barcodes; the extra one signals a next page.
+        """
+        query = db.query(BarcodeOccurrence.barcode).filter(
+            BarcodeOccurrence.customer_id == customer_id,
+            BarcodeOccurrence.is_duplicate == True
+        )
+        if cursor:
+            query = query.filter(BarcodeOccurrence.barcode > cursor)
+
+        rows = query.order_by(BarcodeOccurrence.barcode).limit(limit + 1).all()
+        return [row[0] for row in rows]
+
+
+# Global singleton instance
+duplicate_registry = DuplicateRegistry()
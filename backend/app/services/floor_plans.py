@@ -0,0 +1,215 @@
+"""
+Content-addressed floor-plan image store
+
+Uploaded floor plans are stored on local disk under the SHA-256 of their
+bytes, so an image is written once however many locations use it and a
+stored file never changes. ``DetailLocation.img_data`` holds the key,
+``<sha256>.<ext>``:
+
+    FLOOR_PLAN_DIR/ab/ab12...ef.png          original
+    FLOOR_PLAN_DIR/ab/ab12...ef.thumb.png    256 px wide variant
+
+Size variants are rendered with Pillow (optional dependency) right after the
+upload, or on first request for plans stored before Pillow was installed.
+Images are never upscaled; a variant at least as wide as the original is a
+hard link to it. Without Pillow every size is served from the original.
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import uuid
+from typing import IO, Dict, Optional, Tuple
+
+from app.config import settings
+from app.utils.metrics import metrics
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - optional dependency
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Size name -> maximum width in pixels
+VARIANT_WIDTHS: Dict[str, int] = {
+    "thumb": 256,
+    "small": 640,
+    "medium": 1280,
+    "large": 2048,
+}
+
+MEDIA_TYPES = {
+    "png": "image/png",
+    "jpg": "image/jpeg",
+    "webp": "image/webp",
+}
+
+PILLOW_FORMATS = {"png": "PNG", "jpg": "JPEG", "webp": "WEBP"}
+
+KEY_PATTERN = re.compile(r"^([0-9a-f]{64})\.(png|jpg|webp)$")
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class FloorPlanError(ValueError):
+    """Upload rejected (unsupported type or too large)"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def sniff_extension(head: bytes) -> Optional[str]:
+    """File extension for the image signature at the start of a file, or None"""
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def parse_key(key: str) -> Optional[Tuple[str, str]]:
+    """(digest, extension) of a store key, or None for anything else"""
+    match = KEY_PATTERN.match(key or "")
+    return (match.group(1), match.group(2)) if match else None
+
+
+class FloorPlanStore:
+    """Floor-plan images on local disk, keyed by content hash (Singleton pattern)"""
+
+    _instance: Optional['FloorPlanStore'] = None
+
+    def __new__(cls) -> 'FloorPlanStore':
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._render_lock = threading.Lock()
+        self._initialized = True
+
+    def _path(self, digest: str, ext: str, size: Optional[str] = None) -> str:
+        name = f"{digest}.{size}.{ext}" if size else f"{digest}.{ext}"
+        return os.path.join(settings.FLOOR_PLAN_DIR, digest[:2], name)
+
+    def save(self, source: IO[bytes]) -> str:
+        """
+        Store an uploaded image and render its size variants.
+
+        Args:
+            source: Binary file object positioned at the start of the image
+
+        Returns:
+            The store key (``<sha256>.<ext>``) to keep in ``img_data``
+
+        Raises:
+            FloorPlanError: Not a PNG/JPEG/WebP image, or larger than
+                FLOOR_PLAN_MAX_BYTES
+        """
+        directory = os.path.join(settings.FLOOR_PLAN_DIR, "tmp")
+        os.makedirs(directory, exist_ok=True)
+        staged = os.path.join(directory, uuid.uuid4().hex)
+
+        digest = hashlib.sha256()
+        size = 0
+        ext = None
+        try:
+            with open(staged, "wb") as out:
+                while True:
+                    chunk = source.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    if ext is None:
+                        ext = sniff_extension(chunk[:16])
+                        if ext is None:
+                            raise FloorPlanError("Only PNG, JPEG and WebP images are supported")
+                    size += len(chunk)
+                    if size > settings.FLOOR_PLAN_MAX_BYTES:
+                        raise FloorPlanError(
+                            f"Image is larger than {settings.FLOOR_PLAN_MAX_BYTES} bytes", status_code=413
+                        )
+                    digest.update(chunk)
+                    out.write(chunk)
+            if ext is None:
+                raise FloorPlanError("Empty file")
+
+            key = f"{digest.hexdigest()}.{ext}"
+            path = self._path(digest.hexdigest(), ext)
+            if os.path.exists(path):
+                # Same content already stored
+                os.remove(staged)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(staged, path)
+                metrics.inc("floor_plans_stored_total")
+        except BaseException:
+            if os.path.exists(staged):
+                os.remove(staged)
+            raise
+
+        for variant in VARIANT_WIDTHS:
+            self.path_for(key, variant)
+        return key
+
+    def path_for(self, key: str, size: Optional[str] = None) -> Optional[Tuple[str, str, str]]:
+        """
+        File to serve for a key and size, rendering the variant if needed.
+
+        Args:
+            key: Store key
+            size: One of VARIANT_WIDTHS, or None for the original
+
+        Returns:
+            (path, media type, ETag value) or None when the image is not stored
+        """
+        parsed = parse_key(key)
+        if parsed is None:
+            return None
+        digest, ext = parsed
+        original = self._path(digest, ext)
+        if not os.path.exists(original):
+            return None
+
+        media_type = MEDIA_TYPES[ext]
+        if size is None or Image is None:
+            return original, media_type, digest
+
+        path = self._path(digest, ext, size)
+        if not os.path.exists(path):
+            with self._render_lock:
+                if not os.path.exists(path) and not self._render(original, path, ext, VARIANT_WIDTHS[size]):
+                    return original, media_type, digest
+        return path, media_type, f"{digest}-{size}"
+
+    def _render(self, original: str, path: str, ext: str, width: int) -> bool:
+        """Write a variant at most ``width`` pixels wide"""
+        staged = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with Image.open(original) as image:
+                if image.width <= width:
+                    # Already small enough: the variant is the original file
+                    os.link(original, staged)
+                else:
+                    image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+                    if ext == "jpg" and image.mode not in ("RGB", "L"):
+                        image = image.convert("RGB")
+                    image.save(staged, format=PILLOW_FORMATS[ext], optimize=True)
+            os.replace(staged, path)
+            metrics.inc("floor_plan_variants_rendered_total")
+            return True
+        except Exception as e:
+            logger.warning(f"Floor-plan variant {os.path.basename(path)} not rendered, serving original: {e}")
+            if os.path.exists(staged):
+                os.remove(staged)
+            return False
+
+
+# Global floor-plan store instance
+floor_plan_store = FloorPlanStore()
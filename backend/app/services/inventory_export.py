@@ -0,0 +1,113 @@
+"""
+Inventory export with resolved names
+
+One flat object per inventory (category, item, location and operator names
+instead of ids), shared by the external API and the background export job.
+The field names are accepted as-is by the importer, so an export can be
+re-imported.
+"""
+from typing import IO, Any, Callable, Dict, Optional
+
+from sqlalchemy.orm import Session, joinedload
+
+from app.config import settings
+from app.models.inventory import Inventory
+from app.utils.responses import dumps
+
+STATUS_NAMES = {
+    0: "Inactive",
+    1: "Active",
+    2: "Maintenance",
+    3: "Retired",
+    4: "Missing",
+}
+
+# Many-to-one relations resolved for every row
+EXPORT_RELATIONS = (
+    Inventory.category, Inventory.item, Inventory.building, Inventory.area,
+    Inventory.floor, Inventory.detail_location, Inventory.operator,
+)
+
+
+def export_row(inv: Inventory) -> Dict[str, Any]:
+    """Serialize one inventory with resolved names (flat structure for CSV compatibility)"""
+    return {
+        "id": inv.id,
+        "customer_id": inv.customer_id,
+        "category_name": inv.category.name if inv.category else None,
+        "item_name": inv.item.name if inv.item else None,
+        "item_barcode": inv.item.barcode if inv.item and inv.item.barcode else None,
+        "building_name": inv.building.name if inv.building else None,
+        "area_name": inv.area.name if inv.area else None,
+        "floor_name": inv.floor.name if inv.floor else None,
+        "detail_location_name": inv.detail_location.name if inv.detail_location else None,
+        "barcode": inv.barcode,
+        "status": inv.status,
+        "status_name": STATUS_NAMES.get(inv.status, "Unknown") if inv.status is not None else None,
+        "purchase_date": inv.purchase_date,
+        "last_date": inv.last_date,
+        "ref_client": inv.ref_client,
+        "reg_date": inv.reg_date,
+        "inv_date": inv.inv_date,
+        "comment": inv.comment,
+        "rfid": inv.rfid,
+        "room_assignment": inv.room_assignment,
+        "category_df_immonet": inv.category_df_immonet,
+        "purchase_amount": inv.purchase_amount,
+        "is_throw": inv.is_throw,
+        "operator_name": inv.operator.username if inv.operator else None
+    }
+
+
+def write_export(
+    db: Session,
+    customer_id: int,
+    out: IO[bytes],
+    chunk_size: Optional[int] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """
+    Write a customer's inventories to ``out`` as a JSON array.
+
+    Rows are read in id-keyset chunks with their relations joined, so memory
+    use is bounded by the chunk size rather than the inventory count.
+
+    Args:
+        db: Database session
+        customer_id: Customer to export
+        out: Binary stream receiving the JSON
+        chunk_size: Rows per query (defaults to BULK_INSERT_CHUNK_SIZE)
+        on_progress: Called with (rows written, total rows) after each chunk
+
+    Returns:
+        Number of rows written
+    """
+    chunk_size = chunk_size or settings.BULK_INSERT_CHUNK_SIZE
+    total = db.query(Inventory).filter(Inventory.customer_id == customer_id).count()
+
+    written = 0
+    last_id = 0
+    out.write(b"[")
+    while True:
+        chunk = (
+            db.query(Inventory)
+            .options(*(joinedload(relation) for relation in EXPORT_RELATIONS))
+            .filter(Inventory.customer_id == customer_id, Inventory.id > last_id)
+            .order_by(Inventory.id)
+            .limit(chunk_size)
+            .all()
+        )
+        if not chunk:
+            break
+        for inv in chunk:
+            if written:
+                out.write(b",")
+            out.write(dumps(export_row(inv)))
+            written += 1
+        last_id = chunk[-1].id
+        # Related rows are reloaded with the next chunk; keep the identity map small
+        db.expunge_all()
+        if on_progress:
+            on_progress(written, max(total, written))
+    out.write(b"]")
+    return written
@@ -0,0 +1,418 @@
+"""
+Streaming inventory import from CSV / XLSX files
+
+Rows are read one at a time, pushed through a validation pipeline that
+resolves category, item and location names against per-import id caches,
+and inserted in executemany batches. Memory use is bounded by the batch size
+and the tenant's catalog, not by the file size.
+"""
+import csv
+import io
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.area import Area
+from app.models.building import Building
+from app.models.category import Category
+from app.models.detail_location import DetailLocation
+from app.models.floor import Floor
+from app.models.item import Item
+from app.services.bulk_inventory import insert_inventories
+
+logger = logging.getLogger(__name__)
+
+# Header aliases -> canonical field. The export names of /api/scanandgo/inventory
+# are accepted so an export can be re-imported as-is.
+HEADER_ALIASES = {
+    "item_name": "item",
+    "category_name": "category",
+    "building_name": "building",
+    "area_name": "area",
+    "floor_name": "floor",
+    "detail_location_name": "detail_location",
+    "detail_location": "detail_location",
+    "location": "detail_location",
+    "status_name": "status",
+}
+
+TEXT_FIELDS = (
+    "barcode", "rfid", "comment", "purchase_date", "last_date", "ref_client",
+    "reg_date", "inv_date", "room_assignment", "category_df_immonet",
+)
+
+STATUS_NAMES = {
+    "inactive": 0,
+    "active": 1,
+    "maintenance": 2,
+    "retired": 3,
+    "missing": 4,
+}
+
+TRUE_VALUES = {"1", "true", "yes", "y", "oui", "x"}
+FALSE_VALUES = {"0", "false", "no", "n", "non", ""}
+
+MAX_TEXT_LENGTH = 120
+
+
+class ImportRowError(ValueError):
+    """Raised by a pipeline stage when a row cannot be imported"""
+
+
+@dataclass
+class ImportReport:
+    """Progress and outcome of an import"""
+    rows_read: int = 0
+    inserted: int = 0
+    failed: int = 0
+    batches: int = 0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+    errors_truncated: bool = False
+    started_at: float = field(default_factory=time.monotonic)
+
+    def add_error(self, row_number: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < settings.IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_number, "error": message})
+        else:
+            self.errors_truncated = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rowsRead": self.rows_read,
+            "inserted": self.inserted,
+            "failed": self.failed,
+            "batches": self.batches,
+            "errors": self.errors,
+            "errorsTruncated": self.errors_truncated,
+            "elapsedSeconds": round(time.monotonic() - self.started_at, 3),
+        }
+
+
+def _normalize_header(name: Any) -> str:
+    key = str(name or "").strip().lower().replace(" ", "_").replace("-", "_")
+    return HEADER_ALIASES.get(key, key)
+
+
+def _cell_to_str(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value).strip()
+    return text or None
+
+
+def iter_csv_rows(file: IO[bytes]) -> Iterator[Tuple[int, Dict[str, Optional[str]]]]:
+    """Yield (row number, normalized row) pairs from a CSV byte stream"""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+
+    reader = csv.reader(text, dialect)
+    headers = [_normalize_header(h) for h in next(reader, [])]
+    for row_number, values in enumerate(reader, start=2):
+        if not any(v.strip() for v in values):
+            continue
+        yield row_number, {h: _cell_to_str(v) for h, v in zip(headers, values)}
+
+
+def iter_xlsx_rows(file: IO[bytes]) -> Iterator[Tuple[int, Dict[str, Optional[str]]]]:
+    """Yield (row number, normalized row) pairs from the first sheet of an XLSX workbook"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportRowError("XLSX import requires the 'openpyxl' package")
+
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        headers = [_normalize_header(h) for h in next(rows, ())]
+        for row_number, values in enumerate(rows, start=2):
+            if not any(v not in (None, "") for v in values):
+                continue
+            yield row_number, {h: _cell_to_str(v) for h, v in zip(headers, values)}
+    finally:
+        workbook.close()
+
+
+class InventoryImporter:
+    """Validates and inserts inventory rows for one customer"""
+
+    def __init__(
+        self,
+        db: Session,
+        customer_id: int,
+        create_missing: bool = False,
+        batch_size: Optional[int] = None,
+        on_progress: Optional[Callable[[ImportReport], None]] = None,
+    ):
+        self.db = db
+        self.customer_id = customer_id
+        self.create_missing = create_missing
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.on_progress = on_progress
+        self.report = ImportReport()
+        self.today = str(date.today())
+        # Catalog entries created for the row being validated (createMissing):
+        # kept in a savepoint and undone from the caches if the row fails
+        self._row_savepoint = None
+        self._row_created: List[Tuple[Any, Any]] = []
+
+        self._stages = [
+            self._check_required,
+            self._resolve_item,
+            self._resolve_category,
+            self._resolve_location,
+            self._coerce_fields,
+        ]
+        self._load_caches()
+
+    def _load_caches(self) -> None:
+        """Load name -> id maps for the customer's catalog and location tree"""
+        customer_id = self.customer_id
+
+        self.categories = {
+            name.lower(): cid
+            for cid, name in self.db.query(Category.id, Category.name)
+            .filter(Category.customer_id == customer_id)
+        }
+        self.items = {}
+        self.item_barcodes = set()
+        for iid, name, category_id, barcode in self.db.query(
+            Item.id, Item.name, Item.category_id, Item.barcode
+        ).filter(Item.customer_id == customer_id):
+            self.items.setdefault(name.lower(), (iid, category_id, barcode))
+            if barcode:
+                self.item_barcodes.add(barcode)
+
+        self.buildings = {
+            name.lower(): bid
+            for bid, name in self.db.query(Building.id, Building.name)
+            .filter(Building.customer_id == customer_id)
+        }
+        self.areas = {
+            (building_id, name.lower()): aid
+            for aid, building_id, name in self.db.query(Area.id, Area.building_id, Area.name)
+            .filter(Area.customer_id == customer_id)
+        }
+        self.floors = {
+            (area_id, name.lower()): fid
+            for fid, area_id, name in self.db.query(Floor.id, Floor.area_id, Floor.name)
+            .filter(Floor.customer_id == customer_id)
+        }
+        self.detail_locations = {
+            (floor_id, name.lower()): did
+            for did, floor_id, name in self.db.query(
+                DetailLocation.id, DetailLocation.floor_id, DetailLocation.name
+            ).filter(DetailLocation.customer_id == customer_id)
+        }
+
+    def _create(self, model, **values) -> int:
+        if self._row_savepoint is None:
+            self._row_savepoint = self.db.begin_nested()
+        obj = model(customer_id=self.customer_id, **values)
+        self.db.add(obj)
+        self.db.flush()
+        return obj.id
+
+    def _remember(self, cache, key, value) -> None:
+        """Cache an entity created for the current row"""
+        if isinstance(cache, set):
+            cache.add(key)
+        else:
+            cache[key] = value
+        self._row_created.append((cache, key))
+
+    def _end_row(self, valid: bool) -> None:
+        """Keep the row's created entities, or drop them when the row failed"""
+        if self._row_savepoint is not None:
+            if valid:
+                self._row_savepoint.commit()
+            else:
+                self._row_savepoint.rollback()
+                for cache, key in self._row_created:
+                    if isinstance(cache, set):
+                        cache.discard(key)
+                    else:
+                        cache.pop(key, None)
+        self._row_savepoint = None
+        self._row_created = []
+
+    # --- Pipeline stages ---
+
+    def _check_required(self, raw: Dict[str, Optional[str]], out: Dict[str, Any]) -> None:
+        if not raw.get("item"):
+            raise ImportRowError("Column 'item' is required")
+
+    def _resolve_item(self, raw: Dict[str, Optional[str]], out: Dict[str, Any]) -> None:
+        name = raw["item"]
+        cached = self.items.get(name.lower())
+        if cached is None:
+            if not self.create_missing:
+                raise ImportRowError(f"Unknown item '{name}'")
+            barcode = raw.get("item_barcode") or None
+            if barcode in self.item_barcodes:
+                # Item barcodes are unique per customer (uq_customer_item_barcode)
+                raise ImportRowError(f"Item barcode '{barcode}' belongs to another item")
+            category_id = self._category_id(raw.get("category"))
+            cached = (self._create(Item, name=name, category_id=category_id, barcode=barcode),
+                      category_id, barcode)
+            self._remember(self.items, name.lower(), cached)
+            if barcode:
+                self._remember(self.item_barcodes, barcode, None)
+
+        item_id, category_id, item_barcode = cached
+        out["item_id"] = item_id
+        out["category_id"] = category_id
+        out["barcode"] = raw.get("barcode") or item_barcode
+
+    def _category_id(self, name: Optional[str]) -> Optional[int]:
+        if not name:
+            return None
+        category_id = self.categories.get(name.lower())
+        if category_id is None:
+            if not self.create_missing:
+                raise ImportRowError(f"Unknown category '{name}'")
+            category_id = self._create(Category, name=name)
+            self._remember(self.categories, name.lower(), category_id)
+        return category_id
+
+    def _resolve_category(self, raw: Dict[str, Optional[str]], out: Dict[str, Any]) -> None:
+        if raw.get("category"):
+            out["category_id"] = self._category_id(raw["category"])
+
+    def _resolve_level(self, cache: Dict, model, label: str, parent_field: Optional[str],
+                       parent_id: Optional[int], name: Optional[str]) -> Optional[int]:
+        if not name:
+            return None
+        key = (parent_id, name.lower()) if parent_field else name.lower()
+        location_id = cache.get(key)
+        if location_id is None:
+            if not self.create_missing:
+                raise ImportRowError(f"Unknown {label} '{name}'")
+            values = {"name": name}
+            if parent_field:
+                values[parent_field] = parent_id
+            location_id = self._create(model, **values)
+            self._remember(cache, key, location_id)
+        return location_id
+
+    def _resolve_location(self, raw: Dict[str, Optional[str]], out: Dict[str, Any]) -> None:
+        out["building_id"] = self._resolve_level(
+            self.buildings, Building, "building", None, None, raw.get("building"))
+        out["area_id"] = self._resolve_level(
+            self.areas, Area, "area", "building_id", out["building_id"], raw.get("area"))
+        out["floor_id"] = self._resolve_level(
+            self.floors, Floor, "floor", "area_id", out["area_id"], raw.get("floor"))
+        out["detail_location_id"] = self._resolve_level(
+            self.detail_locations, DetailLocation, "detail location", "floor_id",
+            out["floor_id"], raw.get("detail_location"))
+
+    def _coerce_fields(self, raw: Dict[str, Optional[str]], out: Dict[str, Any]) -> None:
+        for name in TEXT_FIELDS:
+            value = out.get(name) if name == "barcode" else raw.get(name)
+            if value is not None and len(value) > MAX_TEXT_LENGTH:
+                raise ImportRowError(f"'{name}' is longer than {MAX_TEXT_LENGTH} characters")
+            out[name] = value
+
+        status = raw.get("status")
+        if status is None:
+            out["status"] = 1
+        elif status.lower() in STATUS_NAMES:
+            out["status"] = STATUS_NAMES[status.lower()]
+        elif status.isdigit() and int(status) in STATUS_NAMES.values():
+            out["status"] = int(status)
+        else:
+            raise ImportRowError(f"Invalid status '{status}'")
+
+        amount = raw.get("purchase_amount")
+        if amount is not None:
+            try:
+                out["purchase_amount"] = int(float(amount.replace(",", ".")))
+            except ValueError:
+                raise ImportRowError(f"Invalid purchase_amount '{amount}'")
+
+        is_throw = (raw.get("is_throw") or "").lower()
+        if is_throw in TRUE_VALUES:
+            out["is_throw"] = True
+        elif is_throw in FALSE_VALUES:
+            out["is_throw"] = False
+        else:
+            raise ImportRowError(f"Invalid is_throw '{raw.get('is_throw')}'")
+
+        out["reg_date"] = out["reg_date"] or self.today
+        out["inv_date"] = out["inv_date"] or self.today
+
+    # --- Driver ---
+
+    def _flush_batch(self, batch: List[Tuple[int, Dict[str, Any]]]) -> None:
+        if not batch:
+            return
+        try:
+            inserted, _ = insert_inventories(
+                self.db, self.customer_id, [row for _, row in batch]
+            )
+            self.report.inserted += inserted
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"Import batch failed for customer {self.customer_id}: {e}")
+            for row_number, _ in batch:
+                self.report.add_error(row_number, "Database error while inserting batch")
+            # Entities created for this batch were rolled back with it
+            self._load_caches()
+
+        self.report.batches += 1
+        logger.info(
+            f"Import progress for customer {self.customer_id}: "
+            f"{self.report.rows_read} read, {self.report.inserted} inserted, {self.report.failed} failed"
+        )
+        if self.on_progress:
+            self.on_progress(self.report)
+
+    def run(self, rows: Iterator[Tuple[int, Dict[str, Optional[str]]]]) -> ImportReport:
+        """Validate and insert all rows, committing once per batch"""
+        batch: List[Tuple[int, Dict[str, Any]]] = []
+
+        try:
+            for row_number, raw in rows:
+                self.report.rows_read += 1
+                out: Dict[str, Any] = {}
+                try:
+                    for stage in self._stages:
+                        stage(raw, out)
+                except ImportRowError as e:
+                    # Nothing created for a rejected row is kept
+                    self._end_row(valid=False)
+                    self.report.add_error(row_number, str(e))
+                    continue
+                self._end_row(valid=True)
+
+                batch.append((row_number, out))
+                if len(batch) >= self.batch_size:
+                    self._flush_batch(batch)
+                    batch = []
+        except ImportRowError as e:
+            # Raised by the reader itself (unreadable file)
+            self.report.add_error(0, str(e))
+        except Exception as e:
+            self._end_row(valid=False)
+            logger.warning(f"Import file unreadable for customer {self.customer_id}: {e}")
+            self.report.add_error(self.report.rows_read + 1, f"Unreadable file: {e}")
+
+        self._flush_batch(batch)
+        return self.report
@@ -0,0 +1,510 @@
+"""
+In-process background jobs
+
+Imports, bulk moves and exports can run as jobs instead of inside the HTTP
+request. The route validates its input, submits a function and answers 202
+with the job id; clients poll ``/api/jobs/{id}`` for progress and fetch the
+result when it has finished:
+
+    job = job_runner.submit("move", customer_id, run_move)
+
+Jobs are rows of the ``jobs`` table on the primary, so any worker can report
+on them. Each worker executes its own submissions on JOB_WORKERS threads fed
+from a queue of JOB_QUEUE_SIZE; a full queue raises ``JobQueueFull`` (503).
+There is no broker: a maintenance thread keeps the rows of live jobs fresh,
+and jobs of a worker that died stop being refreshed and are marked failed
+after JOB_STALE_SECONDS.
+
+Job functions receive a ``JobContext``. ``ctx.progress(done, total)`` records
+progress at most every JOB_PROGRESS_INTERVAL_SECONDS and raises
+``JobCancelled`` once a cancellation was requested, so cancellation takes
+effect between batches. The function's return value (a JSON-serializable
+dict) is stored as the job result; downloadable output goes to
+``ctx.output_path(suffix)``.
+"""
+import json
+import logging
+import os
+import queue
+import shutil
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Set
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import ReadSessionLocal, SessionLocal, engine, replica_engine
+from app.models.job import Job
+from app.utils.metrics import metrics
+from app.utils.request_context import background_context
+from app.utils.responses import dumps
+
+logger = logging.getLogger(__name__)
+
+JOB_DURATION_BUCKETS = (1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+
+FINISHED_STATUSES = ("succeeded", "failed", "cancelled")
+
+UPLOADS_DIR = "uploads"
+
+
+class JobCancelled(BaseException):
+    """
+    Raised inside a job once its cancellation was requested.
+
+    Derives from BaseException so ``except Exception`` blocks of the job code
+    (per-row error handling) do not swallow it.
+    """
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when this worker already has JOB_QUEUE_SIZE jobs waiting"""
+
+    retry_after = 30
+
+    def __init__(self):
+        super().__init__("Too many background jobs queued, retry shortly")
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def job_to_dict(job: Job) -> Dict[str, Any]:
+    """Public view of a job (status polling)"""
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "progress": job.progress,
+        "total": job.total,
+        "message": job.message,
+        "error": job.error,
+        "cancelRequested": job.cancel_requested,
+        "hasResult": job.status == "succeeded",
+        "createdAt": _iso(job.created_at),
+        "startedAt": _iso(job.started_at),
+        "finishedAt": _iso(job.finished_at),
+    }
+
+
+class JobContext:
+    """Handle given to a running job function"""
+
+    def __init__(self, runner: 'JobRunner', job_id: str, customer_id: int):
+        self.job_id = job_id
+        self.customer_id = customer_id
+        self.result_file: Optional[str] = None
+        self._runner = runner
+        self._last_write = 0.0
+
+    @contextmanager
+    def session(self, read_only: bool = False) -> Iterator[Session]:
+        """Database session routed to the customer's shard (or the replica when ``read_only``)"""
+        db = ReadSessionLocal() if read_only and replica_engine is not None else SessionLocal()
+        try:
+            yield db
+        except BaseException:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def output_path(self, suffix: str) -> str:
+        """Path of the job's downloadable output (served by /api/jobs/{id}/result)"""
+        self.result_file = f"{self.job_id}{suffix}"
+        return os.path.join(settings.JOB_RESULT_DIR, self.result_file)
+
+    def progress(self, done: int, total: Optional[int] = None, message: Optional[str] = None) -> None:
+        """
+        Record progress (throttled) and stop the job if it was cancelled.
+
+        Raises:
+            JobCancelled: Cancellation was requested
+        """
+        if self._runner.cancel_requested_locally(self.job_id):
+            raise JobCancelled()
+
+        now = time.monotonic()
+        if now - self._last_write < settings.JOB_PROGRESS_INTERVAL_SECONDS:
+            return
+        self._last_write = now
+
+        values: Dict[str, Any] = {"progress": done, "updated_at": _now()}
+        if total is not None:
+            values["total"] = total
+        if message is not None:
+            values["message"] = message[:255]
+        with Session(bind=engine) as db:
+            db.execute(update(Job).where(Job.id == self.job_id).values(**values))
+            cancelled = db.execute(select(Job.cancel_requested).where(Job.id == self.job_id)).scalar()
+            db.commit()
+        if cancelled:
+            raise JobCancelled()
+
+    def check_cancelled(self) -> None:
+        """Stop the job if it was cancelled (for stretches without progress to report)"""
+        if self._runner.cancel_requested_locally(self.job_id):
+            raise JobCancelled()
+
+
+class JobRunner:
+    """Bounded in-process job executor (Singleton pattern)"""
+
+    _instance: Optional['JobRunner'] = None
+
+    def __new__(cls) -> 'JobRunner':
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, settings.JOB_QUEUE_SIZE))
+        self._threads: List[threading.Thread] = []
+        self._maintenance: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._owned: Set[str] = set()  # Queued or running in this worker
+        self._cancelled: Set[str] = set()
+        self.worker_name = f"{socket.gethostname()}:{os.getpid()}"[:64]
+        self._initialized = True
+
+    def start(self) -> None:
+        """Start the job threads and the maintenance thread"""
+        with self._lock:
+            if self._threads:
+                return
+            self._stopping.clear()
+            os.makedirs(os.path.join(settings.JOB_RESULT_DIR, UPLOADS_DIR), exist_ok=True)
+            for index in range(max(1, settings.JOB_WORKERS)):
+                thread = threading.Thread(target=self._work, name=f"job-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            self._maintenance = threading.Thread(target=self._maintain, name="job-maintenance", daemon=True)
+            self._maintenance.start()
+        logger.info(f"Job runner started with {len(self._threads)} thread(s)")
+
+    def stop(self) -> None:
+        """Fail queued jobs, cancel running ones and wait up to JOB_SHUTDOWN_GRACE_SECONDS"""
+        with self._lock:
+            threads, self._threads = self._threads, []
+        if not threads:
+            return
+        self._stopping.set()
+
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._finish(item[0], "failed", error="Server shut down before the job started")
+            self._discard(item[0], item[4])
+
+        with self._lock:
+            self._cancelled.update(self._owned)
+        for _ in threads:
+            self._queue.put(None)
+        deadline = time.monotonic() + settings.JOB_SHUTDOWN_GRACE_SECONDS
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if self._maintenance is not None:
+            self._maintenance.join(1.0)
+            self._maintenance = None
+
+    def submit(
+        self,
+        kind: str,
+        customer_id: int,
+        fn: Callable[[JobContext], Optional[Dict[str, Any]]],
+        input_path: Optional[str] = None,
+    ) -> Job:
+        """
+        Queue ``fn`` as a job of the customer.
+
+        Args:
+            kind: Job type shown to clients (import, move, export)
+            customer_id: Customer owning the job
+            fn: Function run on a job thread with a JobContext
+            input_path: Staged input file, deleted once the job has finished
+
+        Returns:
+            The queued job row
+
+        Raises:
+            JobQueueFull: This worker has JOB_QUEUE_SIZE jobs waiting
+        """
+        if not self._threads:
+            self.start()
+        if self._queue.full():
+            self._remove_file(input_path)
+            metrics.inc("jobs_rejected_total", kind=kind)
+            raise JobQueueFull()
+
+        job = Job(
+            id=uuid.uuid4().hex,
+            customer_id=customer_id,
+            kind=kind,
+            status="queued",
+            progress=0,
+            cancel_requested=False,
+            worker=self.worker_name,
+        )
+        with Session(bind=engine, expire_on_commit=False) as db:
+            db.add(job)
+            db.commit()
+
+        with self._lock:
+            self._owned.add(job.id)
+        try:
+            self._queue.put_nowait((job.id, customer_id, kind, fn, input_path))
+        except queue.Full:
+            self._finish(job.id, "failed", error="Job queue full")
+            self._discard(job.id, input_path)
+            metrics.inc("jobs_rejected_total", kind=kind)
+            raise JobQueueFull()
+
+        metrics.inc("jobs_submitted_total", kind=kind)
+        metrics.set_gauge("jobs_queued", self._queue.qsize())
+        logger.info(f"Queued {kind} job {job.id} for customer {customer_id}")
+        return job
+
+    def stage_upload(self, source: IO[bytes], suffix: str) -> str:
+        """Copy an uploaded file to JOB_RESULT_DIR so a job can read it after the request ends"""
+        directory = os.path.join(settings.JOB_RESULT_DIR, UPLOADS_DIR)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{uuid.uuid4().hex}{suffix}")
+        with open(path, "wb") as staged:
+            shutil.copyfileobj(source, staged, 1024 * 1024)
+        return path
+
+    def get(self, customer_id: int, job_id: str) -> Optional[Job]:
+        """Job of the customer, or None"""
+        with Session(bind=engine) as db:
+            job = db.get(Job, job_id)
+            if job is None or job.customer_id != customer_id:
+                return None
+            db.expunge(job)
+            return job
+
+    def recent(self, customer_id: int, limit: int = 50) -> List[Job]:
+        """Most recent jobs of the customer"""
+        with Session(bind=engine) as db:
+            jobs = list(db.scalars(
+                select(Job)
+                .where(Job.customer_id == customer_id)
+                .order_by(Job.created_at.desc())
+                .limit(limit)
+            ))
+            db.expunge_all()
+            return jobs
+
+    def cancel(self, customer_id: int, job_id: str) -> Optional[Job]:
+        """
+        Request cancellation of a job.
+
+        A queued job is cancelled at once; a running job stops at its next
+        progress report (in whichever worker runs it).
+
+        Returns:
+            The updated job, or None if the customer has no such job
+        """
+        if self.get(customer_id, job_id) is None:
+            return None
+
+        with Session(bind=engine) as db:
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status.in_(("queued", "running")))
+                .values(cancel_requested=True)
+            )
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == "queued")
+                .values(status="cancelled", finished_at=_now(), updated_at=_now())
+            )
+            db.commit()
+        with self._lock:
+            if job_id in self._owned:
+                self._cancelled.add(job_id)
+        return self.get(customer_id, job_id)
+
+    def result_path(self, job: Job) -> Optional[str]:
+        """Path of a finished job's output file, if it has one"""
+        if not job.result_file:
+            return None
+        path = os.path.join(settings.JOB_RESULT_DIR, os.path.basename(job.result_file))
+        return path if os.path.exists(path) else None
+
+    def cancel_requested_locally(self, job_id: str) -> bool:
+        return job_id in self._cancelled
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            metrics.set_gauge("jobs_queued", self._queue.qsize())
+            job_id, customer_id, kind, fn, input_path = item
+            try:
+                self._run(job_id, customer_id, kind, fn)
+            except Exception as e:
+                logger.error(f"Job {job_id} could not be recorded: {e}", exc_info=True)
+            finally:
+                self._discard(job_id, input_path)
+
+    def _run(self, job_id: str, customer_id: int, kind: str, fn: Callable) -> None:
+        with Session(bind=engine) as db:
+            claimed = db.execute(
+                update(Job)
+                .where(Job.id == job_id, Job.status == "queued")
+                .values(status="running", started_at=_now(), updated_at=_now())
+            ).rowcount
+            db.commit()
+        if not claimed:
+            # Cancelled (or declared stale) while queued
+            return
+
+        ctx = JobContext(self, job_id, customer_id)
+        started = time.monotonic()
+        status, result, error = "succeeded", None, None
+        try:
+            with background_context(job_id, customer_id, f"job:{kind}"):
+                result = fn(ctx)
+        except JobCancelled:
+            status = "cancelled"
+        except Exception as e:
+            logger.error(f"{kind} job {job_id} failed: {e}", exc_info=True)
+            status, error = "failed", str(e)
+
+        if status != "succeeded" and ctx.result_file:
+            self._remove_file(os.path.join(settings.JOB_RESULT_DIR, ctx.result_file))
+            ctx.result_file = None
+        self._finish(job_id, status, result=result, error=error, result_file=ctx.result_file)
+
+        elapsed = time.monotonic() - started
+        metrics.inc("jobs_finished_total", kind=kind, status=status)
+        metrics.observe("job_duration_seconds", elapsed, JOB_DURATION_BUCKETS, kind=kind)
+        logger.info(f"{kind} job {job_id} for customer {customer_id} {status} in {elapsed:.1f}s")
+
+    def _finish(
+        self,
+        job_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None,
+        result_file: Optional[str] = None,
+    ) -> None:
+        with Session(bind=engine) as db:
+            db.execute(
+                update(Job)
+                .where(Job.id == job_id)
+                .values(
+                    status=status,
+                    result=dumps(result).decode("utf-8") if result is not None else None,
+                    result_file=result_file,
+                    error=error[:2000] if error else None,
+                    finished_at=_now(),
+                    updated_at=_now(),
+                )
+            )
+            db.commit()
+
+    def _discard(self, job_id: str, input_path: Optional[str]) -> None:
+        with self._lock:
+            self._owned.discard(job_id)
+            self._cancelled.discard(job_id)
+        self._remove_file(input_path)
+
+    @staticmethod
+    def _remove_file(path: Optional[str]) -> None:
+        if path:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove job file {path}: {e}")
+
+    def _maintain(self) -> None:
+        interval = max(5.0, settings.JOB_STALE_SECONDS / 4)
+        while True:
+            try:
+                self._heartbeat()
+                self._expire()
+            except Exception as e:
+                logger.error(f"Job maintenance failed: {e}")
+            if self._stopping.wait(interval):
+                return
+
+    def _heartbeat(self) -> None:
+        # Refresh the jobs this worker holds; the others' rows go stale when their worker dies
+        with self._lock:
+            owned = list(self._owned)
+        now = _now()
+        with Session(bind=engine) as db:
+            if owned:
+                db.execute(
+                    update(Job)
+                    .where(Job.id.in_(owned), Job.status.in_(("queued", "running")))
+                    .values(updated_at=now)
+                )
+            stale = db.execute(
+                update(Job)
+                .where(
+                    Job.status.in_(("queued", "running")),
+                    Job.updated_at < now - timedelta(seconds=settings.JOB_STALE_SECONDS),
+                )
+                .values(status="failed", error="Worker stopped while the job was pending", finished_at=now)
+            ).rowcount
+            db.commit()
+        if stale:
+            logger.warning(f"Marked {stale} stale job(s) as failed")
+
+    def _expire(self) -> None:
+        cutoff = _now() - timedelta(hours=settings.JOB_RETENTION_HOURS)
+        with Session(bind=engine) as db:
+            rows = db.execute(
+                select(Job.id, Job.result_file)
+                .where(Job.status.in_(FINISHED_STATUSES), Job.finished_at < cutoff)
+                .limit(1000)
+            ).all()
+            if rows:
+                for _, result_file in rows:
+                    if result_file:
+                        self._remove_file(os.path.join(settings.JOB_RESULT_DIR, os.path.basename(result_file)))
+                db.execute(delete(Job).where(Job.id.in_([job_id for job_id, _ in rows])))
+                db.commit()
+
+        # Inputs of jobs lost with their worker
+        uploads = os.path.join(settings.JOB_RESULT_DIR, UPLOADS_DIR)
+        oldest = time.time() - settings.JOB_RETENTION_HOURS * 3600
+        if os.path.isdir(uploads):
+            for name in os.listdir(uploads):
+                path = os.path.join(uploads, name)
+                try:
+                    if os.path.getmtime(path) < oldest:
+                        self._remove_file(path)
+                except OSError:
+                    pass
+
+
+def load_result(job: Job) -> Optional[Dict[str, Any]]:
+    """Decoded JSON result of a finished job"""
+    return json.loads(job.result) if job.result else None
+
+
+# Global job runner instance
+job_runner = JobRunner()
@@ -0,0 +1,488 @@
+"""
+Write-behind buffer for handheld scan writes
+
+Relocation scans (``/api/inventory/location/barcode``) and missing marks
+(``/api/missingitem/create``) are acknowledged as soon as they are appended
+to a local spool file, and applied to the database by a flusher thread in
+batches: every SCAN_BUFFER_FLUSH_SECONDS, or earlier once
+SCAN_BUFFER_FLUSH_EVENTS are waiting, one transaction per customer.
+
+Spool layout (SCAN_BUFFER_DIR, one live file per worker):
+
+    spool-<pid>-<ns>.log     JSON line per event, flock'ed by its worker
+    retry-<pid>-<ns>.log     events of failed transactions, waiting for a retry
+    dead-letter-<pid>.jsonl  events that will not be saved, with the error
+
+At each flush the live file becomes a segment and a new one is opened; a
+segment is deleted once all of its events are committed. Events of a
+customer whose transaction fails are rewritten to a new segment and retried
+with exponential backoff (SCAN_BUFFER_RETRY_SECONDS, doubled per attempt),
+each in a transaction of its own. After SCAN_BUFFER_MAX_ATTEMPTS failed
+attempts an event is moved to the dead-letter file and logged, so events
+that can never be saved do not fill SCAN_BUFFER_MAX_PENDING. On startup,
+segments no worker holds a lock on (their worker died) are adopted and
+flushed.
+
+Each worker flushes its own spool, so a customer's scans can reach the
+database out of order. ``scan_marks`` keeps, per barcode, the time of the
+latest scan applied; a scan older than that is skipped, so an event flushed
+late by another worker, retried, or replayed after a crash between commit
+and delete never overwrites a newer one. Spooled events older than
+SCAN_BUFFER_MAX_AGE_SECONDS are dead-lettered rather than applied.
+
+Reads may trail acknowledged scans by up to one flush interval.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import IO, Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy import case, select, update
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import SessionLocal, upsert_statement
+from app.models.inventory import Inventory
+from app.models.scan_mark import ScanMark
+from app.services.change_tracking import change_tracker
+from app.utils.metrics import metrics
+from app.utils.request_context import background_context
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SCAN_KINDS = ("relocate", "missing")
+
+TARGET_COLUMNS = ("building_id", "area_id", "floor_id", "detail_location_id")
+
+_MAX_RETRY_DELAY = 300.0  # Longest backoff between attempts to save an event
+
+
+class ScanBufferFull(RuntimeError):
+    """Raised when too many scans are waiting for the database"""
+
+    retry_after = 5
+
+    def __init__(self, pending: int):
+        super().__init__(f"{pending} scans are waiting to be saved, retry shortly")
+
+
+def _newer_scans(db: Session, customer_id: int, scanned: Dict[str, float]) -> Set[str]:
+    """
+    Record the scan times of a chunk and return the barcodes already scanned later.
+
+    The marks are upserted first (in barcode order, so concurrent flushers
+    lock them in the same order) and keep the later of the stored and the
+    new time; the row locks are held until commit, so the check below cannot
+    race another worker applying the same barcodes.
+    """
+    marks = ScanMark.__table__
+    stmt = upsert_statement(
+        db,
+        ScanMark,
+        ["customer_id", "barcode"],
+        lambda proposed: {"last_scan_at": case(
+            (proposed.last_scan_at > ScanMark.last_scan_at, proposed.last_scan_at),
+            else_=ScanMark.last_scan_at,
+        )},
+    )
+    db.execute(stmt, [
+        {"customer_id": customer_id, "barcode": barcode, "last_scan_at": scanned[barcode]}
+        for barcode in sorted(scanned)
+    ])
+    stored = db.execute(
+        select(marks.c.barcode, marks.c.last_scan_at)
+        .where(marks.c.customer_id == customer_id, marks.c.barcode.in_(list(scanned)))
+    ).all()
+    return {barcode for barcode, last_scan_at in stored if last_scan_at > scanned[barcode]}
+
+
+def apply_scan_events(db: Session, customer_id: int, events: List[Dict[str, Any]]) -> int:
+    """
+    Apply a customer's scan events with one UPDATE per target and chunk.
+
+    A barcode scanned later than an event (by an event applied earlier, by
+    another worker, or in this batch) is left out of that event's UPDATE.
+    The caller commits.
+
+    Args:
+        db: Database session
+        customer_id: Customer owning the scanned inventories
+        events: Events of this customer, oldest first; ``at`` is the time
+            the scan was accepted (now when missing)
+
+    Returns:
+        Number of inventory rows updated
+    """
+    table = Inventory.__table__
+    updated = 0
+    now = time.time()
+
+    # Consecutive scans for the same target become one barcode -> scan time map
+    runs: List[Tuple[str, Tuple, Dict[str, float]]] = []
+    for event in events:
+        target = tuple((event.get("target") or {}).get(column) for column in TARGET_COLUMNS)
+        if not (runs and runs[-1][0] == event["kind"] and runs[-1][1] == target):
+            runs.append((event["kind"], target, {}))
+        scanned = runs[-1][2]
+        at = event.get("at") or now
+        for barcode in event["barcodes"]:
+            scanned[barcode] = max(at, scanned.get(barcode, at))
+
+    for kind, target, scanned in runs:
+        target = dict(zip(TARGET_COLUMNS, target))
+        if kind == "relocate":
+            values = target
+        else:
+            values = {"status": 4}  # Missing
+            if target["detail_location_id"]:
+                values["detail_location_id"] = target["detail_location_id"]
+
+        barcodes = list(scanned)
+        for start in range(0, len(barcodes), settings.BULK_INSERT_CHUNK_SIZE):
+            chunk = {barcode: scanned[barcode] for barcode in barcodes[start:start + settings.BULK_INSERT_CHUNK_SIZE]}
+            newer = _newer_scans(db, customer_id, chunk)
+            if newer:
+                metrics.inc("scan_buffer_stale_scans_total", len(newer))
+            current = [barcode for barcode in chunk if barcode not in newer]
+            if not current:
+                continue
+            result = db.execute(
+                update(table)
+                .where(table.c.customer_id == customer_id, table.c.barcode.in_(current))
+                .values(**values)
+            )
+            updated += result.rowcount
+
+    change_tracker.note_change(db, customer_id, Inventory.__tablename__)
+    return updated
+
+
+class _Segment:
+    """A spool file and the lock held on it while its events are pending"""
+
+    def __init__(self, path: str, handle: IO[str]):
+        self.path = path
+        self.handle = handle
+
+    def delete(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        self.handle.close()
+
+
+class ScanBuffer:
+    """Spooled, batched scan writes of this worker (Singleton pattern)"""
+
+    _instance: Optional['ScanBuffer'] = None
+
+    def __new__(cls) -> 'ScanBuffer':
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        self._condition = threading.Condition()
+        self._live: Optional[_Segment] = None
+        self._buffered: List[Dict[str, Any]] = []  # Appended to the live spool, not yet flushed
+        self._pending: List[Dict[str, Any]] = []  # Taken by the flusher (from segments below)
+        self._segments: List[_Segment] = []
+        self._flusher: Optional[threading.Thread] = None
+        self._stopping = False
+        self._initialized = True
+
+    @property
+    def running(self) -> bool:
+        return self._flusher is not None
+
+    def start(self) -> None:
+        """Adopt orphaned spool files and start the flusher"""
+        if self._flusher is not None:
+            return
+        os.makedirs(settings.SCAN_BUFFER_DIR, exist_ok=True)
+        with self._condition:
+            self._stopping = False
+            adopted = self._adopt_orphans()
+            self._live = self._open_spool()
+        if adopted:
+            logger.info(f"Replaying {adopted} spooled scan event(s) from a previous worker")
+        self._flusher = threading.Thread(target=self._run, name="scan-flusher", daemon=True)
+        self._flusher.start()
+        logger.info(f"Scan buffer started (spool {self._live.path})")
+
+    def stop(self) -> None:
+        """Flush everything buffered, then stop (unsaved events stay spooled for the next start)"""
+        if self._flusher is None:
+            return
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        self._flusher.join(settings.SCAN_BUFFER_SHUTDOWN_SECONDS)
+        if self._flusher.is_alive():
+            logger.warning("Scan buffer not drained before shutdown; spooled scans replay on next start")
+        self._flusher = None
+
+    def submit(self, customer_id: int, kind: str, barcodes: List[str], target: Dict[str, Optional[int]]) -> bool:
+        """
+        Spool a scan event for the flusher.
+
+        Args:
+            customer_id: Customer owning the scanned inventories
+            kind: "relocate" (move to target) or "missing" (mark missing at target)
+            barcodes: Scanned barcodes
+            target: building_id, area_id, floor_id and detail_location_id
+
+        Returns:
+            True once the event is durable in the spool; False when the buffer
+            is not running and the caller must write synchronously
+
+        Raises:
+            ScanBufferFull: SCAN_BUFFER_MAX_PENDING events are already waiting
+        """
+        if kind not in SCAN_KINDS:
+            raise ValueError(f"Unknown scan kind: {kind}")
+        event = {
+            "id": uuid.uuid4().hex,
+            "customerId": customer_id,
+            "kind": kind,
+            "barcodes": barcodes,
+            "target": target,
+            "at": time.time(),
+        }
+        line = json.dumps(event, separators=(",", ":")) + "\n"
+
+        with self._condition:
+            if self._flusher is None or self._stopping:
+                return False
+            waiting = len(self._buffered) + len(self._pending)
+            if waiting >= settings.SCAN_BUFFER_MAX_PENDING:
+                metrics.inc("scan_buffer_rejected_total")
+                raise ScanBufferFull(waiting)
+
+            self._live.handle.write(line)
+            self._live.handle.flush()
+            if settings.SCAN_SPOOL_FSYNC:
+                os.fsync(self._live.handle.fileno())
+            self._buffered.append(event)
+            if len(self._buffered) >= settings.SCAN_BUFFER_FLUSH_EVENTS:
+                self._condition.notify_all()
+            metrics.set_gauge("scan_buffer_pending_events", waiting + 1)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._stopping and len(self._buffered) < settings.SCAN_BUFFER_FLUSH_EVENTS:
+                    self._condition.wait(settings.SCAN_BUFFER_FLUSH_SECONDS)
+                stopping = self._stopping
+                self._rotate()
+
+            try:
+                self._flush()
+            except Exception as e:
+                logger.error(f"Scan flush failed: {e}", exc_info=True)
+
+            if stopping:
+                with self._condition:
+                    if self._live is not None and not self._buffered:
+                        self._live.delete()
+                        self._live = None
+                if self._pending:
+                    logger.warning(f"{len(self._pending)} scan event(s) left in the spool at shutdown")
+                    for segment in self._segments:
+                        segment.handle.close()
+                    self._segments = []
+                    self._pending = []
+                return
+
+    def _rotate(self) -> None:
+        """Hand the buffered events and their spool file to the flusher (caller holds the condition)"""
+        if not self._buffered:
+            return
+        self._segments.append(self._live)
+        self._pending.extend(self._buffered)
+        self._buffered = []
+        self._live = None if self._stopping else self._open_spool()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        started = time.perf_counter()
+        now = time.time()
+
+        oldest = now - settings.SCAN_BUFFER_MAX_AGE_SECONDS
+        dead: List[Dict[str, Any]] = [
+            {**event, "error": f"older than {settings.SCAN_BUFFER_MAX_AGE_SECONDS}s"}
+            for event in self._pending if event["at"] < oldest
+        ]
+
+        # Events backing off after a failure wait in the retry segment (the
+        # final flush on shutdown tries them once more)
+        kept: List[Dict[str, Any]] = []
+        by_customer: Dict[int, List[Dict[str, Any]]] = {}
+        for event in self._pending:
+            if event["at"] < oldest:
+                continue
+            if event.get("retryAt", 0) > now and not self._stopping:
+                kept.append(event)
+            else:
+                by_customer.setdefault(event["customerId"], []).append(event)
+        if not by_customer and not dead:
+            return
+
+        failed: List[Tuple[Dict[str, Any], str]] = []
+        applied = updated = 0
+        for customer_id, events in by_customer.items():
+            fresh = [event for event in events if not event.get("attempts")]
+            retries = [event for event in events if event.get("attempts")]
+
+            if fresh:
+                rows, error = self._apply(customer_id, fresh)
+                if error is None:
+                    applied += len(fresh)
+                    updated += rows
+                else:
+                    logger.warning(f"{len(fresh)} scan event(s) of customer {customer_id} not saved, retrying: {error}")
+                    failed.extend((event, error) for event in fresh)
+
+            # A retried event gets its own transaction, so one that can never be
+            # saved does not hold back the rest of the customer's scans
+            saved_any = False
+            for index, event in enumerate(retries):
+                rows, error = self._apply(customer_id, [event])
+                if error is None:
+                    saved_any = True
+                    applied += 1
+                    updated += rows
+                    continue
+                failed.append((event, error))
+                if not saved_any:
+                    # Most likely the database rather than the event; try the rest next flush
+                    kept.extend(retries[index + 1:])
+                    break
+
+        for event, error in failed:
+            attempts = event.get("attempts", 0) + 1
+            if attempts >= settings.SCAN_BUFFER_MAX_ATTEMPTS:
+                dead.append({**event, "attempts": attempts, "error": error})
+            else:
+                delay = min(_MAX_RETRY_DELAY, settings.SCAN_BUFFER_RETRY_SECONDS * 2 ** (attempts - 1))
+                kept.append({**event, "attempts": attempts, "retryAt": now + delay})
+        if dead:
+            self._dead_letter(dead)
+
+        old_segments = self._segments
+        self._segments = []
+        if kept:
+            # Keep the unsaved events durable before dropping the files they came from
+            kept.sort(key=lambda event: event["at"])
+            segment = self._open_spool(prefix="retry")
+            segment.handle.writelines(json.dumps(event, separators=(",", ":")) + "\n" for event in kept)
+            segment.handle.flush()
+            os.fsync(segment.handle.fileno())
+            self._segments.append(segment)
+        for segment in old_segments:
+            segment.delete()
+        self._pending = kept
+
+        metrics.inc("scan_buffer_events_flushed_total", applied)
+        metrics.set_gauge("scan_buffer_pending_events", len(self._pending) + len(self._buffered))
+        if applied or failed or dead:
+            logger.info(
+                f"Flushed {applied} scan event(s) ({updated} inventories) for {len(by_customer)} customer(s) "
+                f"in {time.perf_counter() - started:.3f}s, {len(kept)} pending, {len(dead)} dead-lettered"
+            )
+
+    def _apply(self, customer_id: int, events: List[Dict[str, Any]]) -> Tuple[int, Optional[str]]:
+        """Save events in one transaction: (inventories updated, None) or (0, error)"""
+        try:
+            with self._session(customer_id) as db:
+                updated = apply_scan_events(db, customer_id, events)
+                db.commit()
+            return updated, None
+        except Exception as e:
+            return 0, str(e)[:500]
+
+    def _dead_letter(self, events: List[Dict[str, Any]]) -> None:
+        """Append events that will not be saved to this worker's dead-letter file"""
+        path = os.path.join(settings.SCAN_BUFFER_DIR, f"dead-letter-{os.getpid()}.jsonl")
+        dead_at = time.time()
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.writelines(
+                json.dumps({**event, "deadAt": dead_at}, separators=(",", ":")) + "\n" for event in events
+            )
+            handle.flush()
+            os.fsync(handle.fileno())
+        metrics.inc("scan_buffer_dead_letter_total", len(events))
+        for error in sorted({event["error"] for event in events}):
+            ids = [event["id"] for event in events if event["error"] == error]
+            logger.error(
+                f"{len(ids)} scan event(s) not saved, moved to {os.path.basename(path)}: {error} "
+                f"(ids {ids[:20]})"
+            )
+
+    @contextmanager
+    def _session(self, customer_id: int) -> Iterator[Session]:
+        # Routed to the customer's shard like a request of that customer
+        with background_context(f"scan-flush-{uuid.uuid4().hex[:8]}", customer_id, "scan-flush"):
+            db = SessionLocal()
+            try:
+                yield db
+            except BaseException:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+    def _open_spool(self, prefix: str = "spool") -> _Segment:
+        path = os.path.join(settings.SCAN_BUFFER_DIR, f"{prefix}-{os.getpid()}-{time.time_ns()}.log")
+        handle = open(path, "a", encoding="utf-8")
+        if fcntl is not None:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return _Segment(path, handle)
+
+    def _adopt_orphans(self) -> int:
+        """Take over spool files of dead workers (caller holds the condition)"""
+        paths = [
+            os.path.join(settings.SCAN_BUFFER_DIR, name)
+            for name in os.listdir(settings.SCAN_BUFFER_DIR)
+            if name.endswith(".log")
+        ]
+        adopted = 0
+        for path in sorted(paths, key=os.path.getmtime):
+            handle = open(path, "r+", encoding="utf-8")
+            if fcntl is not None:
+                try:
+                    fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    # Live spool of another worker
+                    handle.close()
+                    continue
+            for number, line in enumerate(handle, 1):
+                try:
+                    event = json.loads(line)
+                except ValueError:
+                    # Last line torn by the crash
+                    logger.warning(f"Skipping unreadable line {number} of spool {os.path.basename(path)}")
+                    continue
+                self._pending.append(event)
+                adopted += 1
+            self._segments.append(_Segment(path, handle))
+        return adopted
+
+
+# Global scan buffer instance
+scan_buffer = ScanBuffer()
@@ -0,0 +1,243 @@
+"""
+Online tenant moves between database shards
+
+    python -m app.services.tenant_move 42 shard2
+
+The customer's rows are copied table by table in primary-key chunks while the
+tenant stays live. The tenant is then frozen (writes answer 503 with
+Retry-After), a second pass copies whatever changed during the first one, the
+shard directory is switched to the target and the rows are deleted from the
+source. Every pass is a keyset merge of source and target, so an interrupted
+move can simply be run again.
+
+Ids are copied as-is; shards must hand out disjoint auto-increment ranges
+(e.g. MySQL ``auto_increment_offset``) so moved rows never collide with rows
+created on the target.
+"""
+import argparse
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Table, and_, bindparam, delete, insert, select, tuple_, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import Base, GLOBAL_TABLES, engine, init_db, shard_router, upsert_statement
+from app.models.tenant_shard import TenantShard
+
+logger = logging.getLogger(__name__)
+
+
+def tenant_tables() -> List[Table]:
+    """Tables holding per-customer rows, parents before children"""
+    return [
+        table for table in Base.metadata.sorted_tables
+        if "customer_id" in table.c and table.name not in GLOBAL_TABLES
+    ]
+
+
+class TenantMover:
+    """Copies one customer's rows from its shard to another"""
+
+    def __init__(self, customer_id: int, target: str, chunk_size: Optional[int] = None, grace: float = 5.0):
+        if target not in shard_router.engines:
+            raise ValueError(f"Unknown shard '{target}' (configured: {', '.join(shard_router.engines)})")
+        shard_router.refresh()
+        self.customer_id = customer_id
+        self.source = shard_router.shard_for(customer_id)
+        self.target = target
+        if self.source == self.target:
+            raise ValueError(f"Customer {customer_id} is already on shard '{target}'")
+        self.chunk_size = chunk_size or settings.BULK_INSERT_CHUNK_SIZE
+        # Time for every worker to reload the shard directory, plus in-flight requests
+        self.settle_seconds = settings.SHARD_MAP_TTL_SECONDS + grace
+
+    @property
+    def source_engine(self) -> Engine:
+        return shard_router.engines[self.source]
+
+    @property
+    def target_engine(self) -> Engine:
+        return shard_router.engines[self.target]
+
+    def run(self, keep_source: bool = False) -> Dict[str, Dict[str, int]]:
+        """
+        Move the customer and return per-pass, per-table row counts.
+
+        Args:
+            keep_source: Leave the copied rows on the source shard
+        """
+        Base.metadata.create_all(bind=self.target_engine)
+        report = {}
+
+        logger.info(f"Customer {self.customer_id}: copying {self.source} -> {self.target} (tenant live)")
+        report["copy"] = self._sync()
+
+        logger.info(f"Customer {self.customer_id}: freezing writes for the final pass")
+        self._set_directory(self.source, read_only=True)
+        try:
+            time.sleep(self.settle_seconds)
+            report["final"] = self._sync()
+            self._set_directory(self.target, read_only=False)
+        except BaseException:
+            self._set_directory(self.source, read_only=False)
+            raise
+        logger.info(f"Customer {self.customer_id}: now served from {self.target}")
+
+        if not keep_source:
+            time.sleep(self.settle_seconds)
+            report["cleanup"] = self._delete_source()
+        return report
+
+    def _sync(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        tables = tenant_tables()
+        # Upserts parents first and deletes children first, so foreign keys hold throughout
+        for table in tables:
+            counts[f"{table.name}.upserted"] = self._sync_table(table, deletes=False)
+        for table in reversed(tables):
+            counts[f"{table.name}.deleted"] = self._sync_table(table, deletes=True)
+        return {key: value for key, value in counts.items() if value}
+
+    def _sync_table(self, table: Table, deletes: bool) -> int:
+        pk = list(table.primary_key.columns)
+        pk_expr = tuple_(*pk) if len(pk) > 1 else pk[0]
+
+        def key(row) -> Tuple:
+            return tuple(row[column.name] for column in pk)
+
+        def bound(value: Tuple):
+            return tuple_(*value) if len(pk) > 1 else value[0]
+
+        changed = 0
+        last: Optional[Tuple] = None
+        while True:
+            source_query = select(table).where(table.c.customer_id == self.customer_id)
+            if last is not None:
+                source_query = source_query.where(pk_expr > bound(last))
+            with self.source_engine.connect() as conn:
+                rows = conn.execute(source_query.order_by(*pk).limit(self.chunk_size)).mappings().all()
+            upper = key(rows[-1]) if rows else None
+
+            # Target rows in the same key range; the last range is open-ended
+            target_query = select(table).where(table.c.customer_id == self.customer_id)
+            if last is not None:
+                target_query = target_query.where(pk_expr > bound(last))
+            if upper is not None:
+                target_query = target_query.where(pk_expr <= bound(upper))
+
+            source_rows = {key(row): dict(row) for row in rows}
+            with self.target_engine.begin() as conn:
+                existing = {key(row): dict(row) for row in conn.execute(target_query).mappings()}
+                if deletes:
+                    stale = [k for k in existing if k not in source_rows]
+                    if stale:
+                        conn.execute(delete(table).where(
+                            pk_expr.in_(stale if len(pk) > 1 else [k[0] for k in stale])
+                        ))
+                    changed += len(stale)
+                else:
+                    changed += self._upsert(conn, table, pk, source_rows, existing)
+
+            if upper is None:
+                return changed
+            last = upper
+
+    def _upsert(self, conn, table: Table, pk, source_rows: Dict, existing: Dict) -> int:
+        missing = [row for k, row in source_rows.items() if k not in existing]
+        modified = [row for k, row in source_rows.items() if k in existing and existing[k] != row]
+        if missing:
+            try:
+                conn.execute(insert(table), missing)
+            except IntegrityError as e:
+                raise RuntimeError(
+                    f"Id collision copying {table.name} to shard '{self.target}'; "
+                    f"shards need disjoint auto-increment ranges"
+                ) from e
+        if modified:
+            columns = [column for column in table.columns if column not in pk]
+            stmt = (
+                update(table)
+                .where(and_(*(column == bindparam(f"pk_{column.name}") for column in pk)))
+                .values({column.name: bindparam(column.name) for column in columns})
+            )
+            conn.execute(stmt, [
+                {**{f"pk_{column.name}": row[column.name] for column in pk},
+                 **{column.name: row[column.name] for column in columns}}
+                for row in modified
+            ])
+        return len(missing) + len(modified)
+
+    def _delete_source(self) -> Dict[str, int]:
+        counts = {}
+        for table in reversed(tenant_tables()):
+            pk = list(table.primary_key.columns)
+            pk_expr = tuple_(*pk) if len(pk) > 1 else pk[0]
+            deleted = 0
+            while True:
+                with self.source_engine.begin() as conn:
+                    keys = conn.execute(
+                        select(*pk).where(table.c.customer_id == self.customer_id).limit(self.chunk_size)
+                    ).all()
+                    if not keys:
+                        break
+                    conn.execute(delete(table).where(
+                        pk_expr.in_([tuple(k) for k in keys] if len(pk) > 1 else [k[0] for k in keys])
+                    ))
+                deleted += len(keys)
+            if deleted:
+                counts[table.name] = deleted
+        return counts
+
+    def _set_directory(self, shard: str, read_only: bool) -> None:
+        with Session(bind=engine) as db:
+            stmt = upsert_statement(
+                db,
+                TenantShard,
+                ["customer_id"],
+                lambda proposed: {
+                    "shard": proposed.shard,
+                    "read_only": proposed.read_only,
+                    "updated_at": proposed.updated_at,
+                },
+            )
+            db.execute(stmt, [{
+                "customer_id": self.customer_id,
+                "shard": shard,
+                "read_only": read_only,
+                "updated_at": datetime.now(timezone.utc),
+            }])
+            db.commit()
+        shard_router.refresh()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Move a customer's rows to another database shard")
+    parser.add_argument("customer_id", type=int)
+    parser.add_argument("target", help=f"Target shard ({', '.join(shard_router.engines)})")
+    parser.add_argument("--chunk-size", type=int, default=settings.BULK_INSERT_CHUNK_SIZE)
+    parser.add_argument("--grace", type=float, default=5.0,
+                        help="Seconds added to SHARD_MAP_TTL_SECONDS for in-flight requests to finish")
+    parser.add_argument("--keep-source", action="store_true", help="Do not delete the rows from the source shard")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    init_db()
+
+    try:
+        mover = TenantMover(args.customer_id, args.target, chunk_size=args.chunk_size, grace=args.grace)
+    except ValueError as e:
+        parser.error(str(e))
+    started = time.perf_counter()
+    report = mover.run(keep_source=args.keep_source)
+    for phase, counts in report.items():
+        logger.info(f"{phase}: {counts}")
+    logger.info(f"Moved customer {args.customer_id} to {args.target} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+"""
+Startup warm-up
+
+Right after a deploy every pool is empty, the SQLAlchemy compiled cache is
+cold and the response cache holds nothing, so the first requests of each
+customer pay for connects, statement compilation and full queries. Warm-up
+runs once per worker after startup:
+
+1. Opens WARMUP_POOL_CONNECTIONS connections on every pool (shards and
+   replica) and returns them, so they stay open in the pool.
+2. Finds the WARMUP_TENANTS most active customers (highest total data
+   version, i.e. most committed writes).
+3. Sends each of them the hierarchy and catalog reads the handhelds and the
+   dashboard start with (WARMUP_PATHS) through the application itself. This
+   compiles the hot statements on the customer's shard and fills the
+   response cache with the exact bodies later requests will ask for.
+
+``GET /ready`` answers 503 until warm-up has finished (or timed out after
+WARMUP_TIMEOUT_SECONDS) and then reports the startup time. Warm-up failures
+are logged and never keep a worker out of rotation.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.database import pool_settings, replica_engine, shard_engines
+from app.models.data_version import DataVersion
+from app.utils.auth import create_access_token
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Reads issued for every warmed customer (cached routes first)
+WARMUP_PATHS = (
+    "/api/building/read",
+    "/api/area/read",
+    "/api/floor/read",
+    "/api/detaillocation/readall",
+    "/api/category/read",
+    "/api/item/read",
+    "/api/dashboard/summary",
+    "/api/buildings",
+    "/api/detail-locations",
+    "/api/categories",
+)
+
+
+class Warmup:
+    """Warm-up state of this worker (Singleton pattern)"""
+
+    _instance: Optional['Warmup'] = None
+
+    def __new__(cls) -> 'Warmup':
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+        # Module import is the start of the worker as far as startup time goes
+        self._process_started = time.monotonic()
+        self.ready = False
+        self.startup_seconds: Optional[float] = None
+        self.phases: Dict[str, float] = {}
+        self.tenants_warmed = 0
+        self.requests_failed = 0
+        self._initialized = True
+
+    def status(self) -> Dict[str, Any]:
+        """Readiness details for GET /ready"""
+        return {
+            "status": "ready" if self.ready else "warming",
+            "startupSeconds": self.startup_seconds,
+            "phases": self.phases,
+            "tenantsWarmed": self.tenants_warmed,
+            "requestsFailed": self.requests_failed,
+        }
+
+    def mark_ready(self) -> None:
+        if self.ready:
+            return
+        self.startup_seconds = round(time.monotonic() - self._process_started, 3)
+        self.ready = True
+        metrics.set_gauge("startup_seconds", self.startup_seconds)
+        logger.info(
+            f"Worker ready after {self.startup_seconds}s "
+            f"(warm-up phases: {self.phases}, {self.tenants_warmed} customers warmed)"
+        )
+
+    async def run(self, app) -> None:
+        """Warm this worker up, then report it ready"""
+        try:
+            await asyncio.wait_for(self._warm(app), timeout=settings.WARMUP_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning(f"Warm-up unfinished after {settings.WARMUP_TIMEOUT_SECONDS}s, reporting ready")
+        except Exception as e:
+            logger.error(f"Warm-up failed, reporting ready: {e}")
+        finally:
+            self.mark_ready()
+
+    async def _warm(self, app) -> None:
+        started = time.monotonic()
+        opened = await run_in_threadpool(self._open_pools)
+        self.phases["pools"] = round(time.monotonic() - started, 3)
+        logger.info(f"Warm-up opened {opened} pooled connections")
+
+        started = time.monotonic()
+        customer_ids = await run_in_threadpool(self._active_customers, settings.WARMUP_TENANTS)
+        semaphore = asyncio.Semaphore(max(1, settings.WARMUP_CONCURRENCY))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://warmup") as client:
+            async def warm_customer(customer_id: int) -> None:
+                async with semaphore:
+                    await self._warm_customer(client, customer_id)
+
+            await asyncio.gather(*(warm_customer(customer_id) for customer_id in customer_ids))
+        self.phases["tenants"] = round(time.monotonic() - started, 3)
+
+    def _open_pools(self) -> int:
+        engines: List[Engine] = list(shard_engines.values())
+        if replica_engine is not None:
+            engines.append(replica_engine)
+
+        per_pool = settings.WARMUP_POOL_CONNECTIONS or pool_settings()["pool_size"]
+        per_pool = min(per_pool, pool_settings()["pool_size"])
+        opened = 0
+        for engine in engines:
+            connections = []
+            try:
+                for _ in range(per_pool):
+                    connections.append(engine.connect())
+            except Exception as e:
+                logger.warning(f"Warm-up could not open connections on {engine.url.host or engine.url}: {e}")
+            finally:
+                opened += len(connections)
+                for connection in connections:
+                    connection.close()
+        return opened
+
+    def _active_customers(self, limit: int) -> List[int]:
+        """Customers with the most committed writes, across shards"""
+        if limit <= 0:
+            return []
+        totals: Dict[int, int] = {}
+        for engine in shard_engines.values():
+            with Session(bind=engine) as db:
+                rows = db.execute(
+                    select(DataVersion.customer_id, func.sum(DataVersion.version).label("writes"))
+                    .group_by(DataVersion.customer_id)
+                    .order_by(func.sum(DataVersion.version).desc())
+                    .limit(limit)
+                ).all()
+            for customer_id, writes in rows:
+                totals[customer_id] = max(totals.get(customer_id, 0), writes or 0)
+        return sorted(totals, key=totals.get, reverse=True)[:limit]
+
+    async def _warm_customer(self, client: httpx.AsyncClient, customer_id: int) -> None:
+        token = create_access_token({
+            "customerId": customer_id,
+            "userId": 0,
+            "username": "warmup",
+            "role": "admin",
+            "isActive": True,
+        })
+        headers = {"Authorization": f"Bearer {token}"}
+        for path in WARMUP_PATHS:
+            try:
+                response = await client.get(path, headers=headers)
+                if response.status_code != 200:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+            except Exception as e:
+                self.requests_failed += 1
+                logger.warning(f"Warm-up read {path} failed for customer {customer_id}: {e}")
+        self.tenants_warmed += 1
+
+
+# Global warm-up instance
+warmup = Warmup()
@@ -0,0 +1,153 @@
+"""
+Admission control for database-backed routes
+
+Requests that would queue for a pooled connection longer than their route's
+deadline are refused up front with 503 and ``Retry-After`` instead of waiting
+up to DB_POOL_TIMEOUT_SECONDS while the client gives up. The expected wait is
+estimated per engine from the requests currently holding or waiting for a
+connection, the pool capacity and the recent average connection hold time.
+
+Deadlines default to ADMISSION_DEADLINE_MS and can be set per route:
+
+    @router.get("/export")
+    @admission_deadline(10.0)
+    async def export(...):
+"""
+import math
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.request_context import get_request_context
+
+_DEADLINE_ATTR = "__admission_deadline__"
+_CHECKOUT_KEY = "admission_checkout"
+
+F = TypeVar("F", bound=Callable)
+
+
+class PoolSaturated(RuntimeError):
+    """Raised when a request is refused because the connection pool is saturated"""
+
+    def __init__(self, expected_wait: float, deadline: float):
+        super().__init__(
+            f"Database busy: expected wait {expected_wait:.2f}s exceeds the {deadline:.2f}s deadline"
+        )
+        self.expected_wait = expected_wait
+        self.retry_after = max(1, math.ceil(expected_wait))
+
+
+def admission_deadline(seconds: float) -> Callable[[F], F]:
+    """
+    Declare how long a route may wait for a database connection.
+
+    The endpoint function is returned unchanged; the deadline is read from
+    ``scope["endpoint"]`` at admission time.
+    """
+    def decorator(func: F) -> F:
+        setattr(func, _DEADLINE_ATTR, seconds)
+        return func
+    return decorator
+
+
+class _EngineLoad:
+    """Demand and connection hold time observed on one engine"""
+
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self.in_flight = 0
+        self.avg_hold = 0.05  # Seconds; replaced by observations
+        self.lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        pool = self.engine.pool
+        size = pool.size() if hasattr(pool, "size") else 0
+        return max(1, size + max(0, getattr(pool, "_max_overflow", 0)))
+
+    def expected_wait(self) -> float:
+        # Requests ahead of this one once every connection is taken, served
+        # `capacity` at a time, each holding its connection for avg_hold
+        queued = self.in_flight - self.capacity + 1
+        if queued <= 0:
+            return 0.0
+        return math.ceil(queued / self.capacity) * self.avg_hold
+
+
+class AdmissionController:
+    """Per-engine load tracking and admission decisions"""
+
+    def __init__(self):
+        self._loads: Dict[int, _EngineLoad] = {}
+
+    def instrument(self, engine: Engine, name: str = "primary") -> None:
+        """Observe connection hold times of ``engine``"""
+        if id(engine) in self._loads:
+            return
+        load = _EngineLoad(name, engine)
+        self._loads[id(engine)] = load
+
+        @event.listens_for(engine, "checkout")
+        def _checkout(dbapi_connection, connection_record, connection_proxy):
+            connection_record.info[_CHECKOUT_KEY] = time.perf_counter()
+
+        @event.listens_for(engine, "checkin")
+        def _checkin(dbapi_connection, connection_record):
+            started = connection_record.info.pop(_CHECKOUT_KEY, None)
+            if started is not None:
+                held = time.perf_counter() - started
+                # Exponentially weighted, so the estimate follows load changes within seconds
+                load.avg_hold += 0.1 * (held - load.avg_hold)
+
+    def admit(self, engine: Engine) -> Optional[_EngineLoad]:
+        """
+        Count a request against ``engine``, or refuse it.
+
+        Returns:
+            Token to pass to ``release`` (None when the engine is not instrumented)
+
+        Raises:
+            PoolSaturated: The expected wait exceeds the route's deadline
+        """
+        load = self._loads.get(id(engine))
+        if load is None:
+            return None
+
+        with load.lock:
+            expected = load.expected_wait()
+            if settings.ADMISSION_CONTROL_ENABLED and expected > 0:
+                deadline = self._deadline()
+                if expected > deadline:
+                    ctx = get_request_context()
+                    metrics.inc(
+                        "db_admission_rejected_total",
+                        engine=load.name,
+                        route=ctx.route_template if ctx else None,
+                    )
+                    raise PoolSaturated(expected, deadline)
+            load.in_flight += 1
+        return load
+
+    @staticmethod
+    def release(load: Optional[_EngineLoad]) -> None:
+        """Stop counting a request admitted by ``admit``"""
+        if load is not None:
+            with load.lock:
+                load.in_flight -= 1
+
+    @staticmethod
+    def _deadline() -> float:
+        ctx = get_request_context()
+        endpoint = ctx.scope.get("endpoint") if ctx else None
+        deadline = getattr(endpoint, _DEADLINE_ATTR, None)
+        return deadline if deadline is not None else settings.ADMISSION_DEADLINE_MS / 1000
+
+
+# Global admission controller instance
+admission = AdmissionController()
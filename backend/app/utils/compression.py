@@ -0,0 +1,150 @@
+"""
+Response compression
+
+``CompressionMiddleware`` compresses buffered responses with the best encoding
+the client accepts (brotli when the optional ``brotli`` package is installed,
+otherwise gzip) once they reach COMPRESSION_MIN_SIZE. Streaming responses and
+responses that already carry a Content-Encoding (e.g. precompressed bodies
+served from the response cache) pass through untouched.
+"""
+import gzip
+from typing import List, Optional, Tuple
+
+from app.config import settings
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Preferred first when the client gives several encodings the same weight
+SUPPORTED_ENCODINGS: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml",
+    "text/",
+)
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the content coding to use for an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Raw header value, e.g. ``"gzip;q=0.8, br"``
+
+    Returns:
+        "br", "gzip", or None for identity
+    """
+    weights = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[token] = quality
+
+    wildcard = weights.get("*", 0.0)
+    best, best_quality = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = weights.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """Compress a body with one of SUPPORTED_ENCODINGS"""
+    if encoding == "br":
+        return brotli.compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def is_compressible(content_type: str) -> bool:
+    """Whether a media type is worth compressing (text-like, not already compressed)"""
+    content_type = content_type.lower()
+    if content_type.startswith("text/event-stream"):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def add_vary(headers: List[Tuple[bytes, bytes]]) -> None:
+    """Add Accept-Encoding to the Vary header of raw ASGI headers"""
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == b"vary":
+            if b"accept-encoding" not in value.lower():
+                headers[index] = (name, value + b", Accept-Encoding")
+            return
+    headers.append((b"vary", b"Accept-Encoding"))
+
+
+class CompressionMiddleware:
+    """ASGI middleware negotiating gzip/brotli for complete (non-streaming) responses"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.COMPRESSION_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body" or start_message is None:
+                await send(message)
+                return
+
+            start, start_message = start_message, None
+            headers = list(start.get("headers", []))
+            body = message.get("body", b"")
+            compressible = (
+                not message.get("more_body", False)
+                and len(body) >= settings.COMPRESSION_MIN_SIZE
+                and not any(name.lower() == b"content-encoding" for name, _ in headers)
+                and is_compressible(next(
+                    (value.decode("latin-1") for name, value in headers if name.lower() == b"content-type"),
+                    "",
+                ))
+            )
+            if compressible:
+                body = compress(body, encoding)
+                headers = [
+                    (name, value) for name, value in headers if name.lower() != b"content-length"
+                ]
+                headers.append((b"content-encoding", encoding.encode("latin-1")))
+                headers.append((b"content-length", str(len(body)).encode("latin-1")))
+                add_vary(headers)
+                message = {**message, "body": body}
+
+            await send({**start, "headers": headers})
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
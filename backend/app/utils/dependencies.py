@@ -1,7 +1,7 @@
 """
 FastAPI dependencies for authentication and authorization
 """
-from fastapi import Depends, HTTPException, Header
+from fastapi import Depends, HTTPException, Header, Query
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from typing import Optional
@@ -9,6 +9,7 @@ import logging
 
 from app.database import get_db
 from app.utils.auth import verify_token, extract_token_from_header
+from app.utils.request_context import set_request_customer
 from app.schemas.auth import TokenPayload
 
 logger = logging.getLogger(__name__)
@@ -61,6 +62,48 @@ async def get_current_user(
             detail="User account is not active"
         )
 
+    set_request_customer(payload.customerId)
+
+    return payload
+
+
+async def get_stream_user(
+    authorization: Optional[str] = Header(None),
+    token: Optional[str] = Query(None, description="JWT for clients that cannot set headers (EventSource)")
+) -> TokenPayload:
+    """
+    Get current authenticated user from the Authorization header or a ``token`` query parameter
+
+    Browsers' EventSource cannot send headers, so event streams accept the
+    token in the URL as well.
+
+    Raises:
+        HTTPException: If token is invalid or missing
+    """
+    if authorization:
+        token = extract_token_from_header(authorization)
+
+    if not token:
+        raise HTTPException(
+            status_code=401,
+            detail="Authorization token required"
+        )
+
+    payload = verify_token(token)
+    if not payload:
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid or expired token"
+        )
+
+    if not payload.isActive:
+        raise HTTPException(
+            status_code=403,
+            detail="User account is not active"
+        )
+
+    set_request_customer(payload.customerId)
+
     return payload
 
 
@@ -0,0 +1,183 @@
+"""
+Asynchronous structured logging pipeline
+
+Records are enriched with request context, sampled and rate limited in the
+emitting thread, then handed to a bounded queue. A QueueListener thread does
+the JSON formatting and the stdout writes, so request handlers never block on
+log I/O.
+"""
+import atexit
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.utils.request_context import get_request_context
+
+_listener: Optional[QueueListener] = None
+
+
+def _parse_logger_map(value: str) -> Dict[str, float]:
+    """Parse 'logger.name=value,other.logger=value' settings"""
+    result = {}
+    for entry in value.split(","):
+        if "=" not in entry:
+            continue
+        name, _, number = entry.partition("=")
+        try:
+            result[name.strip()] = float(number)
+        except ValueError:
+            continue
+    return result
+
+
+def _longest_prefix(name: str, table: Dict[str, object]) -> Optional[str]:
+    """Most specific configured logger prefix matching ``name``"""
+    best = None
+    for prefix in table:
+        if (name == prefix or name.startswith(prefix + ".")) and (best is None or len(prefix) > len(best)):
+            best = prefix
+    return best
+
+
+class ContextFilter(logging.Filter):
+    """Attach request_id, customer_id and route of the current request to each record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        ctx = get_request_context()
+        record.request_id = ctx.request_id if ctx else None
+        record.customer_id = ctx.customer_id if ctx else None
+        record.route = ctx.route if ctx else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Per-logger sampling and rate limiting.
+
+    Only records below WARNING are dropped. Loggers are matched by the most
+    specific configured prefix (``app.routers`` also covers
+    ``app.routers.agents``).
+    """
+
+    def __init__(self, sample_rates: Dict[str, float], rate_limits: Dict[str, float]):
+        super().__init__()
+        self.sample_rates = sample_rates
+        self.rate_limits = rate_limits
+        # prefix -> (tokens, last refill time)
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+        self._resolved: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+
+    def _prefixes(self, name: str) -> Tuple[Optional[str], Optional[str]]:
+        resolved = self._resolved.get(name)
+        if resolved is None:
+            resolved = (
+                _longest_prefix(name, self.sample_rates),
+                _longest_prefix(name, self.rate_limits),
+            )
+            self._resolved[name] = resolved
+        return resolved
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+
+        sample_prefix, limit_prefix = self._prefixes(record.name)
+
+        if sample_prefix is not None and random.random() >= self.sample_rates[sample_prefix]:
+            return False
+
+        if limit_prefix is not None:
+            rate = self.rate_limits[limit_prefix]
+            now = time.monotonic()
+            with self._lock:
+                tokens, last = self._buckets.get(limit_prefix, (rate, now))
+                tokens = min(rate, tokens + (now - last) * rate)
+                if tokens < 1:
+                    self._buckets[limit_prefix] = (tokens, now)
+                    return False
+                self._buckets[limit_prefix] = (tokens - 1, now)
+
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller and defers formatting to the listener"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener runs in the same process, so the record can travel
+        # as-is; formatting (and traceback rendering) happens on its thread.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _build_formatter() -> logging.Formatter:
+    if settings.LOG_FORMAT == "json":
+        from pythonjsonlogger.json import JsonFormatter
+
+        return JsonFormatter(
+            "%(asctime)s %(levelname)s %(name)s %(message)s %(request_id)s %(customer_id)s %(route)s",
+            rename_fields={"asctime": "timestamp", "levelname": "level", "name": "logger"},
+        )
+    return logging.Formatter(
+        "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+    )
+
+
+def setup_logging() -> QueueListener:
+    """
+    Route all root-logger output through the queue pipeline.
+
+    Safe to call more than once; the listener is started only once per process.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(_build_formatter())
+
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    sample_rates = _parse_logger_map(settings.LOG_SAMPLING)
+    rate_limits = _parse_logger_map(settings.LOG_RATE_LIMITS)
+    if sample_rates or rate_limits:
+        queue_handler.addFilter(SamplingFilter(sample_rates, rate_limits))
+    queue_handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, settings.LOG_LEVEL.upper(), logging.INFO))
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    _listener = None
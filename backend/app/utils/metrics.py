@@ -0,0 +1,354 @@
+"""
+In-process metrics with Prometheus text exposition
+
+Each worker keeps its own counters, histograms and gauges. When METRICS_DIR
+is set, workers periodically write a JSON snapshot to ``<METRICS_DIR>/<pid>.json``
+and the worker answering a scrape merges the snapshots of all live workers,
+so one ``/metrics`` call reports the whole uvicorn process group.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.utils.request_context import get_request_context
+
+logger = logging.getLogger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+
+METRIC_HELP = {
+    "http_request_duration_seconds": ("histogram", "HTTP request duration by route template"),
+    "http_requests_total": ("counter", "HTTP requests by route template and status class"),
+    "db_queries_per_request": ("histogram", "SQL statements executed per HTTP request"),
+    "db_query_seconds_per_request": ("histogram", "Time spent in SQL per HTTP request"),
+    "db_repeated_statements_total": ("counter", "Requests where one statement shape repeated past QUERY_REPEAT_THRESHOLD"),
+    "db_query_budget_exceeded_total": ("counter", "Requests that ran more SQL statements than the route budget"),
+    "db_slow_queries_total": ("counter", "Statements slower than SLOW_QUERY_THRESHOLD_MS"),
+    "db_pool_checkouts_total": ("counter", "Connections checked out of the pool"),
+    "db_pool_connects_total": ("counter", "New DBAPI connections opened by the pool"),
+    "db_pool_invalidations_total": ("counter", "Pooled connections invalidated"),
+    "db_pool_size": ("gauge", "Configured pool size"),
+    "db_pool_max_overflow": ("gauge", "Configured pool max overflow"),
+    "db_pool_checked_out": ("gauge", "Connections currently checked out"),
+    "db_pool_checked_in": ("gauge", "Idle connections in the pool"),
+    "db_pool_overflow": ("gauge", "Overflow connections currently open"),
+    "event_loop_lag_last_seconds": ("gauge", "Most recent event-loop scheduling lag"),
+    "event_loop_lag_seconds": ("histogram", "Event-loop scheduling lag"),
+    "response_cache_requests_total": ("counter", "Cached read lookups by route and result (hit, miss, not_modified)"),
+    "response_cache_bytes": ("gauge", "Bytes of response bodies (all encodings) held by the response cache"),
+    "device_registry_lookups_total": ("counter", "Device signin lookups by result (hit, miss)"),
+    "device_registry_devices": ("gauge", "Devices loaded into the device registry"),
+    "db_read_routing_total": ("counter", "Heavy reads by target (replica, primary) and routing reason"),
+    "db_admission_rejected_total": ("counter", "Requests shed because the expected pool wait exceeded their deadline"),
+    "jobs_submitted_total": ("counter", "Background jobs queued by kind"),
+    "jobs_rejected_total": ("counter", "Background jobs refused because the queue was full"),
+    "jobs_queued": ("gauge", "Background jobs waiting in this worker queue"),
+    "jobs_finished_total": ("counter", "Background jobs finished by kind and status"),
+    "job_duration_seconds": ("histogram", "Background job run time by kind"),
+    "change_events_published_total": ("counter", "Change events published by transport (redis, local)"),
+    "change_events_dropped_total": ("counter", "Change events dropped because a stream queue was full"),
+    "change_event_streams": ("gauge", "Open change event streams in this worker"),
+    "floor_plans_stored_total": ("counter", "Floor-plan images stored under a new content hash"),
+    "floor_plan_variants_rendered_total": ("counter", "Resized floor-plan variants rendered"),
+    "startup_seconds": ("gauge", "Seconds from worker start until warm-up finished"),
+    "tenant_limit_rejected_total": ("counter", "Requests refused by per-customer limits by endpoint class and reason"),
+    "scan_buffer_pending_events": ("gauge", "Handheld scans spooled but not yet saved"),
+    "scan_buffer_rejected_total": ("counter", "Handheld scans refused because the spool was full"),
+    "scan_buffer_events_flushed_total": ("counter", "Spooled handheld scans saved to the database"),
+    "scan_buffer_stale_scans_total": ("counter", "Spooled scans skipped because a newer scan of the barcode was saved"),
+    "scan_buffer_dead_letter_total": ("counter", "Spooled scans moved to the dead-letter file"),
+}
+
+
+def _labels(**labels: object) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class MetricsRegistry:
+    """Thread-safe metric store for one worker process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self.gauges: Dict[Tuple[str, Labels], float] = {}
+        # (name, labels) -> [bucket bounds, per-bucket counts, sum, count]
+        self.histograms: Dict[Tuple[str, Labels], list] = {}
+        self._engines: List[Tuple[str, Engine]] = []
+
+    def inc(self, name: str, value: float = 1.0, **labels: object) -> None:
+        key = (name, _labels(**labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, **labels: object) -> None:
+        with self._lock:
+            self.gauges[(name, _labels(**labels))] = value
+
+    def observe(self, name: str, value: float, buckets: Sequence[float], **labels: object) -> None:
+        key = (name, _labels(**labels))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = [list(buckets), [0] * (len(buckets) + 1), 0.0, 0]
+                self.histograms[key] = hist
+            bounds, counts = hist[0], hist[1]
+            index = len(bounds)
+            for i, bound in enumerate(bounds):
+                if value <= bound:
+                    index = i
+                    break
+            counts[index] += 1
+            hist[2] += value
+            hist[3] += 1
+
+    # --- Engine / pool instrumentation ---
+
+    def instrument_engine(self, engine: Engine, name: str = "primary") -> None:
+        """Count pool events and expose pool gauges for ``engine``"""
+        self._engines.append((name, engine))
+
+        @event.listens_for(engine, "checkout")
+        def _checkout(dbapi_connection, connection_record, connection_proxy):
+            self.inc("db_pool_checkouts_total", engine=name)
+
+        @event.listens_for(engine, "connect")
+        def _connect(dbapi_connection, connection_record):
+            self.inc("db_pool_connects_total", engine=name)
+
+        @event.listens_for(engine, "invalidate")
+        def _invalidate(dbapi_connection, connection_record, exception):
+            self.inc("db_pool_invalidations_total", engine=name)
+
+    def _refresh_pool_gauges(self) -> None:
+        for name, engine in self._engines:
+            pool = engine.pool
+            for gauge, reader in (
+                ("db_pool_size", "size"),
+                ("db_pool_checked_out", "checkedout"),
+                ("db_pool_checked_in", "checkedin"),
+                ("db_pool_overflow", "overflow"),
+            ):
+                method = getattr(pool, reader, None)
+                if method is not None:
+                    # QueuePool.overflow() counts up from -pool_size
+                    self.set_gauge(gauge, max(0, method()), engine=name)
+            max_overflow = getattr(pool, "_max_overflow", None)
+            if max_overflow is not None:
+                self.set_gauge("db_pool_max_overflow", max_overflow, engine=name)
+
+    # --- Snapshots and exposition ---
+
+    def snapshot(self) -> dict:
+        self._refresh_pool_gauges()
+        with self._lock:
+            return {
+                "counters": [[n, list(l), v] for (n, l), v in self.counters.items()],
+                "gauges": [[n, list(l), v] for (n, l), v in self.gauges.items()],
+                "histograms": [
+                    [n, list(l), h[0], list(h[1]), h[2], h[3]]
+                    for (n, l), h in self.histograms.items()
+                ],
+            }
+
+    def write_snapshot(self) -> None:
+        """Persist this worker's snapshot for cross-worker aggregation"""
+        if not settings.METRICS_DIR:
+            return
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, f"{os.getpid()}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(tmp_path, path)
+
+    def collect_snapshots(self) -> List[Tuple[str, dict]]:
+        """This worker's snapshot plus those written by other live workers"""
+        own_pid = os.getpid()
+        snapshots = [(str(own_pid), self.snapshot())]
+        if not settings.METRICS_DIR or not os.path.isdir(settings.METRICS_DIR):
+            return snapshots
+
+        for filename in os.listdir(settings.METRICS_DIR):
+            if not filename.endswith(".json"):
+                continue
+            pid_text = filename[:-5]
+            if not pid_text.isdigit() or int(pid_text) == own_pid:
+                continue
+            path = os.path.join(settings.METRICS_DIR, filename)
+            if not _pid_alive(int(pid_text)):
+                _remove_quietly(path)
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append((pid_text, json.load(f)))
+            except (OSError, ValueError):
+                continue
+        return snapshots
+
+    def render(self) -> str:
+        """Prometheus text format, merged across workers"""
+        counters: Dict[Tuple[str, Labels], float] = {}
+        gauges: Dict[Tuple[str, Labels], float] = {}
+        histograms: Dict[Tuple[str, Labels], list] = {}
+
+        for pid, snap in self.collect_snapshots():
+            for name, labels, value in snap["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0.0) + value
+            for name, labels, value in snap["gauges"]:
+                # Gauges are per worker; keep them apart with a worker label
+                gauges[(name, tuple(map(tuple, labels)) + (("worker", pid),))] = value
+            for name, labels, bounds, counts, total, count in snap["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                merged = histograms.get(key)
+                if merged is None or merged[0] != bounds:
+                    histograms[key] = [bounds, list(counts), total, count]
+                else:
+                    merged[1] = [a + b for a, b in zip(merged[1], counts)]
+                    merged[2] += total
+                    merged[3] += count
+
+        lines: List[str] = []
+        emitted = set()
+
+        def header(name: str) -> None:
+            if name in emitted:
+                return
+            emitted.add(name)
+            kind, help_text = METRIC_HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name)
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), value in sorted(gauges.items()):
+            header(name)
+            lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), (bounds, counts, total, count) in sorted(histograms.items()):
+            header(name)
+            cumulative = 0
+            for bound, bucket_count in zip(list(bounds) + ["+Inf"], counts):
+                cumulative += bucket_count
+                le = bound if bound == "+Inf" else _format_value(bound)
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    labels = list(labels)
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+# Global registry for this worker
+metrics = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and SQL usage per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_holder = {"status": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", None) or "<unmatched>"
+            method = scope.get("method", "")
+            status_class = f"{status_holder['status'] // 100}xx"
+
+            metrics.observe("http_request_duration_seconds", elapsed, LATENCY_BUCKETS,
+                            method=method, route=route)
+            metrics.inc("http_requests_total", method=method, route=route, status=status_class)
+
+            ctx = get_request_context()
+            if ctx is not None:
+                metrics.observe("db_queries_per_request", ctx.db_queries, QUERY_COUNT_BUCKETS,
+                                route=route)
+                metrics.observe("db_query_seconds_per_request", ctx.db_time, LATENCY_BUCKETS,
+                                route=route)
+
+
+async def monitor_event_loop_lag(interval: float = 0.5) -> None:
+    """Measure how late the event loop wakes a sleeping task; runs until cancelled"""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(0.0, loop.time() - expected)
+        metrics.set_gauge("event_loop_lag_last_seconds", lag)
+        metrics.observe("event_loop_lag_seconds", lag, LOOP_LAG_BUCKETS)
+
+
+async def flush_snapshots_periodically() -> None:
+    """Write this worker's snapshot every METRICS_FLUSH_SECONDS; runs until cancelled"""
+    while True:
+        await asyncio.sleep(settings.METRICS_FLUSH_SECONDS)
+        try:
+            await asyncio.to_thread(metrics.write_snapshot)
+        except OSError as e:
+            logger.warning(f"Could not write metrics snapshot: {e}")
+
+
+def remove_snapshot() -> None:
+    """Drop this worker's snapshot file on shutdown"""
+    if settings.METRICS_DIR:
+        _remove_quietly(os.path.join(settings.METRICS_DIR, f"{os.getpid()}.json"))
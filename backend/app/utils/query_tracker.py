@@ -0,0 +1,163 @@
+"""
+Per-request SQL statement accounting via SQLAlchemy cursor events
+
+Counts statements and DB time for the request being served, flags statement
+shapes repeated within one request (the usual N+1 signature), reports the
+totals in a ``Server-Timing`` header and checks routes against the query
+budget declared with ``@query_budget``.
+"""
+import logging
+import re
+import time
+from functools import lru_cache
+from typing import Callable, Optional, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.request_context import RequestContext, get_request_context
+
+logger = logging.getLogger(__name__)
+
+_START_KEY = "query_tracker_start"
+_BUDGET_ATTR = "__query_budget__"
+
+# Expanded IN lists / multi-value tuples: (?, ?, ?) or (%s, %s) or (:p1, :p2)
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+|\$\d+))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+F = TypeVar("F", bound=Callable)
+
+
+class QueryBudgetExceeded(RuntimeError):
+    """Raised (when QUERY_BUDGET_ENFORCE is on) once a route runs more statements than its budget"""
+
+
+def query_budget(max_queries: int) -> Callable[[F], F]:
+    """
+    Declare the maximum number of SQL statements a route may execute.
+
+    The endpoint function is returned unchanged (FastAPI still sees its real
+    signature); the budget is read from ``scope["endpoint"]`` at runtime.
+
+    Args:
+        max_queries: Statements allowed per request, including dependencies
+    """
+    def decorator(func: F) -> F:
+        setattr(func, _BUDGET_ATTR, max_queries)
+        return func
+    return decorator
+
+
+def route_budget(ctx: RequestContext) -> Optional[int]:
+    """Query budget declared on the endpoint matched for this request, if any"""
+    return getattr(ctx.scope.get("endpoint"), _BUDGET_ATTR, None)
+
+
+@lru_cache(maxsize=4096)
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so the same query with different IN-list lengths compares equal"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    return _PLACEHOLDER_LIST.sub("(?…)", shape)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    ctx = get_request_context()
+    if ctx is not None and settings.QUERY_BUDGET_ENFORCE:
+        budget = route_budget(ctx)
+        if budget is not None and ctx.db_queries >= budget:
+            raise QueryBudgetExceeded(
+                f"{ctx.method} {ctx.route} exceeded its query budget of {budget} statements"
+            )
+    conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info[_START_KEY].pop()
+    ctx = get_request_context()
+    if ctx is None:
+        return
+    ctx.db_queries += 1
+    ctx.db_time += time.perf_counter() - started
+    if settings.QUERY_REPEAT_THRESHOLD > 0:
+        ctx.statement_counts[statement_shape(statement)] += 1
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not fire for failed statements
+    conn = exception_context.connection
+    if conn is not None and conn.info.get(_START_KEY):
+        conn.info[_START_KEY].pop()
+
+
+def install_query_tracker(engine: Engine) -> None:
+    """Count statements and DB time per request on ``engine``"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _report(ctx: RequestContext) -> None:
+    """Log repeated statement shapes and budget overruns once the request has finished"""
+    route = ctx.route_template or "<unmatched>"
+
+    threshold = settings.QUERY_REPEAT_THRESHOLD
+    if threshold > 0:
+        for shape, count in ctx.statement_counts.items():
+            if count >= threshold:
+                metrics.inc("db_repeated_statements_total", route=route)
+                logger.warning(
+                    f"Possible N+1 on {ctx.method} {route}: statement ran {count} times "
+                    f"({ctx.db_queries} total): {shape[:300]}"
+                )
+
+    budget = route_budget(ctx)
+    if budget is not None and ctx.db_queries > budget:
+        metrics.inc("db_query_budget_exceeded_total", route=route)
+        logger.warning(
+            f"{ctx.method} {route} ran {ctx.db_queries} SQL statements (budget {budget})"
+        )
+
+
+class QueryTrackingMiddleware:
+    """
+    ASGI middleware reporting per-request SQL usage.
+
+    Must run inside RequestContextMiddleware. Adds
+    ``Server-Timing: db;dur=..;desc="N queries", app;dur=..`` to responses
+    when SERVER_TIMING_ENABLED is set. Statements issued after the response
+    headers are sent (streamed bodies) are still counted in the logs.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        ctx = get_request_context()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and ctx is not None and settings.SERVER_TIMING_ENABLED:
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                value = (
+                    f'db;dur={ctx.db_time * 1000:.1f};desc="{ctx.db_queries} queries", '
+                    f"app;dur={elapsed_ms:.1f}"
+                )
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", value.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if ctx is not None:
+                _report(ctx)
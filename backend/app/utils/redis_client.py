@@ -0,0 +1,44 @@
+"""
+Shared Redis connection (optional)
+
+Redis is only used when CACHE_ENABLED is set and the ``redis`` package is
+installed; callers get None otherwise and fall back to per-worker state.
+"""
+import logging
+import threading
+from typing import Optional
+
+from app.config import settings
+
+try:
+    import redis
+except ImportError:  # pragma: no cover - optional dependency
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_lock = threading.Lock()
+
+
+def get_redis() -> Optional["redis.Redis"]:
+    """
+    Return the process-wide Redis client, or None when Redis is not configured
+
+    The client is created lazily; connection errors surface on first use and
+    callers are expected to treat them as "Redis unavailable".
+    """
+    global _client
+    if not settings.CACHE_ENABLED or redis is None:
+        return None
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = redis.Redis.from_url(
+                    settings.REDIS_URL,
+                    socket_timeout=2,
+                    socket_connect_timeout=2,
+                    health_check_interval=30,
+                )
+                logger.info("Redis client created")
+    return _client
@@ -0,0 +1,110 @@
+"""
+Request-scoped context (request id, route, customer) shared with logging
+"""
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional
+
+
+@dataclass
+class RequestContext:
+    """Mutable per-request state; handlers and dependencies fill it in as they learn more"""
+    request_id: str
+    method: str = ""
+    path: str = ""
+    customer_id: Optional[int] = None
+    tenant_limited: bool = False  # Per-customer limits already applied (see tenant_limits)
+    scope: Dict[str, Any] = field(default_factory=dict, repr=False)
+
+    # SQL statements executed on behalf of this request (see query_tracker)
+    db_queries: int = 0
+    db_time: float = 0.0
+    statement_counts: Counter = field(default_factory=Counter, repr=False)
+
+    @property
+    def route(self) -> str:
+        """Route template once the router has matched (e.g. /api/inventories/{inventory_id})"""
+        route = self.scope.get("route")
+        return getattr(route, "path", None) or self.path
+
+    @property
+    def route_template(self) -> Optional[str]:
+        """Matched route template, or None for unmatched paths (keeps metric labels bounded)"""
+        return getattr(self.scope.get("route"), "path", None)
+
+
+_request_context: ContextVar[Optional[RequestContext]] = ContextVar("request_context", default=None)
+
+
+def get_request_context() -> Optional[RequestContext]:
+    """Return the context of the request being handled, if any"""
+    return _request_context.get()
+
+
+def set_request_customer(customer_id: int) -> None:
+    """Record the authenticated customer on the current request context"""
+    ctx = _request_context.get()
+    if ctx is not None:
+        ctx.customer_id = customer_id
+
+
+@contextmanager
+def background_context(request_id: str, customer_id: Optional[int], label: str) -> Iterator[RequestContext]:
+    """
+    Open a RequestContext for work running outside an HTTP request (background jobs).
+
+    Gives the work the customer's shard routing and read-your-writes, and its
+    log records a request id.
+    """
+    ctx = RequestContext(request_id=request_id, method="JOB", path=label, customer_id=customer_id)
+    token = _request_context.set(ctx)
+    try:
+        yield ctx
+    finally:
+        _request_context.reset(token)
+
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware that opens a RequestContext for every HTTP request.
+
+    Honors an incoming ``X-Request-ID`` header and echoes the id back on the
+    response.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", []):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+
+        ctx = RequestContext(
+            request_id=request_id or uuid.uuid4().hex,
+            method=scope.get("method", ""),
+            path=scope.get("path", ""),
+            scope=scope,
+        )
+        token = _request_context.set(ctx)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", ctx.request_id.encode("latin-1")))
+                message["headers"] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            _request_context.reset(token)
@@ -0,0 +1,196 @@
+"""
+Version-validated response cache
+
+Read endpoints whose payload depends only on the customer, the query string
+and a few of the customer's tables call ``lookup`` before running their query:
+
+    cached = response_cache.lookup(request, db, customer_id, ("buildings",))
+    if cached is not None:
+        return cached
+    ...
+    return response_cache.store(request, rows_response(rows, fields))
+
+The ETag is derived from the customer's data versions (see
+``app.services.change_tracking``), so one primary-key read decides whether the
+client's copy (304) or a cached body can be served. Bodies are kept per ETag
+together with their gzip/brotli encodings, so a repeat request skips both the
+query and the compression. The cache is per worker and bounded by
+RESPONSE_CACHE_MAX_MB; entries of superseded versions are simply never hit
+again and age out of the LRU.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.services.change_tracking import change_tracker
+from app.utils.compression import compress, negotiate_encoding
+from app.utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Clients keep the body but must revalidate it with If-None-Match before reuse
+CACHE_CONTROL = "private, no-cache"
+
+
+@dataclass
+class CachedBody:
+    """One cached response and the encodings produced for it so far"""
+    status_code: int
+    media_type: Optional[str]
+    bodies: Dict[str, bytes] = field(default_factory=dict)  # "identity" / "gzip" / "br" -> body
+
+    @property
+    def size(self) -> int:
+        return sum(len(body) for body in self.bodies.values())
+
+
+class ResponseCache:
+    """Per-worker LRU of rendered responses keyed by ETag"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedBody]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def lookup(
+        self,
+        request: Request,
+        db: Session,
+        customer_id: int,
+        tables: Iterable[str],
+    ) -> Optional[Response]:
+        """
+        Answer a read from the client's copy or the cache when the data is unchanged.
+
+        Must run after authentication. On a miss the computed ETag is kept on
+        ``request.state`` for ``store``.
+
+        Args:
+            request: Incoming request (path, query string and conditional headers)
+            db: Database session used to read the data versions
+            customer_id: Customer whose data the response shows
+            tables: Tables the response is built from
+
+        Returns:
+            A 304 or cached response, or None when the endpoint must build the body
+        """
+        if not settings.RESPONSE_CACHE_ENABLED:
+            return None
+
+        versions = change_tracker.versions(db, customer_id, tables)
+        key = "|".join((
+            str(customer_id),
+            request.url.path,
+            "&".join(sorted(request.url.query.split("&"))),
+            ",".join(f"{table}={version}" for table, version in sorted(versions.items())),
+        ))
+        etag = f'W/"{hashlib.sha1(key.encode()).hexdigest()[:27]}"'
+        request.state.response_etag = etag
+
+        route = request.scope.get("route")
+        route = getattr(route, "path", request.url.path)
+
+        if_none_match = request.headers.get("if-none-match", "")
+        if etag in (tag.strip() for tag in if_none_match.split(",")):
+            metrics.inc("response_cache_requests_total", route=route, result="not_modified")
+            return Response(status_code=304, headers=self._headers(etag))
+
+        with self._lock:
+            entry = self._entries.get(etag)
+            if entry is not None:
+                self._entries.move_to_end(etag)
+        if entry is None:
+            metrics.inc("response_cache_requests_total", route=route, result="miss")
+            return None
+
+        metrics.inc("response_cache_requests_total", route=route, result="hit")
+        return self._respond(request, etag, entry)
+
+    def store(self, request: Request, response: Response) -> Response:
+        """
+        Cache a freshly rendered response under the ETag computed by ``lookup``.
+
+        Args:
+            request: Request previously passed to ``lookup``
+            response: Rendered (non-streaming) response of the endpoint
+
+        Returns:
+            The response to send, encoded for the client and carrying the ETag
+        """
+        etag = getattr(request.state, "response_etag", None)
+        if etag is None or response.status_code != 200:
+            return response
+
+        entry = CachedBody(
+            status_code=response.status_code,
+            media_type=response.media_type,
+            bodies={"identity": bytes(response.body)},
+        )
+        served = self._respond(request, etag, entry)
+
+        if entry.size <= self.max_bytes // 4:
+            with self._lock:
+                previous = self._entries.pop(etag, None)
+                if previous is not None:
+                    self._size -= previous.size
+                self._entries[etag] = entry
+                self._size += entry.size
+                self._evict()
+        return served
+
+    def clear(self) -> None:
+        """Drop every cached body"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _respond(self, request: Request, etag: str, entry: CachedBody) -> Response:
+        identity = entry.bodies["identity"]
+        encoding = None
+        if len(identity) >= settings.COMPRESSION_MIN_SIZE and settings.COMPRESSION_ENABLED:
+            encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+
+        headers = self._headers(etag)
+        if encoding is None:
+            body = identity
+        else:
+            body = entry.bodies.get(encoding)
+            if body is None:
+                body = compress(identity, encoding)
+                with self._lock:
+                    if etag in self._entries and encoding not in entry.bodies:
+                        self._size += len(body)
+                    entry.bodies[encoding] = body
+                    self._evict()
+            headers["Content-Encoding"] = encoding
+
+        return Response(
+            content=body,
+            status_code=entry.status_code,
+            media_type=entry.media_type,
+            headers=headers,
+        )
+
+    @staticmethod
+    def _headers(etag: str) -> Dict[str, str]:
+        return {"ETag": etag, "Cache-Control": CACHE_CONTROL, "Vary": "Accept-Encoding"}
+
+    def _evict(self) -> None:
+        # Caller holds the lock
+        while self._size > self.max_bytes and self._entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+        metrics.set_gauge("response_cache_bytes", self._size)
+
+
+# Global response cache instance
+response_cache = ResponseCache(settings.RESPONSE_CACHE_MAX_MB * 1024 * 1024)
@@ -0,0 +1,55 @@
+"""
+Fast JSON responses
+
+``FastJSONResponse`` renders with orjson when it is installed and produces
+byte-for-byte the same body as Starlette's JSONResponse (compact separators,
+UTF-8, non-string dict keys converted to strings). ``rows_response`` renders
+SQLAlchemy ``Row`` tuples straight to a JSON array of objects, skipping the
+per-row Pydantic model and ``jsonable_encoder`` passes of large list
+endpoints.
+"""
+import json
+from typing import Any, Iterable, Sequence
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to JSON bytes exactly like JSONResponse.render"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when available"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def rows_response(rows: Iterable[Sequence], fields: Sequence[str], status_code: int = 200) -> FastJSONResponse:
+    """
+    Render result rows as a JSON list of objects.
+
+    Args:
+        rows: Row tuples (``db.query(col, ...).all()`` or ``db.execute(select(...))``)
+            whose values are already JSON types
+        fields: Key for each column, in the order of the response model fields
+        status_code: HTTP status of the response
+
+    Returns:
+        Response carrying the rendered body
+    """
+    return FastJSONResponse([dict(zip(fields, row)) for row in rows], status_code=status_code)
@@ -0,0 +1,225 @@
+"""
+Opt-in slow-query recorder
+
+Statements slower than SLOW_QUERY_THRESHOLD_MS are captured in the request
+thread (statement shape, bound-parameter types, route, customer) and handed
+to a background thread. That thread runs ``EXPLAIN`` on a dedicated
+single-connection engine for the database the statement ran on (each shard
+and the replica get their own), so plans never compete with request traffic
+for pool connections, and appends one JSON line per query to a rotating file in
+SLOW_QUERY_LOG_DIR. Parameter values are only kept in memory for the EXPLAIN
+and are never written out.
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.query_tracker import statement_shape
+from app.utils.request_context import get_request_context
+
+logger = logging.getLogger(__name__)
+
+_START_KEY = "slow_query_start"
+_EXPLAINABLE = ("SELECT", "UPDATE", "DELETE", "WITH")
+
+
+def _param_types(parameters: Any, executemany: bool) -> Any:
+    """Type names of bound parameters (values are deliberately dropped)"""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "types": _param_types(rows[0], False) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+class SlowQueryLog:
+    """Engine-level slow statement recorder with asynchronous EXPLAIN"""
+
+    def __init__(self):
+        self._queue: queue.Queue = queue.Queue(maxsize=1000)
+        self._thread: Optional[threading.Thread] = None
+        self._explain_engines: Dict[Engine, Engine] = {}  # Recorded engine -> its EXPLAIN engine
+        self._writer: Optional[logging.Logger] = None
+        self.dropped = 0
+
+    @property
+    def log_path(self) -> str:
+        return os.path.join(settings.SLOW_QUERY_LOG_DIR, f"{os.getpid()}.jsonl")
+
+    def install(self, engine: Engine) -> None:
+        """Start recording statements on ``engine`` slower than the threshold (once per engine)"""
+        if event.contains(engine, "after_cursor_execute", self._after_cursor_execute):
+            return
+
+        if self._writer is None:
+            os.makedirs(settings.SLOW_QUERY_LOG_DIR, exist_ok=True)
+            handler = RotatingFileHandler(
+                self.log_path,
+                maxBytes=settings.SLOW_QUERY_LOG_MAX_BYTES,
+                backupCount=settings.SLOW_QUERY_LOG_BACKUPS,
+                encoding="utf-8",
+            )
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            writer = logging.getLogger("app.slow_queries.file")
+            writer.propagate = False
+            writer.setLevel(logging.INFO)
+            writer.addHandler(handler)
+            self._writer = writer
+
+        if settings.SLOW_QUERY_EXPLAIN:
+            # Own one-connection pool on the same database, without the recorder's listeners
+            self._explain_engines[engine] = create_engine(
+                engine.url,
+                pool_size=1,
+                max_overflow=0,
+                pool_pre_ping=True,
+                pool_recycle=1800,
+            )
+
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        event.listen(engine, "handle_error", self._handle_error)
+
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="slow-query-log", daemon=True)
+            self._thread.start()
+        logger.info(
+            f"Slow-query log enabled on {engine.url.host or engine.url.database} "
+            f"(threshold {settings.SLOW_QUERY_THRESHOLD_MS} ms, file {self.log_path})"
+        )
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info[_START_KEY].pop()
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms < settings.SLOW_QUERY_THRESHOLD_MS:
+            return
+
+        ctx = get_request_context()
+        route = ctx.route_template if ctx else None
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "durationMs": round(duration_ms, 2),
+            "statement": statement_shape(statement),
+            "paramTypes": _param_types(parameters, executemany),
+            "executemany": executemany,
+            "method": ctx.method if ctx else None,
+            "route": route,
+            "requestId": ctx.request_id if ctx else None,
+            "customerId": ctx.customer_id if ctx else None,
+        }
+        metrics.inc("db_slow_queries_total", route=route or "<background>")
+
+        try:
+            self._queue.put_nowait((entry, conn.engine, statement, None if executemany else parameters))
+        except queue.Full:
+            self.dropped += 1
+
+    def _handle_error(self, exception_context):
+        conn = exception_context.connection
+        if conn is not None and conn.info.get(_START_KEY):
+            conn.info[_START_KEY].pop()
+
+    def _explain(self, engine: Engine, statement: str, parameters: Any) -> Optional[List[Dict[str, Any]]]:
+        """Query plan of ``statement`` on the database it ran on; None when it cannot (or should not) be explained"""
+        explain_engine = self._explain_engines.get(engine)
+        if explain_engine is None or parameters is None:
+            return None
+        if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+            return None
+
+        prefix = "EXPLAIN QUERY PLAN " if explain_engine.dialect.name == "sqlite" else "EXPLAIN "
+        with explain_engine.connect() as conn:
+            result = conn.exec_driver_sql(prefix + statement, parameters)
+            plan = [
+                {key: value if isinstance(value, (int, float, type(None))) else str(value)
+                 for key, value in row._mapping.items()}
+                for row in result
+            ]
+            conn.rollback()
+        return plan
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            entry, engine, statement, parameters = item
+            try:
+                entry["plan"] = self._explain(engine, statement, parameters)
+            except Exception as e:
+                entry["plan"] = None
+                entry["explainError"] = str(e)[:500]
+            self._writer.info(json.dumps(entry, default=str))
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Write out queued entries and stop the background thread"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+        for explain_engine in self._explain_engines.values():
+            explain_engine.dispose()
+
+    def recent(
+        self,
+        limit: int = 100,
+        customer_id: Optional[int] = None,
+        route: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Latest entries from the current log file of every worker, newest first
+
+        Args:
+            limit: Maximum entries to return
+            customer_id: Keep only this customer's queries and those outside any tenant request
+            route: Keep only queries issued by this route template
+        """
+        directory = settings.SLOW_QUERY_LOG_DIR
+        if not os.path.isdir(directory):
+            return []
+
+        entries = []
+        for name in os.listdir(directory):
+            if not name.endswith(".jsonl"):
+                continue
+            try:
+                with open(os.path.join(directory, name), encoding="utf-8") as f:
+                    lines = deque(f, maxlen=limit * 4)
+            except OSError:
+                continue
+            for line in lines:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                if customer_id is not None and entry.get("customerId") not in (None, customer_id):
+                    continue
+                if route and entry.get("route") != route:
+                    continue
+                entries.append(entry)
+
+        entries.sort(key=lambda e: e.get("timestamp", ""), reverse=True)
+        return entries[:limit]
+
+
+# Global recorder (idle until install() is called)
+slow_query_log = SlowQueryLog()
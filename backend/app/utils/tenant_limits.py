@@ -0,0 +1,333 @@
+"""
+Per-customer limits for heavy routes
+
+Pool admission (``app.utils.admission``) protects the database from total
+load; these limits keep one customer from taking all of it. Routes declare
+an endpoint class, and each customer gets per class:
+
+- a token bucket: ``rate`` requests per second sustained, ``burst`` at once
+- a concurrency cap: at most ``concurrency`` requests running
+- a queue bound: at most ``queue`` requests waiting (up to
+  TENANT_LIMIT_QUEUE_SECONDS) for a running one to finish; a worker queues
+  at most TENANT_LIMIT_MAX_QUEUED requests over all customers
+
+    @router.get("/duplicates")
+    @tenant_limit("heavy_read")
+    async def get_duplicates(...):
+
+Anything over the limits is refused with ``TenantLimitExceeded`` (429 with
+``Retry-After``). The check runs in the async ``tenant_slot`` dependency of
+``get_db`` / ``get_read_db``, after authentication has recorded the customer
+and before the session opens; queued requests wait on the event loop, not in
+a threadpool thread. With Redis (CACHE_ENABLED) buckets and running slots are shared by
+all workers; slots of a crashed worker expire after TENANT_LIMIT_LEASE_SECONDS.
+Redis calls run in the threadpool, never on the event loop or under the
+local lock. Queues are always per worker. When Redis fails, limits fall back
+to this worker.
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.utils.metrics import metrics
+from app.utils.redis_client import get_redis
+from app.utils.request_context import get_request_context
+
+logger = logging.getLogger(__name__)
+
+_CLASS_ATTR = "__tenant_limit_class__"
+_KEY_PREFIX = "scanandgo:tenant_limit"
+_MAX_STATES = 10000  # Idle entries are pruned beyond this
+_POLL_SECONDS = 0.05  # Re-check of the running slots while queued
+
+F = TypeVar("F", bound=Callable)
+
+
+@dataclass(frozen=True)
+class LimitPolicy:
+    """Limits of one endpoint class, per customer"""
+    concurrency: int
+    rate: float  # Requests per second
+    burst: int
+    queue: int
+
+
+# Endpoint class -> policy (TENANT_LIMITS overrides, "class=concurrency/rate/burst/queue")
+DEFAULT_POLICIES: Dict[str, LimitPolicy] = {
+    "heavy_read": LimitPolicy(concurrency=4, rate=5.0, burst=20, queue=8),
+    "bulk_write": LimitPolicy(concurrency=2, rate=1.0, burst=5, queue=2),
+    "export": LimitPolicy(concurrency=1, rate=0.2, burst=3, queue=1),
+}
+
+# KEYS: bucket hash. ARGV: rate, burst, now. Returns {1, 0} or {0, seconds until a token}
+_TAKE_TOKEN = """
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens') or ARGV[2])
+local updated = tonumber(redis.call('HGET', KEYS[1], 'updated') or ARGV[3])
+local rate, burst, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3])
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+if allowed == 1 then return {1, '0'} end
+return {0, tostring((1 - tokens) / rate)}
+"""
+
+# KEYS: slot set. ARGV: slot id, cap, now, lease. Returns 1 when the slot was taken
+_TAKE_SLOT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[3])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+  redis.call('ZADD', KEYS[1], tonumber(ARGV[3]) + tonumber(ARGV[4]), ARGV[1])
+  redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+  return 1
+end
+return 0
+"""
+
+
+class TenantLimitExceeded(RuntimeError):
+    """Raised when a customer is over its limits for an endpoint class"""
+
+    def __init__(self, customer_id: int, endpoint_class: str, reason: str, retry_after: float):
+        super().__init__(f"Too many {endpoint_class} requests for this account ({reason}), retry shortly")
+        self.customer_id = customer_id
+        self.endpoint_class = endpoint_class
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+def tenant_limit(endpoint_class: str) -> Callable[[F], F]:
+    """
+    Put a route in an endpoint class of per-customer limits.
+
+    The endpoint function is returned unchanged; the class is read from
+    ``scope["endpoint"]`` when the route opens its database session.
+    """
+    if endpoint_class not in DEFAULT_POLICIES:
+        raise ValueError(f"Unknown tenant limit class: {endpoint_class}")
+
+    def decorator(func: F) -> F:
+        setattr(func, _CLASS_ATTR, endpoint_class)
+        return func
+    return decorator
+
+
+def _parse_policies(value: str) -> Dict[str, LimitPolicy]:
+    policies = dict(DEFAULT_POLICIES)
+    for part in value.split(","):
+        name, sep, spec = part.strip().partition("=")
+        if not sep:
+            continue
+        try:
+            concurrency, rate, burst, queue = spec.split("/")
+            policies[name.strip()] = LimitPolicy(int(concurrency), float(rate), int(burst), int(queue))
+        except ValueError:
+            logger.warning(f"Ignoring malformed TENANT_LIMITS entry: {part.strip()}")
+    return policies
+
+
+class _LocalState:
+    """Bucket, running and waiting requests of one customer and class in this worker"""
+
+    def __init__(self, burst: int):
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.running = 0
+        self.waiting = 0
+
+
+@dataclass
+class _Slot:
+    key: Tuple[int, str]
+    redis_member: Optional[str] = None
+
+
+class TenantLimiter:
+    """Token buckets and concurrency slots per (customer, endpoint class)"""
+
+    def __init__(self):
+        self.policies = _parse_policies(settings.TENANT_LIMITS)
+        self._states: Dict[Tuple[int, str], _LocalState] = {}
+        self._lock = threading.Lock()
+        self._queued = 0  # Waiting requests of all customers in this worker
+        self._scripts = None
+
+    async def enter(self) -> Optional[_Slot]:
+        """
+        Apply the limits of the current request's route, once per request.
+
+        Returns:
+            Slot to pass to ``exit`` (None when the route is not limited or
+            the request already holds its slot)
+
+        Raises:
+            TenantLimitExceeded: The customer is over its share
+        """
+        if not settings.TENANT_LIMITS_ENABLED:
+            return None
+        ctx = get_request_context()
+        if ctx is None or ctx.customer_id is None or ctx.tenant_limited:
+            return None
+        endpoint_class = getattr(ctx.scope.get("endpoint"), _CLASS_ATTR, None)
+        if endpoint_class is None:
+            return None
+
+        slot = await self.acquire(ctx.customer_id, endpoint_class)
+        ctx.tenant_limited = True
+        return slot
+
+    async def exit(self, slot: Optional[_Slot]) -> None:
+        if slot is not None:
+            await self.release(slot)
+
+    async def acquire(self, customer_id: int, endpoint_class: str) -> _Slot:
+        """Take a token and a running slot, waiting in the bounded queue if needed"""
+        policy = self.policies[endpoint_class]
+        key = (customer_id, endpoint_class)
+
+        wait = await self._take_token(key, policy)
+        if wait > 0:
+            self._reject(key, "rate", wait)
+
+        slot = _Slot(key)
+        if await self._take_slot(slot, policy):
+            return slot
+        with self._lock:
+            state = self._state(key, policy)
+            if state.waiting >= policy.queue:
+                self._reject(key, "concurrency", 1)
+            if self._queued >= settings.TENANT_LIMIT_MAX_QUEUED:
+                self._reject(key, "worker queue full", 1)
+            state.waiting += 1
+            self._queued += 1
+
+        deadline = time.monotonic() + settings.TENANT_LIMIT_QUEUE_SECONDS
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._reject(key, "queue timeout", 1)
+                # Releases are not signalled (other workers' never could be), so poll
+                await asyncio.sleep(min(remaining, _POLL_SECONDS))
+                if await self._take_slot(slot, policy):
+                    return slot
+        finally:
+            with self._lock:
+                state.waiting -= 1
+                self._queued -= 1
+
+    async def release(self, slot: _Slot) -> None:
+        """Free a slot taken by ``acquire``"""
+        # Local count first: a cancelled request must not leak it
+        with self._lock:
+            state = self._states.get(slot.key)
+            if state is not None:
+                state.running -= 1
+        if slot.redis_member is not None:
+            try:
+                await run_in_threadpool(
+                    get_redis().zrem, self._redis_key(slot.key, "slots"), slot.redis_member
+                )
+            except Exception as e:
+                logger.warning(f"Tenant limit slot not released in Redis (expires with its lease): {e}")
+
+    def _state(self, key: Tuple[int, str], policy: LimitPolicy) -> _LocalState:
+        # Caller holds the lock
+        state = self._states.get(key)
+        if state is None:
+            if len(self._states) >= _MAX_STATES:
+                self._prune()
+            state = self._states[key] = _LocalState(policy.burst)
+        return state
+
+    def _prune(self) -> None:
+        """Forget idle customers whose bucket has refilled (a new state starts full)"""
+        now = time.monotonic()
+        for key, state in list(self._states.items()):
+            policy = self.policies[key[1]]
+            if state.running == 0 and state.waiting == 0 and \
+                    state.tokens + (now - state.updated) * policy.rate >= policy.burst:
+                del self._states[key]
+
+    async def _take_token(self, key: Tuple[int, str], policy: LimitPolicy) -> float:
+        """0 when a token was taken, else seconds until one is available"""
+        client = get_redis()
+        if client is not None:
+            try:
+                allowed, wait = await run_in_threadpool(
+                    self._redis_scripts(client)[0],
+                    keys=[self._redis_key(key, "bucket")],
+                    args=[policy.rate, policy.burst, time.time()],
+                )
+                return 0.0 if int(allowed) else float(wait)
+            except Exception as e:
+                logger.warning(f"Tenant rate limit checked locally, Redis unavailable: {e}")
+
+        with self._lock:
+            state = self._state(key, policy)
+            now = time.monotonic()
+            state.tokens = min(policy.burst, state.tokens + (now - state.updated) * policy.rate)
+            state.updated = now
+            if state.tokens >= 1:
+                state.tokens -= 1
+                return 0.0
+            return (1 - state.tokens) / policy.rate
+
+    async def _take_slot(self, slot: _Slot, policy: LimitPolicy) -> bool:
+        client = get_redis()
+        if client is not None:
+            member = slot.redis_member or uuid.uuid4().hex
+            try:
+                taken = await run_in_threadpool(
+                    self._redis_scripts(client)[1],
+                    keys=[self._redis_key(slot.key, "slots")],
+                    args=[member, policy.concurrency, time.time(), settings.TENANT_LIMIT_LEASE_SECONDS],
+                )
+                slot.redis_member = member
+                if not int(taken):
+                    return False
+                with self._lock:
+                    self._state(slot.key, policy).running += 1
+                return True
+            except Exception as e:
+                slot.redis_member = None
+                logger.warning(f"Tenant concurrency limit checked locally, Redis unavailable: {e}")
+
+        with self._lock:
+            state = self._state(slot.key, policy)
+            if state.running >= policy.concurrency:
+                return False
+            state.running += 1
+            return True
+
+    def _redis_scripts(self, client):
+        if self._scripts is None:
+            self._scripts = (client.register_script(_TAKE_TOKEN), client.register_script(_TAKE_SLOT))
+        return self._scripts
+
+    @staticmethod
+    def _redis_key(key: Tuple[int, str], kind: str) -> str:
+        customer_id, endpoint_class = key
+        return f"{_KEY_PREFIX}:{endpoint_class}:{customer_id}:{kind}"
+
+    @staticmethod
+    def _reject(key: Tuple[int, str], reason: str, retry_after: float) -> None:
+        customer_id, endpoint_class = key
+        metrics.inc("tenant_limit_rejected_total", endpoint_class=endpoint_class, reason=reason)
+        logger.info(f"Customer {customer_id} over its {endpoint_class} limit ({reason})")
+        raise TenantLimitExceeded(customer_id, endpoint_class, reason, retry_after)
+
+
+# Global tenant limiter instance
+tenant_limiter = TenantLimiter()
@@ -0,0 +1,6 @@
+"""
+Load benchmarks for the ScanAndGo API
+
+    python -m benchmarks.seed --customers 2 --inventories 200000
+    python -m benchmarks.run --in-process --duration 30 --baseline benchmarks/baseline.json
+"""
@@ -0,0 +1,338 @@
+"""
+Deterministic synthetic multi-tenant dataset generator
+
+Produces data shaped like production: tenants of very different sizes, deep
+building/area/floor/detail-location trees, item catalogs where a few items
+account for most inventories, duplicate barcodes, missing inventories with
+their missing-item reports, and operators. Every random choice comes from an
+RNG seeded with ``(seed, customer_id, inventories already present)``, so a
+dataset (and each growth step applied to it) is reproducible.
+
+Rows are written with raw DBAPI ``executemany`` on pre-built tuples and
+explicit primary keys, which keeps SQLAlchemy's per-row parameter processing
+out of the hot loop.
+"""
+import itertools
+import logging
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.engine import Connection
+
+from app.models import (
+    APIKey, Area, BarcodeOccurrence, BarcodeRegistryState, Building, Category, Client,
+    DetailLocation, Floor, Inventory, Item, MissingItem, Operator,
+)
+
+logger = logging.getLogger(__name__)
+
+# Children first, so deletes run in foreign key order
+TENANT_MODELS = [
+    MissingItem, Inventory, BarcodeOccurrence, BarcodeRegistryState, Item, Category,
+    DetailLocation, Floor, Area, Building, Operator, APIKey, Client,
+]
+
+STATUS_WEIGHTS = {0: 5, 1: 80, 2: 5, 3: 3, 4: 7}  # 4 = missing
+
+PURCHASE_DATES = [f"20{y}-{m:02d}-{d:02d}" for y in range(15, 26) for m in range(1, 13) for d in range(1, 29)]
+PURCHASE_AMOUNTS = range(10, 5001)
+
+INVENTORY_COLUMNS = (
+    "id", "customer_id", "category_id", "item_id", "building_id", "area_id", "floor_id",
+    "detail_location_id", "purchase_date", "last_date", "ref_client", "status", "reg_date",
+    "inv_date", "comment", "rfid", "barcode", "operator_id", "room_assignment",
+    "category_df_immonet", "purchase_amount", "is_throw",
+)
+
+
+@dataclass
+class DatasetSpec:
+    """Shape of the generated data"""
+    seed: int = 42
+    chunk_size: int = 10_000
+    # Tenants
+    tenant_skew: float = 1.0  # Zipf exponent of tenant sizes (0 = equal tenants)
+    # Location tree
+    areas_per_building: int = 4
+    floors_per_area: int = 5
+    rooms_per_floor: int = 10
+    inventories_per_room: int = 100
+    # Catalog
+    inventories_per_item: int = 100
+    items_per_category: int = 30
+    max_items: int = 20_000
+    item_skew: float = 1.1  # Zipf exponent of item popularity
+    # Inventories
+    duplicate_rate: float = 0.005
+    throw_rate: float = 0.01
+    operators: int = 20
+
+
+@dataclass
+class TenantState:
+    """What a tenant already has; generation continues from here"""
+    customer_id: int
+    buildings: int = 0
+    # room id -> (floor id, area id, building id)
+    rooms: Dict[int, Tuple[int, int, int]] = field(default_factory=dict)
+    # item id -> category id, in creation order
+    items: Dict[int, Optional[int]] = field(default_factory=dict)
+    categories: List[int] = field(default_factory=list)
+    operators: List[int] = field(default_factory=list)
+    inventories: int = 0
+
+
+def benchmark_api_key(customer_id: int) -> str:
+    """API key of a generated tenant (used by the external export scenario)"""
+    return f"bench-apikey-{customer_id}"
+
+
+def tenant_sizes(total: int, tenants: int, skew: float) -> List[int]:
+    """Split ``total`` inventories over tenants following a Zipf law (largest first)"""
+    weights = [1 / (rank + 1) ** skew for rank in range(tenants)]
+    scale = total / sum(weights)
+    sizes = [int(w * scale) for w in weights]
+    sizes[0] += total - sum(sizes)
+    return sizes
+
+
+def _zipf_cum_weights(n: int, skew: float) -> List[float]:
+    return list(itertools.accumulate(1 / (rank + 1) ** skew for rank in range(n)))
+
+
+class BulkWriter:
+    """Chunked raw executemany inserts for one connection"""
+
+    def __init__(self, conn: Connection, chunk_size: int):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        dialect = conn.dialect
+        if dialect.paramstyle == "qmark":
+            self.placeholder = "?"
+        elif dialect.paramstyle in ("format", "pyformat"):
+            self.placeholder = "%s"
+        else:
+            raise NotImplementedError(f"Unsupported paramstyle '{dialect.paramstyle}'")
+        self.quote = dialect.identifier_preparer.quote
+        self.written: Dict[str, int] = {}
+
+    def __enter__(self) -> "BulkWriter":
+        # Ids and references are generated consistently, so skip the per-row checks
+        if self.conn.dialect.name == "mysql":
+            self.conn.exec_driver_sql("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        # The connection goes back to the pool; do not leak the relaxed settings
+        if self.conn.dialect.name == "mysql":
+            self.conn.exec_driver_sql("SET SESSION unique_checks = 1, foreign_key_checks = 1")
+
+    def next_id(self, model) -> int:
+        return (self.conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+    def write(self, model, columns: Sequence[str], rows: Iterable[tuple]) -> int:
+        table = model.__tablename__
+        sql = (
+            f"INSERT INTO {self.quote(table)} ({', '.join(self.quote(c) for c in columns)}) "
+            f"VALUES ({', '.join([self.placeholder] * len(columns))})"
+        )
+        total = 0
+        rows = iter(rows)
+        while True:
+            chunk = list(itertools.islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.conn.exec_driver_sql(sql, chunk)
+            total += len(chunk)
+        self.written[table] = self.written.get(table, 0) + total
+        return total
+
+
+def load_tenant(conn: Connection, customer_id: int) -> TenantState:
+    """Read the existing rows of a tenant needed to keep growing it"""
+    state = TenantState(customer_id=customer_id)
+    state.buildings = conn.execute(
+        select(func.count()).select_from(Building).where(Building.customer_id == customer_id)
+    ).scalar() or 0
+    rows = conn.execute(
+        select(DetailLocation.id, Floor.id, Area.id, Area.building_id)
+        .join(Floor, DetailLocation.floor_id == Floor.id)
+        .join(Area, Floor.area_id == Area.id)
+        .where(DetailLocation.customer_id == customer_id)
+        .order_by(DetailLocation.id)
+    ).all()
+    state.rooms = {room: (floor, area, building) for room, floor, area, building in rows}
+    state.items = dict(conn.execute(
+        select(Item.id, Item.category_id).where(Item.customer_id == customer_id).order_by(Item.id)
+    ).all())
+    state.categories = list(conn.execute(
+        select(Category.id).where(Category.customer_id == customer_id).order_by(Category.id)
+    ).scalars())
+    state.operators = list(conn.execute(
+        select(Operator.id).where(Operator.customer_id == customer_id).order_by(Operator.id)
+    ).scalars())
+    state.inventories = conn.execute(
+        select(func.count()).select_from(Inventory).where(Inventory.customer_id == customer_id)
+    ).scalar() or 0
+    return state
+
+
+def delete_tenants(conn: Connection, customer_ids: List[int]) -> None:
+    """Delete every tenant row of the given customers"""
+    for model in TENANT_MODELS:
+        table = model.__table__
+        conn.execute(delete(table).where(table.c.customer_id.in_(customer_ids)))
+
+
+class DatasetGenerator:
+    """Creates and grows synthetic tenants according to a DatasetSpec"""
+
+    def __init__(self, spec: DatasetSpec):
+        self.spec = spec
+
+    def grow_tenant(self, conn: Connection, customer_id: int, inventories: int) -> Dict[str, int]:
+        """
+        Add ``inventories`` inventories to a tenant, creating it if needed.
+
+        The location tree, catalog and operators are extended so the tenant
+        keeps the same proportions as it grows.
+
+        Returns:
+            Rows written per table
+        """
+        spec = self.spec
+        state = load_tenant(conn, customer_id)
+        rng = random.Random(f"{spec.seed}:{customer_id}:{state.inventories}")
+        target = state.inventories + inventories
+
+        with BulkWriter(conn, spec.chunk_size) as writer:
+            if state.inventories == 0 and not state.operators:
+                self._create_tenant_rows(writer, state)
+
+            rooms_needed = math.ceil(target / spec.inventories_per_room)
+            if len(state.rooms) < rooms_needed:
+                self._add_buildings(writer, state, rng, rooms_needed - len(state.rooms))
+
+            items_needed = min(spec.max_items, max(10, target // spec.inventories_per_item))
+            if len(state.items) < items_needed:
+                self._add_items(writer, state, rng, items_needed - len(state.items))
+
+            self._add_inventories(writer, state, rng, inventories)
+
+        # The duplicates registry no longer matches; let it rebuild on next use
+        conn.execute(delete(BarcodeOccurrence.__table__).where(BarcodeOccurrence.customer_id == customer_id))
+        conn.execute(delete(BarcodeRegistryState.__table__).where(BarcodeRegistryState.customer_id == customer_id))
+        return writer.written
+
+    def _create_tenant_rows(self, writer: BulkWriter, state: TenantState) -> None:
+        cid = state.customer_id
+        writer.write(Client, ("customer_id", "clientname"), [(cid, f"Benchmark client {cid}")])
+        writer.write(APIKey, ("customer_id", "api_key", "created_at"),
+                     [(cid, benchmark_api_key(cid), "2025-01-01 00:00:00")])
+        first = writer.next_id(Operator)
+        state.operators = list(range(first, first + self.spec.operators))
+        writer.write(Operator, ("id", "customer_id", "username", "password", "isActive"), (
+            (oid, cid, f"bench{cid}_op{n + 1}", "!", 1) for n, oid in enumerate(state.operators)
+        ))
+
+    def _add_buildings(self, writer: BulkWriter, state: TenantState, rng: random.Random, rooms: int) -> None:
+        spec = self.spec
+        cid = state.customer_id
+        per_building = spec.areas_per_building * spec.floors_per_area * spec.rooms_per_floor
+        count = math.ceil(rooms / per_building)
+
+        next_b, next_a, next_f, next_d = (writer.next_id(m) for m in (Building, Area, Floor, DetailLocation))
+        buildings, areas, floors, details = [], [], [], []
+        for b in range(state.buildings + 1, state.buildings + count + 1):
+            buildings.append((next_b, cid, f"C{cid} Building {b}"))
+            for a in range(1, spec.areas_per_building + 1):
+                areas.append((next_a, cid, next_b, f"Area {b}.{a}"))
+                for f in range(1, spec.floors_per_area + 1):
+                    floors.append((next_f, cid, next_a, f"Floor {b}.{a}.{f}"))
+                    # Floors differ in how many rooms they have
+                    for r in range(1, rng.randint(max(1, spec.rooms_per_floor // 2), spec.rooms_per_floor * 3 // 2) + 1):
+                        details.append((next_d, cid, next_f, f"Room {b}.{a}.{f}.{r}", None))
+                        state.rooms[next_d] = (next_f, next_a, next_b)
+                        next_d += 1
+                    next_f += 1
+                next_a += 1
+            next_b += 1
+        state.buildings += count
+
+        writer.write(Building, ("id", "customer_id", "name"), buildings)
+        writer.write(Area, ("id", "customer_id", "building_id", "name"), areas)
+        writer.write(Floor, ("id", "customer_id", "area_id", "name"), floors)
+        writer.write(DetailLocation, ("id", "customer_id", "floor_id", "name", "img_data"), details)
+
+    def _add_items(self, writer: BulkWriter, state: TenantState, rng: random.Random, count: int) -> None:
+        spec = self.spec
+        cid = state.customer_id
+        categories_needed = max(1, math.ceil((len(state.items) + count) / spec.items_per_category))
+        if len(state.categories) < categories_needed:
+            first = writer.next_id(Category)
+            new = list(range(first, first + categories_needed - len(state.categories)))
+            start = len(state.categories)
+            writer.write(Category, ("id", "customer_id", "name"), (
+                (cat_id, cid, f"Category {start + n + 1}") for n, cat_id in enumerate(new)
+            ))
+            state.categories.extend(new)
+
+        first = writer.next_id(Item)
+        start = len(state.items)
+        rows = []
+        for n, item_id in enumerate(range(first, first + count)):
+            category_id = rng.choice(state.categories)
+            state.items[item_id] = category_id
+            rows.append((item_id, cid, category_id, f"Item {start + n + 1}", f"C{cid}-ITM{start + n + 1:07d}"))
+        writer.write(Item, ("id", "customer_id", "category_id", "name", "barcode"), rows)
+
+    def _add_inventories(self, writer: BulkWriter, state: TenantState, rng: random.Random, count: int) -> None:
+        spec = self.spec
+        cid = state.customer_id
+        item_ids = list(state.items)
+        item_cum = _zipf_cum_weights(len(item_ids), spec.item_skew)
+        room_ids = list(state.rooms)
+        statuses = list(STATUS_WEIGHTS)
+        status_weights = list(STATUS_WEIGHTS.values())
+        first_id = writer.next_id(Inventory)
+        missing: List[Tuple[int, str]] = []
+
+        def rows() -> Iterator[tuple]:
+            done = 0
+            while done < count:
+                # Draw each column for the whole chunk at once; per-row RNG calls dominate otherwise
+                n = min(spec.chunk_size, count - done)
+                items = rng.choices(item_ids, cum_weights=item_cum, k=n)
+                rooms = rng.choices(room_ids, k=n)
+                chosen_statuses = rng.choices(statuses, status_weights, k=n)
+                operators = rng.choices(state.operators, k=n)
+                dates = rng.choices(PURCHASE_DATES, k=n)
+                amounts = rng.choices(PURCHASE_AMOUNTS, k=n)
+                duplicated = rng.choices((False, True), cum_weights=(1 - spec.duplicate_rate, 1), k=n)
+                thrown = rng.choices((False, True), cum_weights=(1 - spec.throw_rate, 1), k=n)
+                for i in range(n):
+                    number = state.inventories + done + i
+                    if number and duplicated[i]:
+                        barcode = f"C{cid}-{rng.randrange(number):09d}"
+                    else:
+                        barcode = f"C{cid}-{number:09d}"
+                    room = rooms[i]
+                    floor_id, area_id, building_id = state.rooms[room]
+                    status = chosen_statuses[i]
+                    if status == 4:
+                        missing.append((room, barcode))
+                    item_id = items[i]
+                    yield (
+                        first_id + done + i, cid, state.items[item_id], item_id, building_id, area_id,
+                        floor_id, room, dates[i], None, None, status, "2025-01-01", None, None, None,
+                        barcode, operators[i], None, None, amounts[i], thrown[i],
+                    )
+                done += n
+
+        writer.write(Inventory, INVENTORY_COLUMNS, rows())
+        writer.write(MissingItem, ("customer_id", "detail_location_id", "barcode"),
+                     ((cid, room, barcode) for room, barcode in missing))
+        state.inventories += count
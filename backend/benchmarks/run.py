@@ -0,0 +1,349 @@
+"""
+Concurrent load benchmark for the hot API paths
+
+Drives a weighted mix of Android scans, inventory listing, dashboard counts
+and the external export against the tenants created by ``benchmarks.seed``,
+then reports p50/p95/p99 latency and throughput per scenario. Results can be
+saved as a baseline and later runs compared against it; the exit status is 1
+when a scenario regresses beyond the tolerance.
+
+    python -m benchmarks.run --url http://127.0.0.1:8000 --duration 60
+    python -m benchmarks.run --in-process --baseline benchmarks/baseline.json
+    python -m benchmarks.run --in-process --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import func, select
+
+from app.database import SessionLocal, engine
+from app.models import DetailLocation, Inventory
+from app.utils.auth import create_access_token
+from benchmarks.dataset import benchmark_api_key
+
+
+@dataclass
+class Tenant:
+    """Benchmark customer with the data needed to build realistic requests"""
+    customer_id: int
+    token: str
+    api_key: str
+    barcodes: List[str]
+    detail_location_ids: List[int]
+    inventory_pages: int
+
+
+@dataclass
+class ScenarioStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self, duration: float) -> Dict[str, float]:
+        ordered = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            if not ordered:
+                return 0.0
+            index = min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))
+            return round(ordered[index] * 1000, 2)
+
+        return {
+            "requests": len(ordered),
+            "errors": self.errors,
+            "p50Ms": percentile(50),
+            "p95Ms": percentile(95),
+            "p99Ms": percentile(99),
+            "throughput": round(len(ordered) / duration, 2) if duration else 0.0,
+        }
+
+
+def load_tenants(first_customer: int, customers: int, sample: int) -> List[Tenant]:
+    """Read sample barcodes and locations of the seeded benchmark customers"""
+    tenants = []
+    with SessionLocal() as db:
+        for customer_id in range(first_customer, first_customer + customers):
+            total = db.execute(
+                select(func.count()).select_from(Inventory).where(Inventory.customer_id == customer_id)
+            ).scalar() or 0
+            if not total:
+                raise SystemExit(f"Customer {customer_id} has no inventories; run benchmarks.seed first")
+
+            # Spread the sample over the id range instead of taking the first rows
+            step = max(1, total // sample)
+            barcodes = list(db.execute(
+                select(Inventory.barcode)
+                .where(Inventory.customer_id == customer_id, Inventory.id % step == 0)
+                .limit(sample)
+            ).scalars())
+            detail_location_ids = list(db.execute(
+                select(DetailLocation.id).where(DetailLocation.customer_id == customer_id)
+            ).scalars())
+
+            tenants.append(Tenant(
+                customer_id=customer_id,
+                token=create_access_token({
+                    "customerId": customer_id, "userId": 0, "username": "benchmark",
+                    "role": "admin", "isActive": True,
+                }),
+                api_key=benchmark_api_key(customer_id),
+                barcodes=barcodes,
+                detail_location_ids=detail_location_ids,
+                inventory_pages=(total + 49) // 50,
+            ))
+    return tenants
+
+
+Scenario = Callable[[httpx.AsyncClient, Tenant, random.Random], Awaitable[None]]
+
+
+def _auth(tenant: Tenant) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {tenant.token}"}
+
+
+def _scan_batch(tenant: Tenant, rng: random.Random, size: int) -> List[str]:
+    batch = rng.sample(tenant.barcodes, min(size, len(tenant.barcodes)))
+    # A few tags the tenant has never registered
+    batch.extend(f"UNKNOWN-{rng.randrange(10**9)}" for _ in range(max(1, size // 10)))
+    return batch
+
+
+async def android_detect(client: httpx.AsyncClient, tenant: Tenant, rng: random.Random) -> None:
+    response = await client.post("/api/inventory/detect/barcode", headers=_auth(tenant), json={
+        "detail_location_id": rng.choice(tenant.detail_location_ids),
+        "barcode_list": _scan_batch(tenant, rng, 30),
+    })
+    response.raise_for_status()
+
+
+async def android_barcodelist(client: httpx.AsyncClient, tenant: Tenant, rng: random.Random) -> None:
+    response = await client.post("/api/inventory/barcodelist", headers=_auth(tenant), json={
+        "barcode_list": _scan_batch(tenant, rng, 20),
+    })
+    response.raise_for_status()
+
+
+async def inventory_list(client: httpx.AsyncClient, tenant: Tenant, rng: random.Random) -> None:
+    # Most users stay on the first pages
+    page = min(tenant.inventory_pages, int(rng.expovariate(0.2)) + 1)
+    response = await client.get("/api/inventories", headers=_auth(tenant),
+                                params={"page": page, "pageSize": 50})
+    response.raise_for_status()
+
+
+async def dashboard_counts(client: httpx.AsyncClient, tenant: Tenant, rng: random.Random) -> None:
+    # The dashboard page issues its count requests together
+    responses = await asyncio.gather(*(
+        client.get(path, headers=_auth(tenant)) for path in (
+            "/api/inventories/count",
+            "/api/inventories/status-summary",
+            "/api/missing-items/count",
+            "/api/breakage/count",
+        )
+    ))
+    for response in responses:
+        response.raise_for_status()
+
+
+async def external_export(client: httpx.AsyncClient, tenant: Tenant, rng: random.Random) -> None:
+    response = await client.get("/api/scanandgo/inventory", params={
+        "customer_id": tenant.customer_id, "apikey": tenant.api_key,
+    })
+    response.raise_for_status()
+
+
+# name -> (scenario, relative weight)
+SCENARIOS: Dict[str, tuple] = {
+    "android_detect": (android_detect, 35),
+    "android_barcodelist": (android_barcodelist, 15),
+    "inventory_list": (inventory_list, 30),
+    "dashboard_counts": (dashboard_counts, 18),
+    "external_export": (external_export, 2),
+}
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    tenants: List[Tenant],
+    scenarios: Dict[str, tuple],
+    concurrency: int,
+    duration: float,
+    warmup: float,
+    seed: int,
+) -> Tuple[Dict[str, ScenarioStats], float]:
+    """
+    Run ``concurrency`` virtual users until ``warmup + duration`` seconds have passed
+
+    Returns:
+        Per-scenario stats and the measured window in seconds
+    """
+    stats = {name: ScenarioStats() for name in scenarios}
+    names = list(scenarios)
+    weights = [scenarios[name][1] for name in names]
+    started = time.perf_counter()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async def user(index: int) -> None:
+        rng = random.Random(f"{seed}:{index}")
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                return
+            name = rng.choices(names, weights)[0]
+            tenant = rng.choice(tenants)
+            begin = time.perf_counter()
+            try:
+                await scenarios[name][0](client, tenant, rng)
+                failed = False
+            except httpx.HTTPError:
+                failed = True
+            end = time.perf_counter()
+            # Requests started during warm-up are not measured; those still in
+            # flight at the deadline are, and stretch the measured window
+            if begin >= measure_from:
+                last_end[0] = max(last_end[0], end)
+                if failed:
+                    stats[name].errors += 1
+                else:
+                    stats[name].latencies.append(end - begin)
+
+    last_end = [measure_from]
+    await asyncio.gather(*(user(i) for i in range(concurrency)))
+    return stats, max(duration, last_end[0] - measure_from)
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Regressions of ``results`` against ``baseline`` (p95 latency up or throughput down)"""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous or not current["requests"]:
+            continue
+        if previous["p95Ms"] and current["p95Ms"] > previous["p95Ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95Ms']} -> {current['p95Ms']} ms")
+        if previous["throughput"] and current["throughput"] < previous["throughput"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {previous['throughput']} -> {current['throughput']} req/s")
+    return regressions
+
+
+def print_report(results: Dict, baseline: Optional[Dict]) -> None:
+    header = f"{'scenario':<22}{'requests':>9}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, row in results["scenarios"].items():
+        print(f"{name:<22}{row['requests']:>9}{row['errors']:>8}{row['p50Ms']:>10}{row['p95Ms']:>10}"
+              f"{row['p99Ms']:>10}{row['throughput']:>10}")
+        previous = (baseline or {}).get("scenarios", {}).get(name)
+        if previous:
+            print(f"{'  baseline':<22}{previous['requests']:>9}{previous['errors']:>8}{previous['p50Ms']:>10}"
+                  f"{previous['p95Ms']:>10}{previous['p99Ms']:>10}{previous['throughput']:>10}")
+    idle = [name for name, row in results["scenarios"].items() if not row["requests"]]
+    if idle:
+        print(f"\nNo measured requests for {', '.join(idle)}; use a longer --duration or --warmup")
+    print(f"\nTotal: {results['totalThroughput']} req/s over {results['config']['duration']}s")
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    tenants = load_tenants(args.first_customer, args.customers, args.sample)
+
+    scenarios = SCENARIOS
+    if args.scenarios:
+        unknown = set(args.scenarios) - set(SCENARIOS)
+        if unknown:
+            raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        scenarios = {name: SCENARIOS[name] for name in args.scenarios}
+
+    limits = httpx.Limits(max_connections=args.concurrency * 4)
+    if args.in_process:
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        client = httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=args.timeout)
+    else:
+        client = httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout)
+
+    async with client:
+        stats, measured = await run_load(client, tenants, scenarios, args.concurrency,
+                               args.duration, args.warmup, args.seed)
+
+    summaries = {name: s.summary(measured) for name, s in stats.items()}
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "target": "in-process" if args.in_process else args.url,
+            "database": engine.dialect.name,
+            "customers": args.customers,
+            "concurrency": args.concurrency,
+            "duration": round(measured, 2),
+            "seed": args.seed,
+            "python": platform.python_version(),
+        },
+        "scenarios": summaries,
+        "totalThroughput": round(sum(s["throughput"] for s in summaries.values()), 2),
+    }
+
+    baseline = None
+    if args.baseline:
+        try:
+            with open(args.baseline, encoding="utf-8") as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            print(f"Baseline {args.baseline} not found; nothing to compare", file=sys.stderr)
+
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.save_baseline}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against baseline")
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load benchmark for the ScanAndGo API")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://127.0.0.1:8000", help="Running API server")
+    target.add_argument("--in-process", action="store_true",
+                        help="Call the ASGI app directly (no server, single process)")
+    parser.add_argument("--customers", type=int, default=2)
+    parser.add_argument("--first-customer", type=int, default=9001)
+    parser.add_argument("--concurrency", type=int, default=32, help="Virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="Measured seconds")
+    parser.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before measuring")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--sample", type=int, default=2000, help="Barcodes sampled per tenant for scans")
+    parser.add_argument("--scenarios", nargs="+", help=f"Subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the results JSON here")
+    parser.add_argument("--baseline", help="Compare against this results JSON")
+    parser.add_argument("--save-baseline", help="Write the results JSON as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="Allowed relative p95 increase / throughput drop before failing")
+    args = parser.parse_args()
+
+    sys.exit(asyncio.run(main_async(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Generate or grow synthetic benchmark tenants in the configured database (DATABASE_URL)
+
+    # 50 tenants sharing 2M inventories, a few large ones and a long tail
+    python -m benchmarks.seed --customers 50 --inventories 2000000 --reset
+
+    # Add 500k inventories to the same tenants (the tree and catalog grow along)
+    python -m benchmarks.seed --customers 50 --inventories 500000 --grow
+
+The same arguments on the same starting data always produce the same rows.
+"""
+import argparse
+import logging
+import time
+
+from sqlalchemy import event
+
+from app.config import settings
+from app.database import engine, init_db
+from benchmarks.dataset import (
+    DatasetGenerator, DatasetSpec, delete_tenants, load_tenant, tenant_sizes,
+)
+
+logger = logging.getLogger("benchmarks.seed")
+
+
+def main() -> None:
+    defaults = DatasetSpec()
+    parser = argparse.ArgumentParser(description="Generate synthetic benchmark tenants into DATABASE_URL")
+    parser.add_argument("--customers", type=int, default=2)
+    parser.add_argument("--first-customer", type=int, default=9001,
+                        help="Customer id of the first benchmark tenant")
+    parser.add_argument("--inventories", type=int, default=200_000,
+                        help="Inventories to add, split over the tenants")
+    parser.add_argument("--tenant-skew", type=float, default=defaults.tenant_skew,
+                        help="Zipf exponent of tenant sizes (0 = equal tenants)")
+    parser.add_argument("--grow", action="store_true",
+                        help="Add to the existing tenants instead of requiring empty ones")
+    parser.add_argument("--reset", action="store_true", help="Delete the benchmark tenants first")
+    parser.add_argument("--areas-per-building", type=int, default=defaults.areas_per_building)
+    parser.add_argument("--floors-per-area", type=int, default=defaults.floors_per_area)
+    parser.add_argument("--rooms-per-floor", type=int, default=defaults.rooms_per_floor)
+    parser.add_argument("--inventories-per-room", type=int, default=defaults.inventories_per_room)
+    parser.add_argument("--inventories-per-item", type=int, default=defaults.inventories_per_item)
+    parser.add_argument("--item-skew", type=float, default=defaults.item_skew,
+                        help="Zipf exponent of item popularity")
+    parser.add_argument("--duplicate-rate", type=float, default=defaults.duplicate_rate)
+    parser.add_argument("--operators", type=int, default=defaults.operators, help="Per tenant")
+    parser.add_argument("--chunk-size", type=int, default=defaults.chunk_size)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--allow-production", action="store_true",
+                        help="Seed even when ENVIRONMENT=production (benchmark tenants use known API keys)")
+    args = parser.parse_args()
+
+    if settings.ENVIRONMENT == "production" and not args.allow_production:
+        parser.error("refusing to seed with ENVIRONMENT=production; point DATABASE_URL at a local database")
+    if args.grow and args.reset:
+        parser.error("--grow and --reset are mutually exclusive")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    if engine.dialect.name == "sqlite":
+        # No fsync per commit while loading; the database is disposable
+        @event.listens_for(engine, "connect")
+        def _relax_sync(dbapi_connection, connection_record):
+            dbapi_connection.execute("PRAGMA synchronous = OFF")
+
+    init_db()
+
+    generator = DatasetGenerator(DatasetSpec(
+        seed=args.seed,
+        chunk_size=args.chunk_size,
+        tenant_skew=args.tenant_skew,
+        areas_per_building=args.areas_per_building,
+        floors_per_area=args.floors_per_area,
+        rooms_per_floor=args.rooms_per_floor,
+        inventories_per_room=args.inventories_per_room,
+        inventories_per_item=args.inventories_per_item,
+        item_skew=args.item_skew,
+        duplicate_rate=args.duplicate_rate,
+        operators=args.operators,
+    ))
+
+    customer_ids = list(range(args.first_customer, args.first_customer + args.customers))
+    if args.reset:
+        with engine.begin() as conn:
+            delete_tenants(conn, customer_ids)
+    elif not args.grow:
+        with engine.connect() as conn:
+            existing = [cid for cid in customer_ids if load_tenant(conn, cid).inventories]
+        if existing:
+            parser.error(f"customers {existing} already have data; use --grow or --reset")
+
+    total_rows = 0
+    started = time.perf_counter()
+    sizes = tenant_sizes(args.inventories, args.customers, args.tenant_skew)
+    for customer_id, size in zip(customer_ids, sizes):
+        tenant_started = time.perf_counter()
+        with engine.begin() as conn:
+            written = generator.grow_tenant(conn, customer_id, size)
+        elapsed = time.perf_counter() - tenant_started
+        rows = sum(written.values())
+        total_rows += rows
+        logger.info(f"Customer {customer_id}: {written} in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s)")
+
+    elapsed = time.perf_counter() - started
+    logger.info(f"Wrote {total_rows:,} rows in {elapsed:.1f}s ({total_rows / elapsed:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Test configuration
+
+The application reads its settings at import time, so the environment is
+set before ``app`` is imported: a throwaway SQLite database and enforced
+query budgets. The database directory is removed after the session; the
+spool, job and floor plan directories are pointed at a pytest temporary
+directory before the application starts.
+"""
+import os
+import shutil
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="scanandgo-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_DB_DIR, 'test.db')}"
+os.environ["ENVIRONMENT"] = "test"
+os.environ["QUERY_BUDGET_ENFORCE"] = "true"
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import settings
+from app.database import SessionLocal, init_db, shard_engines
+from app.main import app
+from app.utils.auth import create_access_token
+
+
+@pytest.fixture(scope="session", autouse=True)
+def data_dirs(tmp_path_factory):
+    data_dir = tmp_path_factory.mktemp("data")
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(settings, "SCAN_BUFFER_DIR", str(data_dir / "scans"))
+        patch.setattr(settings, "JOB_RESULT_DIR", str(data_dir / "jobs"))
+        patch.setattr(settings, "FLOOR_PLAN_DIR", str(data_dir / "floor_plans"))
+        yield data_dir
+
+    for shard_engine in shard_engines.values():
+        shard_engine.dispose()
+    shutil.rmtree(_DB_DIR, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def client(data_dirs):
+    init_db()
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def auth_headers(customer_id: int, role: str = "admin") -> dict:
+    token = create_access_token({
+        "customerId": customer_id,
+        "userId": 1,
+        "username": "tester",
+        "role": role,
+        "isActive": True,
+    })
+    return {"Authorization": f"Bearer {token}"}
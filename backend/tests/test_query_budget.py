@@ -0,0 +1,72 @@
+"""
+Budgeted routes stay within their @query_budget with QUERY_BUDGET_ENFORCE on
+"""
+import pytest
+
+from app.models import Building, Category, DetailLocation, Inventory, Item, MissingItem
+from app.routers import inventories
+from app.utils.query_tracker import QueryBudgetExceeded, _BUDGET_ATTR
+
+from tests.conftest import auth_headers
+
+CUSTOMER_ID = 7001
+
+BUDGETED_ROUTES = [
+    "/api/inventories/count",
+    "/api/inventories/status-summary",
+    "/api/dashboard/summary",
+    "/api/missing-items",
+    "/api/missing-items?groupBy=location",
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def seeded(client):
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        category = Category(customer_id=CUSTOMER_ID, name="Chairs")
+        building = Building(customer_id=CUSTOMER_ID, name="Budget HQ")
+        db.add_all([category, building])
+        db.flush()
+        item = Item(customer_id=CUSTOMER_ID, name="Chair", category_id=category.id)
+        location = DetailLocation(customer_id=CUSTOMER_ID, name="Room 1")
+        db.add_all([item, location])
+        db.flush()
+        for number in range(20):
+            db.add(Inventory(
+                customer_id=CUSTOMER_ID,
+                category_id=category.id,
+                item_id=item.id,
+                building_id=building.id,
+                detail_location_id=location.id,
+                barcode=f"QB{number:04d}",
+                status=4 if number % 5 == 0 else 1,
+            ))
+        for number in range(3):
+            db.add(MissingItem(
+                customer_id=CUSTOMER_ID,
+                barcode=f"QB{number:04d}",
+                detail_location_id=location.id,
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("path", BUDGETED_ROUTES)
+def test_budgeted_route_within_budget(client, path):
+    headers = auth_headers(CUSTOMER_ID)
+
+    # Cold (queries the tables) and warm (served from the response cache where cached)
+    for _ in range(2):
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, response.text
+
+
+def test_over_budget_route_raises(client, monkeypatch):
+    monkeypatch.setattr(inventories.get_inventory_count, _BUDGET_ATTR, 0)
+
+    with pytest.raises(QueryBudgetExceeded):
+        client.get("/api/inventories/count", headers=auth_headers(CUSTOMER_ID))
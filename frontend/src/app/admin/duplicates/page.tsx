@@ -108,8 +108,8 @@ export default function DuplicatesPage() {
       // Clear cache first if requested
       if (forceClear) {
         try {
-          await fetch('/api/duplicates', {
-            method: 'DELETE',
+          await fetch('/api/duplicates/rebuild', {
+            method: 'POST',
             headers: {
               'Authorization': `Bearer ${token}`,
               'Content-Type': 'application/json'